@@ -0,0 +1,209 @@
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from streaming import atomic_write
+
+logger = logging.getLogger("AgentMetrics")
+
+# Upper bounds (seconds) of the LLM call latency histogram buckets
+LATENCY_BUCKETS = (0.1, 0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600)
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram in the Prometheus sense: counts[i] is the
+    number of observations <= buckets[i]; the last count is +Inf.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+        self.counts[-1] += 1
+
+    def quantile(self, q):
+        """
+        Returns the upper bound of the bucket holding the q-quantile (None without observations).
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        for bound, count in zip(self.buckets, self.counts):
+            if count >= rank:
+                return bound
+        return float("inf")
+
+    def to_dict(self):
+        return {"count": self.count, "sum": round(self.sum, 4),
+                "buckets": {str(bound): count for bound, count in zip(self.buckets, self.counts)} | {"+Inf": self.counts[-1]},
+                "p50": self.quantile(0.5), "p95": self.quantile(0.95)}
+
+
+class RoleMetrics:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        # Calls answered by the backend; cache hits take next to no time and are kept apart
+        self.latency = Histogram()
+        self.generated_tokens = 0
+        self.cache_hit_latency = Histogram()
+
+    def to_dict(self):
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "cache_hit_rate": round(self.cache_hits / lookups, 4) if lookups else None,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "tokens_per_second": round(self.generated_tokens / self.latency.sum, 2) if self.latency.sum else 0.0,
+            "latency_seconds": self.latency.to_dict(),
+            "cache_hit_latency_seconds": self.cache_hit_latency.to_dict(),
+        }
+
+
+class AgentMetrics:
+    """
+    Per-role counters of every LLM call the agents make: latency histogram,
+    token counts, errors, retries and cache hits. Thread-safe.
+    """
+
+    def __init__(self):
+        self.roles = {}
+        self._lock = threading.Lock()
+
+    def _role(self, role):
+        return self.roles.setdefault(role or "unknown", RoleMetrics())
+
+    def observe_call(self, role, seconds, prompt_tokens=0, completion_tokens=0, cache_hit=None):
+        """
+        Records one completed call. `cache_hit` is None when no cache was consulted.
+        Cache hits are counted, but their latency goes to a histogram of its own, so
+        latency_seconds and tokens_per_second describe the backend's calls only.
+        """
+        with self._lock:
+            metrics = self._role(role)
+            metrics.calls += 1
+            metrics.prompt_tokens += prompt_tokens
+            metrics.completion_tokens += completion_tokens
+            if cache_hit is True:
+                metrics.cache_hits += 1
+                metrics.cache_hit_latency.observe(seconds)
+                return
+            if cache_hit is False:
+                metrics.cache_misses += 1
+            metrics.latency.observe(seconds)
+            metrics.generated_tokens += completion_tokens
+
+    def observe_error(self, role):
+        with self._lock:
+            self._role(role).errors += 1
+
+    def observe_retry(self, role):
+        with self._lock:
+            self._role(role).retries += 1
+
+    def snapshot(self):
+        """
+        Returns the current metrics of every role as plain data.
+        """
+        with self._lock:
+            return {role: metrics.to_dict() for role, metrics in sorted(self.roles.items())}
+
+    def prometheus_text(self):
+        """
+        Returns the metrics in the Prometheus text exposition format.
+        """
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP book_writer_{name} {help_text}")
+            lines.append(f"# TYPE book_writer_{name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{escape_label(val)}"' for key, val in labels.items())
+                lines.append(f"book_writer_{name}{{{label_text}}} {value}")
+
+        with self._lock:
+            roles = sorted(self.roles.items())
+            for name, attribute, help_text in (
+                ("llm_calls_total", "calls", "LLM calls per agent role."),
+                ("llm_errors_total", "errors", "Failed LLM calls per agent role."),
+                ("llm_retries_total", "retries", "Retried LLM calls per agent role."),
+                ("llm_cache_hits_total", "cache_hits", "Response cache hits per agent role."),
+                ("llm_cache_misses_total", "cache_misses", "Response cache misses per agent role."),
+                ("llm_prompt_tokens_total", "prompt_tokens", "Estimated prompt tokens per agent role."),
+                ("llm_completion_tokens_total", "completion_tokens", "Estimated completion tokens per agent role."),
+            ):
+                metric(name, "counter", help_text, [({"role": role}, getattr(metrics, attribute)) for role, metrics in roles])
+
+            lines.append("# HELP book_writer_llm_latency_seconds LLM call latency per agent role.")
+            lines.append("# TYPE book_writer_llm_latency_seconds histogram")
+            for role, metrics in roles:
+                histogram, label = metrics.latency, escape_label(role)
+                bounds = [str(bound) for bound in histogram.buckets] + ["+Inf"]
+                for bound, count in zip(bounds, histogram.counts):
+                    lines.append(f'book_writer_llm_latency_seconds_bucket{{role="{label}",le="{bound}"}} {count}')
+                lines.append(f'book_writer_llm_latency_seconds_sum{{role="{label}"}} {round(histogram.sum, 4)}')
+                lines.append(f'book_writer_llm_latency_seconds_count{{role="{label}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """
+        Writes the Prometheus text to `path`, e.g. for node_exporter's textfile collector.
+        """
+        atomic_write(path, self.prometheus_text())
+
+    def serve(self, port, host="127.0.0.1"):
+        """
+        Serves /metrics (Prometheus text) and /metrics.json (snapshot) from a
+        background thread. Returns the server; call shutdown() to stop it.
+        """
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, content_type = registry.prometheus_text(), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, content_type = json.dumps(registry.snapshot(), indent=2), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, name="MetricsServer", daemon=True).start()
+        logger.info(f"Serving agent metrics on http://{host}:{server.server_address[1]}/metrics")
+        return server
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+agent_metrics = AgentMetrics()
@@ -0,0 +1,137 @@
+import os
+import re
+import sys
+import json
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from scheduler import FairGate
+from run_journal import latest_run_dir
+from agent_metrics import agent_metrics
+from prompt_layout import prefix_reuse
+
+logger = logging.getLogger("Batch")
+
+# Settings a book in the manifest may give; the rest comes from the environment
+BOOK_FIELDS = ("name", "title", "genre", "initial_prompt", "num_chapters", "output_folder")
+
+
+def slugify(text):
+    return re.sub(r"[^a-z0-9]+", "-", str(text).lower()).strip("-")
+
+
+def load_manifest(path, output_root="books", runs_root="runs"):
+    """
+    Reads a batch manifest: a JSON list of books, or an object with a "books"
+    list. Each book is an object with any of BOOK_FIELDS, e.g.
+
+        {"books": [{"title": "Low Tide", "genre": "literary_fiction", "initial_prompt": "...", "num_chapters": 5}]}
+
+    Returns the books with a unique `name` (from the title when not given),
+    an `output_folder` under `output_root` and a `runs_folder` under `runs_root`.
+    Raises ValueError for unknown fields and for books sharing a name or output folder.
+    """
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    entries = manifest.get("books", []) if isinstance(manifest, dict) else manifest
+    if not isinstance(entries, list) or not all(isinstance(entry, dict) for entry in entries):
+        raise ValueError(f"{path}: expected a list of book objects.")
+
+    books = []
+    for position, entry in enumerate(entries, start=1):
+        unknown = sorted(set(entry) - set(BOOK_FIELDS))
+        if unknown:
+            raise ValueError(f"{path}: book {position} has unknown fields {unknown}; expected {list(BOOK_FIELDS)}.")
+        book = dict(entry)
+        book["name"] = slugify(book.get("name") or book.get("title") or f"book-{position}")
+        book.setdefault("output_folder", os.path.join(output_root, book["name"]))
+        book["runs_folder"] = os.path.join(runs_root, book["name"])
+        books.append(book)
+
+    for field in ("name", "output_folder"):
+        values = [os.path.abspath(book[field]) if field == "output_folder" else book[field] for book in books]
+        duplicates = sorted({value for value in values if values.count(value) > 1})
+        if duplicates:
+            raise ValueError(f"{path}: books share the {field.replace('_', ' ')} {duplicates}.")
+    return books
+
+
+def run_batch(books, concurrent_tasks, resume=False, create_run=None):
+    """
+    Generates every book of the batch in this process, each in its own thread.
+    All books share the LLM clients, response cache and circuit breaker, and
+    `concurrent_tasks` backend slots handed out round-robin between the books
+    (see scheduler.FairGate). Returns the outcome of every book by name:
+    "done", or the error that stopped it.
+
+    With BENCHMARK_REPORT set, every book writes its own benchmark report to its
+    output folder, and the per-role agent metrics and prompt prefix reuse, which
+    cover all books, go once into a batch report at BENCHMARK_REPORT.
+    """
+    if create_run is None:
+        from main import use_vendored_pywriter
+        use_vendored_pywriter()
+        from book_run import BookRun as create_run
+    gate = FairGate(concurrent_tasks)
+    benchmark_report = os.getenv('BENCHMARK_REPORT')
+
+    def run_book(book):
+        runs_folder = book["runs_folder"]
+        # A resumed batch picks up each book's latest run; books that never started begin afresh
+        book_resume = "latest" if resume and latest_run_dir(runs_folder) is not None else None
+        run = create_run(genre=book.get("genre"), initial_prompt=book.get("initial_prompt"), num_chapters=book.get("num_chapters"),
+                         output_folder=book["output_folder"], runs_folder=runs_folder, resume=book_resume,
+                         book_title=book.get("title"), name=book["name"], task_gate=gate, process_metrics=False,
+                         benchmark_report=os.path.join(book["output_folder"], "benchmark_report.json") if benchmark_report else None)
+        logger.info(f"Book {book['name']}: starting, output in {book['output_folder']}")
+        run.run()
+        logger.info(f"Book {book['name']}: done")
+
+    outcomes = {}
+    with ThreadPoolExecutor(max_workers=max(1, len(books)), thread_name_prefix="book") as pool:
+        futures = {book["name"]: pool.submit(run_book, book) for book in books}
+        for name, future in futures.items():
+            try:
+                future.result()
+                outcomes[name] = "done"
+            except (Exception, SystemExit) as e:
+                logger.exception(f"Book {name} failed.")
+                outcomes[name] = f"failed: {e}"
+
+    if benchmark_report:
+        report = {"books": outcomes, "agents": agent_metrics.snapshot(), "prefix_reuse": prefix_reuse.snapshot()}
+        with open(benchmark_report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Batch report written to {benchmark_report}")
+    return outcomes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the books of a manifest in one process, sharing the model backend.")
+    parser.add_argument("manifest", help="JSON list of books (see load_manifest)")
+    parser.add_argument("--resume", action="store_true", help="Resume each book's latest run, skipping completed tasks")
+    parser.add_argument("--output-root", help="Folder for the books' output folders (default: BATCH_OUTPUT_FOLDER or 'books')")
+    args = parser.parse_args(argv)
+
+    from dotenv import load_dotenv
+    from logging_setup import configure_logging
+    configure_logging()
+    load_dotenv()
+
+    metrics_port = os.getenv('METRICS_PORT')
+    if metrics_port:
+        agent_metrics.serve(int(metrics_port))
+
+    books = load_manifest(args.manifest, output_root=args.output_root or os.getenv('BATCH_OUTPUT_FOLDER', 'books'),
+                          runs_root=os.getenv('RUNS_FOLDER', 'runs'))
+    # Tasks in flight across all books; MAX_CONCURRENT_TASKS still bounds each book's own scheduler
+    concurrent_tasks = int(os.getenv('BATCH_CONCURRENT_TASKS', os.getenv('MAX_CONCURRENT_TASKS', 4)))
+    logger.info(f"Batch of {len(books)} books, {concurrent_tasks} concurrent tasks")
+    outcomes = run_batch(books, concurrent_tasks, resume=args.resume)
+    for name, outcome in outcomes.items():
+        print(f"{name}: {outcome}")
+    return 0 if all(outcome == "done" for outcome in outcomes.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
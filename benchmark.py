@@ -0,0 +1,166 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from task_metrics import compare_reports
+from model_routing import SMALL_TIER_CANDIDATES, role_env_name
+
+# Settings a benchmark run starts from; anything set in the environment or with --env wins
+BENCHMARK_DEFAULTS = {
+    "LLM_BACKEND": "mock",
+    "LLM_CACHE": "off",
+    "NUM_CHAPTERS": "3",
+    "STREAM_CHAPTERS": "false",
+}
+
+
+def run_benchmark(report_path, env=None, workdir=None):
+    """
+    Runs main.py end to end in a subprocess, with its output and run folders in
+    `workdir`, and returns the report it writes to `report_path`.
+    """
+    workdir = workdir or tempfile.mkdtemp(prefix="book-benchmark-")
+    run_env = dict(os.environ)
+    for name, value in BENCHMARK_DEFAULTS.items():
+        run_env.setdefault(name, value)
+    run_env.update(env or {})
+    run_env["BENCHMARK_REPORT"] = os.path.abspath(report_path)
+    run_env["OUTPUT_FOLDER"] = os.path.join(workdir, "book-output")
+    run_env["RUNS_FOLDER"] = os.path.join(workdir, "runs")
+
+    started = time.perf_counter()
+    subprocess.run([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")],
+                   env=run_env, check=True, cwd=workdir)
+    with open(report_path, encoding="utf-8") as f:
+        report = json.load(f)
+    report["process_wall_seconds"] = round(time.perf_counter() - started, 4)
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def format_report(report):
+    """
+    Returns a table of the report's per-stage totals, followed by the per-role
+    agent metrics and prompt prefix reuse when the report has them.
+    """
+    lines = [f"{'stage':<34}{'tasks':>6}{'wall s':>10}{'llm s':>10}{'overhead s':>12}{'prompt tok':>12}{'compl tok':>11}{'tok/s':>9}"]
+    for name, summary in list(report["stages"].items()) + [("total", report["totals"])]:
+        lines.append(f"{name:<34}{summary['tasks']:>6}{summary['wall_seconds']:>10.3f}{summary['llm_seconds']:>10.3f}"
+                     f"{summary['overhead_seconds']:>12.3f}{summary['prompt_tokens']:>12}{summary['completion_tokens']:>11}"
+                     f"{summary['tokens_per_second']:>9.1f}")
+    if report.get("agents"):
+        lines.append("")
+        lines.append(f"{'role':<34}{'calls':>6}{'p50 s':>10}{'p95 s':>10}{'errors':>8}{'retries':>9}{'cache hit':>11}{'tok/s':>9}")
+        for role, metrics in report["agents"].items():
+            latency = metrics["latency_seconds"]
+            hit_rate = "-" if metrics["cache_hit_rate"] is None else f"{metrics['cache_hit_rate']:.0%}"
+            lines.append(f"{role:<34}{metrics['calls']:>6}{latency['p50'] or 0:>10}{latency['p95'] or 0:>10}{metrics['errors']:>8}"
+                         f"{metrics['retries']:>9}{hit_rate:>11}{metrics['tokens_per_second']:>9.1f}")
+    if report.get("prefix_reuse"):
+        lines.append("")
+        lines.append(f"{'role':<34}{'calls':>6}{'prompt tok':>12}{'shared tok':>12}{'reuse':>8}")
+        for role, reuse in report["prefix_reuse"].items():
+            ratio = "-" if reuse["reuse_ratio"] is None else f"{reuse['reuse_ratio']:.0%}"
+            lines.append(f"{role:<34}{reuse['calls']:>6}{reuse['prompt_tokens']:>12}{reuse['shared_tokens']:>12}{ratio:>8}")
+    return "\n".join(lines)
+
+
+def compare_role_models(baseline, routed, role):
+    """
+    Compares one role's tasks between a run on the default model and a run with
+    the role routed to another model: LLM time, total wall time and the output
+    quality proxies.
+    """
+    before, after = baseline["roles"].get(role), routed["roles"].get(role)
+    if not before or not after:
+        return None
+    change = lambda name: round(after[name] - before[name], 4) if after[name] is not None and before[name] is not None else None
+    return {
+        "role": role,
+        "llm_seconds": (before["llm_seconds"], after["llm_seconds"]),
+        "llm_seconds_saved": round(before["llm_seconds"] - after["llm_seconds"], 4),
+        "run_seconds_saved": round(baseline["totals"]["wall_seconds"] - routed["totals"]["wall_seconds"], 4),
+        "output_words_change": change("output_words"),
+        "lexical_diversity_change": change("lexical_diversity"),
+        "repeated_trigrams_change": change("repeated_trigrams"),
+    }
+
+
+def run_role_benchmark(roles, model, report_path, env=None):
+    """
+    Runs the pipeline once on the default model, then once per role with only
+    that role routed to `model` (MODEL_<ROLE>), and returns the per-role trade-offs.
+    """
+    base, extension = os.path.splitext(report_path)
+    baseline = run_benchmark(f"{base}.default{extension}", env=env)
+    comparisons = []
+    for role in roles:
+        routed_env = dict(env or {}, **{f"MODEL_{role_env_name(role)}": model})
+        routed = run_benchmark(f"{base}.{role_env_name(role).lower()}{extension}", env=routed_env)
+        comparison = compare_role_models(baseline, routed, role)
+        if comparison is None:
+            print(f"No tasks ran for role {role}")
+            continue
+        comparisons.append(comparison)
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump({"model": model, "roles": comparisons}, f, indent=2)
+    return comparisons
+
+
+def format_role_comparisons(model, comparisons):
+    lines = [f"Routing single roles to {model}:",
+             f"{'role':<24}{'llm s default':>15}{'llm s routed':>14}{'run s saved':>13}{'words':>9}{'diversity':>11}{'repetition':>12}"]
+    signed = lambda value: "-" if value is None else f"{value:+}"
+    for comparison in comparisons:
+        before, after = comparison["llm_seconds"]
+        lines.append(f"{comparison['role']:<24}{before:>15.3f}{after:>14.3f}{comparison['run_seconds_saved']:>13.3f}"
+                     f"{signed(comparison['output_words_change']):>9}{signed(comparison['lexical_diversity_change']):>11}"
+                     f"{signed(comparison['repeated_trigrams_change']):>12}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the book pipeline end to end and report per-stage timings and token counts.")
+    parser.add_argument("--report", default="benchmark_report.json", help="Where to write the report (default: benchmark_report.json)")
+    parser.add_argument("--baseline", help="Baseline report to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Also save this run's report as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Relative slowdown that counts as a regression (default: 0.2)")
+    parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE", help="Extra environment for the run, e.g. NUM_CHAPTERS=5")
+    parser.add_argument("--role-model", metavar="MODEL", help="Per-role mode: route each role in turn to MODEL and report the time and quality trade-off")
+    parser.add_argument("--roles", default=",".join(SMALL_TIER_CANDIDATES), help="Roles for --role-model, comma separated (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    env = dict(setting.split("=", 1) for setting in args.env)
+    if args.role_model:
+        roles = [role.strip() for role in args.roles.split(",") if role.strip()]
+        comparisons = run_role_benchmark(roles, args.role_model, args.report, env=env)
+        print(format_role_comparisons(args.role_model, comparisons))
+        return 0
+
+    report = run_benchmark(args.report, env=env)
+    print(format_report(report))
+
+    status = 0
+    if args.baseline and os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare_reports(report, json.load(f), tolerance=args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if not regressions:
+            print(f"No regressions against {args.baseline}")
+        status = 1 if regressions else 0
+    if args.save_baseline:
+        if not args.baseline:
+            parser.error("--save-baseline needs --baseline")
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
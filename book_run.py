@@ -0,0 +1,970 @@
+import os
+import shutil
+import logging
+from contextlib import nullcontext
+from crewai import Task, Crew, Process
+from agents import create_agents
+from llm_backend import warm_up
+from genre_config import load_genre_config
+from scheduler import run_task_graph, parse_stage_limits, StageSlots
+from run_journal import RunJournal, new_run_dir, latest_run_dir
+from task_outputs import task_output_text, restore_task_output
+from context_assembler import ContextSection, assemble_context, context_budget, words_to_tokens, estimate_tokens
+from prompt_layout import layered_prompt, prefix_reuse
+from outline_index import OutlineIndex
+from story_state import StoryState, UPDATE_FORMAT
+from chapter_stages import CHAPTER_STAGES, StageGraphError, validate_stage_graph, stage_inputs
+from quality_gate import assess_chapter
+from length_control import count_words, trim_to_words, ending, append_continuation
+from scene_plan import ScenePlan, SCENE_FORMAT, parse_scenes, scenes_from_key_events
+from retrieval_index import RetrievalIndex, format_passages
+from streaming import streaming_to, atomic_write, partial_path
+from yw7_sink import Yw7Sink
+from logging_setup import log_content
+from task_metrics import TaskMetrics, output_quality
+from agent_metrics import agent_metrics
+from resilience import call_with_retry, task_retry_policy, get_circuit_breaker, is_retryable_task_error
+
+logger = logging.getLogger("Main")
+
+# Logger for agent communications, written to agent_communication.log
+comm_logger = logging.getLogger("AgentCommunicationLogger")
+
+DEFAULT_INITIAL_PROMPT = "A group of friends decides to spend a memorable day at the beach. Each friend has a different idea of what makes a perfect beach day, leading to a series of adventures and misadventures as they try to make the most of their time together."
+
+# The agents create_agents returns, in order
+AGENT_NAMES = ("story_planner", "outline_creator", "setting_builder", "character_agent", "relationship_architect", "plot_agent",
+               "writer", "editor", "memory_keeper", "researcher", "critic", "reviser", "outline_compiler", "item_developer")
+
+# Fail before any chapter is generated if the stage graph has a dangling or unused stage
+FINAL_STAGE = validate_stage_graph(CHAPTER_STAGES)
+WRITE_ROLE = next(stage.role for stage in CHAPTER_STAGES if stage.name == "write")
+# The stage limit scene drafts run under (SCENE_CONCURRENCY), apart from the Writer's
+SCENE_STAGE = "Scene Drafts"
+
+# Expected size of the non-prose chapter stage outputs (research notes, refined outline, critique)
+STAGE_OUTPUT_TOKENS = 1000
+
+
+def log_prefix_reuse():
+    reuse = prefix_reuse.snapshot()["total"]
+    if reuse["calls"]:
+        logger.info(f"Prompt prefix reuse: {reuse['shared_tokens']}/{reuse['prompt_tokens']} tokens ({reuse['reuse_ratio']:.0%}) shared with an earlier prompt")
+
+
+def add_task_hook(hooks, task, hook):
+    hooks.setdefault(id(task), []).append(hook)
+
+
+# Clear the output folder before generating new content
+def clear_output_folder(folder):
+    for filename in os.listdir(folder):
+        file_path = os.path.join(folder, filename)
+        try:
+            if os.path.isfile(file_path) or os.path.islink(file_path):
+                os.unlink(file_path)
+            elif os.path.isdir(file_path):
+                shutil.rmtree(file_path)
+        except Exception as e:
+            print(f'Failed to delete {file_path}. Reason: {e}')
+
+
+# Chapter task instructions name no chapter: the chapter's specifics come last in the prompt (see chapter_prompt)
+WRITE_INSTRUCTION = "Write the chapter of the novel, following the refined chapter outline and incorporating the research findings. Expand on the key events, character developments, and setting descriptions with vivid prose and engaging dialogue."
+STITCH_INSTRUCTION = "Stitch the scene drafts of the chapter into one chapter, in the given order. Keep their prose, smooth the transitions between them, remove repetition across scenes and keep a '* * *' line between scenes that change place or time."
+
+
+class BookRun:
+    """
+    The generation of one book: its settings, agents, run journal and the state
+    the outline and chapter stages share. Settings not passed in come from the
+    environment (see .env). Agents and tasks are only built once the run needs
+    them, so creating a BookRun is cheap.
+
+    Several books can run in one process (see batch.py): `task_gate`, a
+    scheduler.FairGate, then shares the backend's task slots between them,
+    each book asking for its slots under its `name`. The per-role agent metrics
+    and prompt prefix reuse are process-wide, so with `process_metrics` off a
+    book's reports leave them out and the batch reports them once for all books.
+    """
+
+    def __init__(self, genre=None, initial_prompt=None, num_chapters=None, output_folder=None, runs_folder=None,
+                 resume=None, book_title=None, name=None, task_gate=None, benchmark_report=None, process_metrics=True):
+        self.name = name
+        self.task_gate = task_gate
+        self.process_metrics = process_metrics
+        # Define the model to be used by the agents; LLM_BACKEND=mock uses the offline fake in mock_llm.py
+        self.llm_backend = os.getenv('LLM_BACKEND', 'ollama')
+        self.model_to_use = f"{self.llm_backend}/{os.getenv('OLLAMA_MODEL')}"
+
+        # Specify the genre from the .env file; default to 'literary_fiction' if not specified
+        self.genre = genre or os.getenv('GENRE', 'literary_fiction')
+        self.genre_config = load_genre_config(self.genre)
+
+        # Get the number of chapters from the genre config; NUM_CHAPTERS in the environment overrides it
+        self.num_chapters = int(num_chapters or os.getenv('NUM_CHAPTERS', self.genre_config.num_chapters))
+        self.initial_prompt = initial_prompt or os.getenv('INITIAL_PROMPT', DEFAULT_INITIAL_PROMPT)
+        self.resume = resume
+
+        # Maximum number of tasks sent to the model backend at the same time
+        self.max_concurrent_tasks = int(os.getenv('MAX_CONCURRENT_TASKS', 4))
+
+        # Callbacks run right before a task starts and right after its output is available, keyed by id(task)
+        self.before_task_hooks = {}
+        self.after_task_hooks = {}
+        # Ordering-only dependencies between tasks (see scheduler.build_task_graph), keyed by id(task)
+        self.task_after = {}
+        # Output file and stream name whose partial file a task's LLM calls stream into, keyed by id(task)
+        self.task_stream_paths = {}
+        # Tasks that may be answered without an LLM call, keyed by id(task): a function
+        # returning the output to use, or None to run the task after all
+        self.task_shortcuts = {}
+        # Stable names for the run journal and the descriptions they are recorded with, keyed by id(task)
+        self.journal_keys = {}
+        self.journal_descriptions = {}
+        # Stage (concurrency limit) name of every chapter stage task, its ChapterStage.role, keyed by id(task)
+        self.task_stages = {}
+
+        # Wall time and token counts of every task, written to BENCHMARK_REPORT at the end of the run
+        self.task_metrics = TaskMetrics()
+        self.benchmark_report = benchmark_report or os.getenv('BENCHMARK_REPORT')
+        # METRICS_FILE gets the Prometheus text of the per-role LLM call metrics rewritten after every task
+        self.metrics_file = os.getenv('METRICS_FILE')
+        # While the model backend's circuit is open, the scheduler starts no new tasks
+        self.backend_circuit = get_circuit_breaker()
+
+        self.output_folder = output_folder or os.getenv('OUTPUT_FOLDER', 'book-output')
+        # Stream the writer's and reviser's output token by token to the chapter's partial file
+        self.stream_chapters = os.getenv('STREAM_CHAPTERS', 'false').lower() in ('1', 'true', 'yes')
+        # Every run keeps a journal of completed tasks; resume picks an existing one up again
+        self.runs_folder = runs_folder or os.getenv('RUNS_FOLDER', 'runs')
+
+        self.story_state_tokens = int(os.getenv('STORY_STATE_TOKENS', 600))
+        self.retrieval_passage_words = int(os.getenv('RETRIEVAL_PASSAGE_WORDS', 150))
+        self.retrieval_top_k = int(os.getenv('RETRIEVAL_TOP_K', 4))
+
+        # The book as a yWriter 7 project, saved after every finished chapter (also on resume,
+        # as restored chapters land), so pywriter's exporters can take it from there
+        self.yw7_output = os.getenv('YW7_OUTPUT', 'on').lower() not in ('0', 'off', 'false', 'no')
+        self.book_title = book_title or os.getenv('BOOK_TITLE', 'A Day at the Beach')
+
+        self.outline_neighbors = int(os.getenv('OUTLINE_NEIGHBOR_CHAPTERS', 1))
+        # Get the context window size from the .env file
+        self.context_window_size = int(os.getenv('OLLAMA_CONTEXT_WINDOW', 4096))
+
+        # Local quality gate: a draft that passes the checks skips the critic and revise calls,
+        # a revision that fails them gets another critic/revise round, up to MAX_REVISION_ITERATIONS rounds
+        self.quality_gate_enabled = os.getenv('QUALITY_GATE', 'on').lower() not in ('0', 'off', 'false', 'no')
+        self.max_revision_iterations = int(os.getenv('MAX_REVISION_ITERATIONS', 1))
+
+        # Length controller: a chapter text shorter than MIN_WORDS_PER_CHAPTER is extended with a
+        # continuation of just the missing words; one longer than MAX_WORDS_PER_CHAPTER is trimmed at scene boundaries
+        self.length_control_enabled = os.getenv('LENGTH_CONTROL', 'on').lower() not in ('0', 'off', 'false', 'no')
+        self.max_continuations = int(os.getenv('MAX_CONTINUATIONS', 2))
+        self.continuation_context_words = int(os.getenv('CONTINUATION_CONTEXT_WORDS', 300))
+
+        # Scene mode: the refined outline ends with a scene breakdown, the scenes are drafted in parallel
+        # from a shared chapter brief and the writer stitches them into the chapter, smoothing the transitions
+        self.scene_mode = os.getenv('SCENE_MODE', 'off').lower() in ('1', 'on', 'true', 'yes')
+        self.scene_concurrency = int(os.getenv('SCENE_CONCURRENCY', self.max_concurrent_tasks))
+        self.max_scenes = int(os.getenv('MAX_SCENES', 6))
+
+        # Pipeline mode: all chapters go through one bounded worker pool, so chapter N+1's
+        # research and outline refinement overlap chapter N's write/critic/revise stages.
+        self.chapter_pipeline = os.getenv('CHAPTER_PIPELINE', 'false').lower() in ('1', 'true', 'yes')
+        # Per-stage (agent role) concurrency, e.g. "Researcher=2,Writer=1"; unlisted stages get one slot
+        self.stage_limits = parse_stage_limits(os.getenv('STAGE_CONCURRENCY', ''))
+        # The same limits, held around every model call, so tasks started from hooks count against them too;
+        # in pipeline mode unlisted stages get one slot, as in the pipeline's task graph
+        scene_limits = {SCENE_STAGE: self.scene_concurrency} if self.scene_mode else {}
+        self.stage_slots = StageSlots({**self.stage_limits, **scene_limits}, default_limit=1 if self.chapter_pipeline else None)
+        writer_limit = self.stage_slots.limits.get(WRITE_ROLE, self.stage_slots.default_limit)
+        if self.scene_mode and writer_limit is not None and writer_limit < self.scene_concurrency:
+            logger.warning(f"Scene drafts run {self.scene_concurrency} at a time (SCENE_CONCURRENCY), beside the {WRITE_ROLE} stage limit of "
+                           f"{writer_limit}: up to {self.scene_concurrency + writer_limit} {WRITE_ROLE} calls at once. "
+                           f"Lower SCENE_CONCURRENCY to keep fewer {WRITE_ROLE} calls in flight.")
+
+        # Token usage of the assembled context of every chapter task, keyed by (chapter_number, stage);
+        # the book bible of a stage is reported under (None, stage)
+        self.context_reports = {}
+        # Book bible of every chapter stage, the same for all chapters, keyed by stage
+        self.book_bibles = {}
+        # Tokens the longest chapter outline slice takes, reserved in every chapter task's budget
+        self.chapter_outline_tokens = 0
+        # The Memory Keeper task of every chapter, keyed by chapter number
+        self.memory_tasks = {}
+        # Quality report of every checked chapter text, keyed by (chapter_number, version)
+        self.quality_reports = {}
+        # pywriter scene plan of every chapter drafted in scene mode, keyed by chapter number
+        self.scene_plans = {}
+        # Scene IDs are unique across the book, as in a yWriter project
+        self.scene_ids = set()
+        # Final text of every written chapter, in the order they were saved
+        self.chapter_outputs = []
+        # Why each chapter that was not written failed, keyed by chapter number; part of the run summary
+        self.failed_chapters = {}
+
+        self._agents = None
+        self.outline_tasks = None
+        self.journal = None
+
+    @property
+    def agents(self):
+        """
+        The book's agents by name (see AGENT_NAMES), created on first use.
+        """
+        if self._agents is None:
+            self._agents = dict(zip(AGENT_NAMES, create_agents(self.model_to_use, self.num_chapters, "", self.genre_config)))
+        return self._agents
+
+    def register_task(self, key, task):
+        self.journal_keys[id(task)] = key
+        # The journal matches the description as created, before hooks add the story state,
+        # earlier passages or gate findings, which depend on when the task runs
+        self.journal_descriptions[id(task)] = task.description
+        return task
+
+    # Run a single task in its own crew; context comes from the task's own `context` list.
+    # Tasks already recorded in the run journal are restored instead of being run again.
+    def run_task(self, task):
+        for hook in self.before_task_hooks.get(id(task), []):
+            hook()
+
+        key = self.journal_keys.get(id(task))
+        recorded = self.journal.lookup(key, self.journal_descriptions[id(task)]) if key is not None else None
+        shortcut = self.task_shortcuts[id(task)]() if recorded is None and id(task) in self.task_shortcuts else None
+        with self.task_metrics.task(key or task.agent.role, task.agent.role, restored=recorded is not None or shortcut is not None) as task_record:
+            if recorded is not None:
+                logger.info(f"Reusing recorded output of task {key}")
+                restore_task_output(task, recorded)
+                result = recorded
+            elif shortcut is not None:
+                logger.info(f"Skipping the LLM call of task {key or task.agent.role}")
+                restore_task_output(task, shortcut)
+                result = shortcut
+            else:
+                def kickoff():
+                    task_crew = Crew(
+                        agents=[task.agent],
+                        tasks=[task],
+                        verbose=True,
+                        process=Process.sequential
+                    )
+                    # Retry waits happen outside the slots, so they do not hold up other books or tasks
+                    slot = self.task_gate.slot(self.name) if self.task_gate is not None else nullcontext()
+                    stream_path, stream_name = self.task_stream_paths.get(id(task), (None, None))
+                    with self.stage_slots.slot(self.stage_of(task)), slot, streaming_to(stream_path, label=self.journal_keys.get(id(task), task.agent.role), name=stream_name):
+                        return task_crew.kickoff()
+
+                # A failed task is retried on its own; the chapter's completed tasks are kept
+                result = call_with_retry(kickoff, task_retry_policy(), retryable=is_retryable_task_error,
+                                         label=f"Task {key or task.agent.role}")
+                if key is not None:
+                    self.journal.record(key, self.journal_descriptions[id(task)], task_output_text(task), agent=task.agent.role)
+            task_record["model"] = getattr(task.agent.llm, "model", None)
+            task_record.update(output_quality(task_output_text(task)))
+
+        for hook in self.after_task_hooks.get(id(task), []):
+            hook()
+        if self.metrics_file:
+            agent_metrics.write_prometheus(self.metrics_file)
+        return result
+
+    def stage_of(self, task):
+        """
+        The name a task's stage limit is kept under: its chapter stage's role, or its agent's role.
+        """
+        return self.task_stages.get(id(task), task.agent.role)
+
+    def run_tasks(self, tasks, max_workers, **options):
+        """
+        Runs a task graph with run_task; no new task starts while the backend's circuit is open.
+        """
+        return run_task_graph(tasks, self.run_task, max_workers=max_workers,
+                              admission=self.backend_circuit.wait_until_available, **options)
+
+    def chapter_output_path(self, chapter_number):
+        return os.path.join(self.output_folder, f"beach_story_chapter_{chapter_number}.html")
+
+    def start(self):
+        """
+        Opens the run journal (a new one, or the run being resumed) and the
+        book's output folder, story state, retrieval index and yw7 project.
+        """
+        logger.info(f"Using model: {self.model_to_use}")
+        logger.info(f"Using genre: {self.genre}")
+        logger.info(f"Number of chapters: {self.num_chapters}")
+        logger.info(f"Initial prompt: {self.initial_prompt}")
+        logger.info(f"Max concurrent tasks: {self.max_concurrent_tasks}")
+
+        # Create output folder if it doesn't exist
+        os.makedirs(self.output_folder, exist_ok=True)
+
+        run_metadata = {"model": self.model_to_use, "genre": self.genre, "num_chapters": self.num_chapters,
+                        "initial_prompt": self.initial_prompt,
+                        "role_models": {agent.role: getattr(agent.llm, "model", None) for agent in self.agents.values()}}
+        if self.resume:
+            run_dir = latest_run_dir(self.runs_folder) if self.resume == "latest" else self.resume
+            if run_dir is None or not os.path.isdir(run_dir):
+                raise SystemExit(f"No run to resume in {self.runs_folder}.")
+            self.journal = RunJournal(run_dir)
+            for name, value in run_metadata.items():
+                if self.journal.read_metadata().get(name) != value:
+                    logger.warning(f"Resumed run {run_dir} was started with a different {name}; changed tasks will run again.")
+            logger.info(f"Resuming run {run_dir} with {len(self.journal.completed_keys())} completed tasks")
+        else:
+            run_dir = new_run_dir(self.runs_folder)
+            self.journal = RunJournal(run_dir)
+            self.journal.write_metadata(**run_metadata)
+            clear_output_folder(self.output_folder)
+        self.run_dir = run_dir
+        logger.info(f"Run directory: {run_dir}")
+
+        # Load the models now rather than in the first chapter's first call
+        warm_up(run_metadata["role_models"].values())
+
+        # Rolling continuity record, updated by the Memory Keeper after every chapter.
+        # On resume it is rebuilt as the journaled Memory Keeper tasks are restored.
+        self.story_state = StoryState()
+        self.story_state_path = os.path.join(run_dir, "story_state.json")
+
+        # Passages of every written chapter, so the critic can check a chapter against earlier text
+        self.retrieval_index = RetrievalIndex(os.path.join(self.output_folder, "retrieval_index.json"),
+                                              passage_words=self.retrieval_passage_words)
+
+        self.yw7_sink = Yw7Sink(os.path.join(self.output_folder, "book.yw7"), self.book_title,
+                                author=os.getenv('BOOK_AUTHOR', ''), description=self.initial_prompt) if self.yw7_output else None
+
+    def build_outline_tasks(self):
+        """
+        Creates the outline crew's tasks, keyed by their journal key.
+        """
+        agents = self.agents
+        story_planning_task = Task(
+            description=f"""Develop a high-level story arc plan based on the initial premise: {self.initial_prompt}""",
+            expected_output="A story arc plan.",
+            agent=agents["story_planner"],
+            logger=comm_logger
+        )
+
+        setting_building_task = Task(
+            description="Establish the main setting for the story, including locations and world details.",
+            expected_output="Detailed setting descriptions.",
+            agent=agents["setting_builder"],
+            logger=comm_logger
+        )
+
+        character_development_task = Task(
+            description="Develop detailed profiles for 3 main characters, including full names, backstories, personalities, and relationships.",
+            expected_output="Comprehensive character profiles.",
+            agent=agents["character_agent"],
+            logger=comm_logger
+        )
+
+        relationship_architecture_task = Task(
+            description="Define the relationships and family structures between the main characters, detailing their dynamics and histories.",
+            expected_output="Detailed relationship dynamics and family structures.",
+            agent=agents["relationship_architect"],
+            context=[character_development_task],
+            logger=comm_logger
+        )
+
+        item_development_task = Task(
+            description="Develop a list of key items relevant to the story, detailing their descriptions and significance.",
+            expected_output="List of key items with descriptions.",
+            agent=agents["item_developer"],
+            logger=comm_logger
+        )
+
+        outline_creator_task = Task(
+            description=f"""Create a detailed chapter outline for each chapter, including chapter titles, key events, character developments, setting, and tone.
+                    Use the following for context:
+                    STORY ARC PLAN: {story_planning_task.output}
+                    SETTING DETAILS: {setting_building_task.output}
+                    CHARACTER PROFILES: {character_development_task.output}
+                    RELATIONSHIP DYNAMICS: {relationship_architecture_task.output}
+                    ITEM DESCRIPTIONS: {item_development_task.output}
+                    """,
+            expected_output="Detailed chapter outlines.",
+            agent=agents["outline_creator"],
+            context=[story_planning_task, setting_building_task, character_development_task, relationship_architecture_task, item_development_task],
+            logger=comm_logger
+        )
+
+        outline_compiler_task = Task(
+            description="""Compile the final book outline, integrating all previously generated content.
+                    Ensure the outline is well-structured, detailed, and follows the specified format.
+                    Output the ENTIRE outline, including all sections.
+                    Use the following for context:
+                    STORY ARC PLAN: {story_planning_task.output}
+                    SETTING DETAILS: {setting_building_task.output}
+                    CHARACTER PROFILES: {character_development_task.output}
+                    RELATIONSHIP DYNAMICS: {relationship_architecture_task.output}
+                    ITEM DESCRIPTIONS: {item_development_task.output}
+                    CHAPTER OUTLINES: {outline_creator_task.output}
+                    """,
+            expected_output="A complete and cohesive book outline document.",
+            agent=agents["outline_compiler"],
+            context=[story_planning_task, setting_building_task, character_development_task, relationship_architecture_task, item_development_task, outline_creator_task],
+            logger=comm_logger
+        )
+
+        outline_tasks = {
+            "outline-story-planning": story_planning_task,
+            "outline-setting-building": setting_building_task,
+            "outline-character-development": character_development_task,
+            "outline-relationship-architecture": relationship_architecture_task,
+            "outline-item-development": item_development_task,
+            "outline-chapter-outlines": outline_creator_task,
+            "outline-compiler": outline_compiler_task,
+        }
+        for key, task in outline_tasks.items():
+            self.register_task(key, task)
+        return outline_tasks
+
+    def generate_outline(self):
+        """
+        Runs the outline crew, saves outline.txt and indexes the compiled outline by chapter.
+        """
+        self.outline_tasks = self.build_outline_tasks()
+        outline_compiler_task = self.outline_tasks["outline-compiler"]
+
+        print(" ভূমিক্স######################")
+        print("Starting outline generation...")
+        # Independent outline tasks (story arc, setting, characters, items) run concurrently
+        outline_results = self.run_tasks(list(self.outline_tasks.values()), self.max_concurrent_tasks)
+        outline = outline_results[id(outline_compiler_task)]
+        print("Outline generation complete.")
+        print("######################")
+
+        # Output outline to a text file
+        outline_text_file = os.path.join(self.output_folder, "outline.txt")
+        with open(outline_text_file, "w") as f:
+            f.write(str(outline))
+        logger.info(f"Outline saved to {outline_text_file}")
+
+        # Get the outline text for chapter tasks context
+        if outline_compiler_task.output:
+            self.outline_text = task_output_text(outline_compiler_task)
+        else:
+            self.outline_text = "No outline generated."
+        logger.info(f"Outline Context for Chapter Tasks: {self.outline_text[:100]}...") # Log first 100 chars of outline
+
+        # Split the compiled outline once, so each chapter task only gets its own chapter and its neighbours
+        self.outline_index = OutlineIndex.parse(self.outline_text)
+        if len(self.outline_index) < self.num_chapters:
+            logger.warning(f"Only {len(self.outline_index)} of {self.num_chapters} chapters found in the outline; missing chapters get the full outline.")
+            self.chapter_outline_tokens = estimate_tokens(self.outline_text)
+        else:
+            self.chapter_outline_tokens = max(estimate_tokens(self.outline_index.slice(number, neighbors=self.outline_neighbors))
+                                              for number in range(1, self.num_chapters + 1))
+
+    # Fit the outline crew's material and the chapter's outline into one chapter task's token budget.
+    # `priorities` lists section titles from most to least important for that stage. Returns
+    # (book_bible, chapter_outline): the book bible is assembled once per stage, within the budget
+    # left after reserving room for the longest chapter outline, so every chapter's task of a stage
+    # starts with the same text and the model server can reuse its KV cache for it.
+    def chapter_context(self, chapter_number, stage, outline_context, priorities, output_tokens, upstream_tokens=0):
+        budget = context_budget(self.context_window_size, output_tokens=output_tokens, upstream_tokens=upstream_tokens)
+        outline_budget = min(self.chapter_outline_tokens + estimate_tokens("CHAPTER OUTLINE:\n"), budget // 2)
+
+        if stage not in self.book_bibles:
+            sections = [
+                ContextSection("STORY ARC PLAN", task_output_text(self.outline_tasks["outline-story-planning"])),
+                ContextSection("SETTING DETAILS", task_output_text(self.outline_tasks["outline-setting-building"])),
+                ContextSection("CHARACTER PROFILES", task_output_text(self.outline_tasks["outline-character-development"])),
+                ContextSection("RELATIONSHIP DYNAMICS", task_output_text(self.outline_tasks["outline-relationship-architecture"])),
+                ContextSection("ITEM DESCRIPTIONS", task_output_text(self.outline_tasks["outline-item-development"])),
+            ]
+            for section in sections:
+                section.priority = priorities.index(section.title) if section.title in priorities else len(priorities)
+            bible, report = assemble_context(sections, budget - outline_budget, label=f"Book bible {stage}")
+            self.book_bibles.setdefault(stage, bible)
+            self.context_reports[(None, stage)] = report
+
+        chapter_outline = self.outline_index.slice(chapter_number, neighbors=self.outline_neighbors)
+        if chapter_outline:
+            outline_section = ContextSection("CHAPTER OUTLINE", chapter_outline)
+        else:
+            outline_section = ContextSection("Overall Book Outline", outline_context)
+        text, report = assemble_context([outline_section], outline_budget, label=f"Chapter {chapter_number} {stage}")
+        self.context_reports[(chapter_number, stage)] = report
+        return self.book_bibles[stage], text
+
+    # A chapter task's description: the stage's instruction and book bible, the same for every chapter,
+    # then what is specific to this chapter
+    def chapter_prompt(self, instruction, context, chapter_number, *notes):
+        bible, chapter_outline = context
+        return layered_prompt(instruction, ("BOOK BIBLE", bible),
+                              (f"CHAPTER {chapter_number}", "\n".join(part for part in (chapter_outline,) + notes if part)))
+
+    # Append the story state digest to a task's description right before it runs,
+    # so it reflects every chapter finished by then
+    def inject_story_state(self, task, heading):
+        base_description = task.description
+        def prepare():
+            digest = self.story_state.digest(self.story_state_tokens)
+            task.description = f"{base_description}\n                    {heading}:\n{digest}" if digest else base_description
+        add_task_hook(self.before_task_hooks, task, prepare)
+
+    # Append the earlier passages most relevant to a chapter's characters, locations and items
+    # to the critic's description right before it runs
+    def inject_earlier_passages(self, task, chapter_number):
+        def prepare():
+            chapter = self.outline_index.get(chapter_number)
+            names = list(self.story_state.characters) + list(self.story_state.items)
+            if chapter is not None:
+                names += [chapter.character_developments, chapter.setting] + chapter.items
+            results = self.retrieval_index.query(" ".join(names), k=self.retrieval_top_k, before_chapter=chapter_number)
+            if results:
+                task.description = f"{task.description}\n                    Relevant Passages From Earlier Chapters:\n{format_passages(results)}"
+            logger.info(f"Chapter {chapter_number} critic: {len(results)} earlier passages retrieved")
+        add_task_hook(self.before_task_hooks, task, prepare)
+
+    def check_chapter_quality(self, chapter_number, text, version):
+        chapter = self.outline_index.get(chapter_number)
+        report = assess_chapter(text, chapter.key_events if chapter is not None else [], self.genre_config)
+        self.quality_reports[(chapter_number, version)] = report.to_dict()
+        logger.info(f"Chapter {chapter_number} {version} quality gate: {report.summary()}")
+        return report
+
+    # Let the critic and reviser pass a chapter's draft through unchanged when it needs no revision
+    def skip_revision_of_good_drafts(self, chapter_number, tasks):
+        # The draft is checked once, when the critic stage comes up: the write stage
+        # and its length control are done by then, and the draft no longer changes
+        draft = {}
+        def draft_report():
+            if "report" not in draft:
+                draft["report"] = self.check_chapter_quality(chapter_number, task_output_text(tasks["write"]), "draft")
+            return draft["report"]
+
+        def draft_passes():
+            if self.max_revision_iterations <= 0:
+                return True
+            if not self.quality_gate_enabled:
+                return False
+            return draft_report().passed
+
+        self.task_shortcuts[id(tasks["critic"])] = lambda: "The draft passed the quality checks; no revision needed." if draft_passes() else None
+        self.task_shortcuts[id(tasks["revise"])] = lambda: task_output_text(tasks["write"]) if draft_passes() else None
+
+        # A draft that fails the checks is critiqued with the failures in hand
+        def add_gate_findings():
+            if self.quality_gate_enabled and self.max_revision_iterations > 0 and not draft_report().passed:
+                tasks["critic"].description += f"\n                    Automated checks flagged: {draft_report().summary()}"
+        add_task_hook(self.before_task_hooks, tasks["critic"], add_gate_findings)
+
+    # After the first revision, run further critic/revise rounds while the revision still fails the
+    # quality gate; the last revision becomes the revise stage's output
+    def add_revision_rounds(self, chapter_number, tasks):
+        def revise_again():
+            latest = tasks["revise"]
+            for iteration in range(2, self.max_revision_iterations + 1):
+                if not self.quality_gate_enabled:
+                    break
+                report = self.check_chapter_quality(chapter_number, task_output_text(latest), f"revision {iteration - 1}")
+                if report.passed:
+                    break
+                critic_task = Task(
+                    description=layered_prompt("Critically review the revised chapter again. Point out exactly what the next revision has to change.",
+                                               (f"CHAPTER {chapter_number}", f"Automated checks still flag: {report.summary()}")),
+                    expected_output="Focused feedback for another revision of the chapter.",
+                    agent=self.agents["critic"],
+                    context=[latest, tasks["outline"]],
+                    logger=comm_logger
+                )
+                revise_task = Task(
+                    description=f"""Revise the chapter once more based on the Critic's latest feedback. Keep what works and fix what the feedback points out. This is chapter {chapter_number}.""",
+                    expected_output="Revised chapter content in HTML format.",
+                    agent=self.agents["reviser"],
+                    context=[critic_task, latest, tasks["outline"]],
+                    logger=comm_logger
+                )
+                self.register_task(f"chapter-{chapter_number}-critic-{iteration}", critic_task)
+                self.register_task(f"chapter-{chapter_number}-revise-{iteration}", revise_task)
+                if self.stream_chapters:
+                    self.task_stream_paths[id(revise_task)] = (self.chapter_output_path(chapter_number), f"revise-{iteration}")
+                # Through the scheduler, so the rounds wait for the Critic and Reviser stage slots and an open circuit
+                self.run_tasks([critic_task, revise_task], 1)
+                latest = revise_task
+            if latest is not tasks["revise"]:
+                restore_task_output(tasks["revise"], task_output_text(latest))
+        add_task_hook(self.after_task_hooks, tasks["revise"], revise_again)
+
+    def enforce_chapter_length(self, chapter_number, tasks, stage_name):
+        task = tasks[stage_name]
+        min_words = self.genre_config.min_words
+        max_words = self.genre_config.max_words
+
+        def control_length():
+            text = task_output_text(task)
+            words = count_words(text)
+            for attempt in range(1, self.max_continuations + 1):
+                if words >= min_words:
+                    break
+                missing = min(max_words - words, int((min_words - words) * 1.1))
+                continuation_task = Task(
+                    description=layered_prompt("Continue the chapter from exactly where it stops, following the refined chapter outline. Do not repeat or summarize what is already written; reply with the new text only.",
+                                               (f"CHAPTER {chapter_number}", f"Write about {missing} more words that carry the chapter to its planned ending.\nThe chapter so far ends with:\n{ending(text, self.continuation_context_words)}")),
+                    expected_output=f"About {missing} words continuing the chapter, in HTML format.",
+                    agent=self.agents["writer"],
+                    context=[tasks["outline"]],
+                    logger=comm_logger
+                )
+                self.register_task(f"chapter-{chapter_number}-{stage_name}-continue-{attempt}", continuation_task)
+                # Through the scheduler, so the continuation waits for a Writer stage slot and an open circuit
+                self.run_tasks([continuation_task], 1)
+                text = append_continuation(text, task_output_text(continuation_task))
+                logger.info(f"Chapter {chapter_number} {stage_name}: continued from {words} to {count_words(text)} words")
+                words = count_words(text)
+            if words > max_words:
+                text = trim_to_words(text, max_words)
+                logger.info(f"Chapter {chapter_number} {stage_name}: trimmed from {words} to {count_words(text)} words")
+            if text != task_output_text(task):
+                restore_task_output(task, text)
+
+        if self.length_control_enabled:
+            add_task_hook(self.after_task_hooks, task, control_length)
+
+    def draft_scenes_before_writing(self, chapter_number, tasks, scene_brief_context):
+        min_words = self.genre_config.min_words
+        max_words = self.genre_config.max_words
+
+        def draft_scenes():
+            write_task = tasks["write"]
+            chapter = self.outline_index.get(chapter_number)
+            specs = parse_scenes(task_output_text(tasks["outline"]))
+            if not specs and chapter is not None:
+                specs = scenes_from_key_events(chapter.key_events, chapter.setting)
+            if len(specs) < 2:
+                logger.info(f"Chapter {chapter_number}: no scene breakdown, drafting the chapter in one call")
+                return
+            plan = ScenePlan(chapter_number, specs[:self.max_scenes], taken_ids=self.scene_ids)
+            scene_words = (min_words + max_words) // (2 * len(plan))
+            digest = self.story_state.digest(self.story_state_tokens)
+
+            scene_tasks = []
+            for position, (scene_id, scene) in enumerate(plan.ordered(), start=1):
+                scene_task = Task(
+                    # Scenes of one chapter share everything up to their own brief
+                    description=self.chapter_prompt("Draft one scene of the chapter: write only this scene, with vivid prose and engaging dialogue, without retelling the scenes before or after it.",
+                                                    scene_brief_context, chapter_number,
+                                                    f"Story State So Far:\n{digest}" if digest else "",
+                                                    f"This scene, about {scene_words} words:\n{plan.brief(scene_id)}"),
+                    expected_output=f"About {scene_words} words of scene prose in HTML format.",
+                    agent=self.agents["writer"],
+                    context=[tasks["outline"], tasks["research"]],
+                    logger=comm_logger
+                )
+                self.register_task(f"chapter-{chapter_number}-scene-{position}", scene_task)
+                # Under their own stage limit: the Writer's (one slot by default in pipeline mode) would draft them one by one
+                self.task_stages[id(scene_task)] = SCENE_STAGE
+                scene_tasks.append(scene_task)
+
+            logger.info(f"Chapter {chapter_number}: drafting {len(scene_tasks)} scenes, {self.scene_concurrency} at a time")
+            self.run_tasks(scene_tasks, self.scene_concurrency)
+            for (scene_id, scene), scene_task in zip(plan.ordered(), scene_tasks):
+                plan.set_draft(scene_id, task_output_text(scene_task))
+            self.scene_plans[chapter_number] = plan
+
+            # The writer now stitches the drafts instead of writing the chapter from scratch
+            write_task.description = write_task.description.replace(WRITE_INSTRUCTION, STITCH_INSTRUCTION, 1)
+            write_task.context = scene_tasks + [tasks["outline"]]
+        add_task_hook(self.before_task_hooks, tasks["write"], draft_scenes)
+
+    # Create the tasks of one chapter, keyed by CHAPTER_STAGES name
+    def create_chapter_tasks(self, chapter_number, outline_context):
+        agents = self.agents
+        min_words = self.genre_config.min_words
+        max_words = self.genre_config.max_words
+        chapter_tokens = words_to_tokens(max_words)
+        story_state_tokens = self.story_state_tokens
+
+        # Outline crew material is inlined within each task's token budget instead of attached as full context
+        research_context = self.chapter_context(chapter_number, "research", outline_context,
+                                                ["SETTING DETAILS", "ITEM DESCRIPTIONS", "STORY ARC PLAN"],
+                                                output_tokens=STAGE_OUTPUT_TOKENS)
+        outline_stage_context = self.chapter_context(chapter_number, "outline", outline_context,
+                                                     ["STORY ARC PLAN", "CHARACTER PROFILES", "SETTING DETAILS", "RELATIONSHIP DYNAMICS", "ITEM DESCRIPTIONS"],
+                                                     output_tokens=STAGE_OUTPUT_TOKENS)
+        # In scene mode the writer stitches the scene drafts, which together are about a chapter long
+        write_upstream_tokens = (chapter_tokens if self.scene_mode else STAGE_OUTPUT_TOKENS) + STAGE_OUTPUT_TOKENS + story_state_tokens
+        write_context = self.chapter_context(chapter_number, "write", outline_context,
+                                             ["CHARACTER PROFILES", "SETTING DETAILS", "RELATIONSHIP DYNAMICS", "ITEM DESCRIPTIONS", "STORY ARC PLAN"],
+                                             output_tokens=chapter_tokens, upstream_tokens=write_upstream_tokens)
+        critic_context = self.chapter_context(chapter_number, "critic", outline_context,
+                                              ["CHARACTER PROFILES", "STORY ARC PLAN", "RELATIONSHIP DYNAMICS", "SETTING DETAILS"],
+                                              output_tokens=STAGE_OUTPUT_TOKENS,
+                                              upstream_tokens=chapter_tokens + STAGE_OUTPUT_TOKENS + story_state_tokens + words_to_tokens(self.retrieval_top_k * self.retrieval_passage_words))
+        revise_context = self.chapter_context(chapter_number, "revise", outline_context,
+                                              ["CHARACTER PROFILES"],
+                                              output_tokens=chapter_tokens, upstream_tokens=chapter_tokens + 2 * STAGE_OUTPUT_TOKENS + story_state_tokens)
+        edit_context = self.chapter_context(chapter_number, "edit", outline_context,
+                                            ["CHARACTER PROFILES"],
+                                            output_tokens=chapter_tokens, upstream_tokens=chapter_tokens + STAGE_OUTPUT_TOKENS)
+
+        if self.scene_mode:
+            scene_brief_context = self.chapter_context(chapter_number, "scene", outline_context,
+                                                       ["CHARACTER PROFILES", "SETTING DETAILS", "ITEM DESCRIPTIONS"],
+                                                       output_tokens=words_to_tokens(max_words // 2),
+                                                       upstream_tokens=2 * STAGE_OUTPUT_TOKENS + story_state_tokens)
+
+        # Every stage gets the outputs of its CHAPTER_STAGES inputs as context
+        tasks = {}
+
+        tasks["research"] = Task(
+            description=self.chapter_prompt("Research specific details needed for the chapter, based on the chapter outline and overall story context. Pay special attention to details about beach activities, marine life, and coastal weather patterns.",
+                                            research_context, chapter_number),
+            expected_output="Research findings and specific details for chapter.",
+            agent=agents["researcher"],
+            context=stage_inputs("research", tasks),
+            logger=comm_logger
+        )
+
+        tasks["outline"] = Task(
+            description=self.chapter_prompt("Refine and detail the chapter outline, based on the overall book outline and incorporating genre-specific elements. Expand on key events, character developments, setting details, and tone for this chapter." + (f"""
+                        End with a breakdown of the chapter into {self.max_scenes} scenes at most, one block per scene, in exactly this format:
+{SCENE_FORMAT}""" if self.scene_mode else ""), outline_stage_context, chapter_number),
+            expected_output="Detailed and refined chapter outline.",
+            agent=agents["outline_creator"],
+            context=stage_inputs("outline", tasks),
+            logger=comm_logger
+        )
+
+        tasks["write"] = Task(
+            description=self.chapter_prompt(f"""{WRITE_INSTRUCTION}
+                        Ensure chapter is at least {min_words} words and not exceeding {max_words} words.""", write_context, chapter_number),
+            expected_output="Complete draft of chapter content in HTML format.",
+            agent=agents["writer"],
+            context=stage_inputs("write", tasks),
+            logger=comm_logger
+        )
+
+        tasks["critic"] = Task(
+            description=self.chapter_prompt("Critically review the chapter draft for plot holes, inconsistencies, pacing issues, and areas for improvement in narrative structure and character development. Evaluate scene order and suggest reordering for better flow and impact.",
+                                            critic_context, chapter_number),
+            expected_output="Constructive criticism and feedback on chapter draft, including scene reordering suggestions.",
+            agent=agents["critic"],
+            context=stage_inputs("critic", tasks),
+            logger=comm_logger
+        )
+
+        tasks["revise"] = Task(
+            description=self.chapter_prompt("Revise the chapter draft based on the Critic's feedback. Ensure revisions improve coherence, consistency, and polish. Incorporate scene reordering suggestions and rewrite transitions for smooth flow.",
+                                            revise_context, chapter_number),
+            expected_output="Revised chapter content in HTML format.",
+            agent=agents["reviser"],
+            context=stage_inputs("revise", tasks),
+            logger=comm_logger
+        )
+
+        tasks["edit"] = Task(
+            description=self.chapter_prompt(f"""Edit the revised chapter for grammar, style, clarity, and adherence to the chapter outline and word count requirements. Return the complete edited chapter, well-written and free of errors.
+                        Word count should be between {min_words} and {max_words} words.""", edit_context, chapter_number),
+            expected_output="Final edited chapter content in HTML format.",
+            agent=agents["editor"],
+            context=stage_inputs("edit", tasks),
+            logger=comm_logger
+        )
+
+        tasks["memory"] = Task(
+            description=f"""Update the story state after the chapter. Compare the final chapter with the current story state and record what is true at the end of this chapter, using exactly this format:
+{UPDATE_FORMAT}
+                        Only list characters and items whose state changed in this chapter. Keep every entry to a single line.
+                        This is chapter {chapter_number}.""",
+            expected_output="Story state update in the requested format.",
+            agent=agents["memory_keeper"],
+            context=stage_inputs("memory", tasks),
+            logger=comm_logger
+        )
+
+        missing = [stage.name for stage in CHAPTER_STAGES if stage.name not in tasks]
+        if missing:
+            raise StageGraphError(f"No task created for chapter stages {missing}.")
+        final_task = tasks[FINAL_STAGE.name]
+        memory_task = tasks["memory"]
+
+        # Fold the Memory Keeper's update into the story state once it is available
+        def update_story_state():
+            self.story_state.apply_update(chapter_number, task_output_text(memory_task))
+            self.story_state.save(self.story_state_path)
+        add_task_hook(self.after_task_hooks, memory_task, update_story_state)
+
+        self.inject_story_state(tasks["write"], "Story State So Far")
+        self.inject_story_state(tasks["critic"], "Story State So Far (check the chapter against it)")
+        self.inject_story_state(tasks["revise"], "Story State So Far")
+        self.inject_story_state(memory_task, "Current Story State")
+        self.inject_earlier_passages(tasks["critic"], chapter_number)
+        if self.scene_mode:
+            self.draft_scenes_before_writing(chapter_number, tasks, scene_brief_context)
+        self.skip_revision_of_good_drafts(chapter_number, tasks)
+        self.add_revision_rounds(chapter_number, tasks)
+
+        # The draft is brought to length before it is judged, the final text before it is saved
+        self.enforce_chapter_length(chapter_number, tasks, "write")
+        self.enforce_chapter_length(chapter_number, tasks, FINAL_STAGE.name)
+
+        # Index the final chapter text as soon as it lands, for the critics of later chapters
+        add_task_hook(self.after_task_hooks, final_task, lambda: self.retrieval_index.add_chapter(chapter_number, task_output_text(final_task)))
+        if self.yw7_sink is not None:
+            add_task_hook(self.after_task_hooks, final_task, lambda: self.save_chapter_to_yw7(chapter_number, final_task))
+        # Each chapter is written out as soon as its final text is in, not after the whole book
+        add_task_hook(self.after_task_hooks, final_task, lambda: self.write_chapter_output(chapter_number, tasks))
+
+        # The next chapter is written against this chapter's story state, and states are updated in chapter order
+        previous_memory_task = self.memory_tasks.get(chapter_number - 1)
+        if previous_memory_task is not None:
+            self.task_after[id(tasks["write"])] = [previous_memory_task]
+            self.task_after[id(memory_task)] = [previous_memory_task]
+        self.memory_tasks[chapter_number] = memory_task
+
+        for stage in CHAPTER_STAGES:
+            if tasks[stage.name].agent.role != stage.role:
+                raise StageGraphError(f"Chapter stage {stage.name!r} is run by the {tasks[stage.name].agent.role}, not the {stage.role}.")
+            self.task_stages[id(tasks[stage.name])] = stage.role
+            if self.stream_chapters and stage.produces_text:
+                self.task_stream_paths[id(tasks[stage.name])] = (self.chapter_output_path(chapter_number), stage.name)
+            self.register_task(f"chapter-{chapter_number}-{stage.name}", tasks[stage.name])
+
+        return tasks
+
+    def save_chapter_to_yw7(self, chapter_number, final_task):
+        """
+        Adds the finished chapter to the yw7 project. A failed save is logged; the
+        chapter's HTML file is still written.
+        """
+        chapter = self.outline_index.get(chapter_number)
+        title = chapter.title if chapter is not None else None
+        try:
+            self.yw7_sink.add_chapter(chapter_number, task_output_text(final_task), title=title,
+                                      scene_plan=self.scene_plans.get(chapter_number))
+        except Exception:
+            logger.exception(f"Could not save Chapter {chapter_number} to {self.yw7_sink.path}.")
+
+    # Save the final stage's output of a finished chapter as an HTML file. A failed save is
+    # logged, so the tasks of the other chapters go on.
+    def write_chapter_output(self, chapter_number, chapter_tasks):
+        try:
+            self.save_chapter_html(chapter_number, chapter_tasks)
+        except Exception as e:
+            logger.exception(f"An error occurred while saving Chapter {chapter_number}.")
+            self.failed_chapters[chapter_number] = f"saving it failed: {e}"
+
+    def save_chapter_html(self, chapter_number, chapter_tasks):
+        final_task = chapter_tasks[FINAL_STAGE.name]
+        logger.debug(f"Debug: {FINAL_STAGE.name} output: {log_content(final_task.output)}")
+
+        if final_task.output:
+            chapter_content = task_output_text(final_task)
+            self.chapter_outputs.append(chapter_content)
+            logger.info(f"Successfully generated content for Chapter {chapter_number}")
+            logger.debug(f"Raw chapter content: {log_content(chapter_content)}")
+
+            # Post-process the chapter content to add paragraph tags
+            paragraphs = str(chapter_content).split("\n\n")
+            formatted_paragraphs = [f"<p>{p.strip()}</p>" for p in paragraphs if p.strip()]
+            formatted_text = "\n".join(formatted_paragraphs)
+            logger.debug(f"Formatted chapter content: {log_content(formatted_text)}")
+
+            # Wrap the chapter in basic HTML tags
+            html_content = f"""<!DOCTYPE html>
+            <html>
+            <head>
+                <title>A Day at the Beach - Chapter {chapter_number}</title>
+            </head>
+            <body>
+                <h1>Chapter {chapter_number}</h1>
+                {formatted_text}
+            </body>
+            </html>"""
+
+            # Define the output file path for the chapter
+            output_file = self.chapter_output_path(chapter_number)
+
+            # Output the chapter to an HTML file; the live views of its streamed stages are done with
+            atomic_write(output_file, html_content)
+            for stream_path, stream_name in self.task_stream_paths.values():
+                if stream_path == output_file and os.path.exists(partial_path(stream_path, stream_name)):
+                    os.remove(partial_path(stream_path, stream_name))
+            logger.info(f"Chapter {chapter_number} written to {output_file}")
+        else:
+            logger.error(f"Chapter {chapter_number} generation failed. No output file created.")
+
+    def generate_chapters(self):
+        """
+        Creates and runs the tasks of every chapter and writes each finished chapter out.
+        """
+        logger.info(f"Context window size: {self.context_window_size}")
+        # Check if the model_to_use is an Ollama model
+        if self.model_to_use.startswith("ollama/"):
+            if self.context_window_size < 4096:
+                logger.warning("Using Ollama model with context window size less than 4096. Consider increasing OLLAMA_CONTEXT_WINDOW in .env for potentially better results.")
+            if self.context_window_size > 4096:
+                logger.info("Using Ollama model with context window size greater than 4096.")
+        logger.info(f"Chapter stages: {' -> '.join(stage.name for stage in CHAPTER_STAGES)}; final text from {FINAL_STAGE.name}")
+
+        logger.info(f"Chapter pipeline: {self.chapter_pipeline}, stage limits: {self.stage_limits}")
+        if self.chapter_pipeline:
+            chapter_task_lists = {}
+            for chapter_number in range(1, self.num_chapters + 1):
+                try:
+                    chapter_task_lists[chapter_number] = self.create_chapter_tasks(chapter_number, self.outline_text)
+                except Exception as e:
+                    logger.exception(f"An error occurred while creating the tasks for Chapter {chapter_number}.")
+                    self.failed_chapters[chapter_number] = f"creating its tasks failed: {e}"
+
+            # Chapters are queued in order, so a free stage always picks up the earliest chapter first
+            self.run_tasks(
+                [task for chapter_tasks in chapter_task_lists.values() for task in chapter_tasks.values()],
+                self.max_concurrent_tasks,
+                stage_of=self.stage_of,
+                stage_limits=self.stage_limits,
+                default_stage_limit=1,
+                fail_fast=False, # A failed task only drops the chapter it belongs to
+                after=self.task_after
+            )
+            for chapter_number, chapter_tasks in chapter_task_lists.items():
+                if not chapter_tasks[FINAL_STAGE.name].output:
+                    self.failed_chapters[chapter_number] = "a task failed or was skipped"
+
+        else:
+            # Loop through each chapter and create a crew to write it
+            for chapter_number in range(1, self.num_chapters + 1):
+                try:
+                    chapter_tasks = self.create_chapter_tasks(chapter_number, self.outline_text)
+                    # One task at a time; completed tasks are restored from the run journal
+                    self.run_tasks(list(chapter_tasks.values()), 1, after=self.task_after)
+                    logger.info(f"Chapter {chapter_number} generation complete.")
+
+                except Exception as e:
+                    logger.exception(f"An error occurred during generation of Chapter {chapter_number}.")
+                    self.failed_chapters[chapter_number] = f"{type(e).__name__}: {e}"
+                    continue  # Move to the next chapter once a task has failed all its retries
+
+        if self.failed_chapters:
+            logger.error(f"{len(self.failed_chapters)} of {self.num_chapters} chapters were not written: "
+                         + "; ".join(f"Chapter {number}: {reason}" for number, reason in sorted(self.failed_chapters.items())))
+
+    def save_reports(self):
+        if self.benchmark_report:
+            sections = {"quality": {f"chapter-{number} {version}": result for (number, version), result in self.quality_reports.items()},
+                        "failed_chapters": {f"chapter-{number}": reason for number, reason in sorted(self.failed_chapters.items())}}
+            if self.process_metrics:
+                sections.update(agents=agent_metrics.snapshot(), prefix_reuse=prefix_reuse.snapshot())
+            report = self.task_metrics.save_report(self.benchmark_report, sections=sections, model=self.model_to_use, genre=self.genre, num_chapters=self.num_chapters,
+                                                   chapter_pipeline=self.chapter_pipeline, max_concurrent_tasks=self.max_concurrent_tasks)
+            logger.info(f"Benchmark report written to {self.benchmark_report}: {report['totals']}")
+
+        if self.process_metrics:
+            log_prefix_reuse()
+            if self.metrics_file:
+                agent_metrics.write_prometheus(self.metrics_file)
+
+    def run(self):
+        """
+        Generates the whole book: outline, chapters, then the benchmark and metrics reports.
+        """
+        self.start()
+        self.generate_outline()
+        self.generate_chapters()
+        self.save_reports()
@@ -0,0 +1,79 @@
+class StageGraphError(ValueError):
+    pass
+
+
+class ChapterStage:
+    """
+    One LLM call of the chapter pipeline, made by the agent with `role`; the
+    role is also the name of its stage limit (see STAGE_CONCURRENCY). `inputs`
+    names the earlier stages whose output it is given as context.
+    `produces_text` marks stages that return the full chapter text;
+    `side_effect` marks stages whose output is used outside the pipeline
+    (e.g. the story state) rather than by a later stage.
+    """
+
+    def __init__(self, name, role, inputs=(), produces_text=False, side_effect=False):
+        self.name = name
+        self.role = role
+        self.inputs = tuple(inputs)
+        self.produces_text = produces_text
+        self.side_effect = side_effect
+
+    def __repr__(self):
+        return f"ChapterStage({self.name!r}, inputs={list(self.inputs)})"
+
+
+# research -> outline -> write -> critic -> revise -> edit; the edited text is the chapter
+CHAPTER_STAGES = (
+    ChapterStage("research", "Researcher"),
+    ChapterStage("outline", "Outline Creator"),
+    ChapterStage("write", "Writer", inputs=("outline", "research"), produces_text=True),
+    ChapterStage("critic", "Critic", inputs=("write", "outline")),
+    ChapterStage("revise", "Reviser", inputs=("critic", "write", "outline"), produces_text=True),
+    ChapterStage("edit", "Editor", inputs=("revise", "outline"), produces_text=True),
+    ChapterStage("memory", "Memory Keeper", inputs=("edit",), side_effect=True),
+)
+
+
+def validate_stage_graph(stages):
+    """
+    Checks that the stages form a pipeline in which every output is used and
+    returns the final stage: the last one that produces the chapter text.
+
+    Raises StageGraphError for duplicate stage names, inputs that name an
+    unknown or later stage, and stages whose output nothing consumes.
+    """
+    seen = set()
+    for stage in stages:
+        if stage.name in seen:
+            raise StageGraphError(f"Duplicate chapter stage {stage.name!r}.")
+        for name in stage.inputs:
+            if name not in seen:
+                known = {s.name for s in stages}
+                problem = "a later stage" if name in known else "an unknown stage"
+                raise StageGraphError(f"Chapter stage {stage.name!r} takes input from {problem} {name!r}.")
+        seen.add(stage.name)
+
+    text_stages = [stage for stage in stages if stage.produces_text]
+    if not text_stages:
+        raise StageGraphError("No chapter stage produces the chapter text.")
+    final = text_stages[-1]
+
+    consumed = {name for stage in stages for name in stage.inputs}
+    for stage in stages:
+        if stage is not final and not stage.side_effect and stage.name not in consumed:
+            raise StageGraphError(f"The output of chapter stage {stage.name!r} is never used.")
+    return final
+
+
+def stage_inputs(stage_name, tasks, stages=CHAPTER_STAGES):
+    """
+    Returns the tasks in `tasks` (keyed by stage name) that `stage_name` takes as context.
+    """
+    stage = next((s for s in stages if s.name == stage_name), None)
+    if stage is None:
+        raise StageGraphError(f"Unknown chapter stage {stage_name!r}.")
+    missing = [name for name in stage.inputs if name not in tasks]
+    if missing:
+        raise StageGraphError(f"Chapter stage {stage_name!r} needs {missing} to be created first.")
+    return [tasks[name] for name in stage.inputs]
@@ -0,0 +1,115 @@
+import re
+import logging
+
+logger = logging.getLogger("ContextAssembler")
+
+# Rough size of one token in characters for English prose; no tokenizer is needed for budgeting
+CHARS_PER_TOKEN = 4
+# Tokens per word of generated English prose
+TOKENS_PER_WORD = 1.35
+TRUNCATION_MARKER = "[...]"
+
+
+def estimate_tokens(text):
+    """
+    Returns an estimate of the number of tokens in `text`.
+    """
+    return (len(text or "") + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def words_to_tokens(words):
+    return int(words * TOKENS_PER_WORD)
+
+
+def context_budget(context_window_size, output_tokens=0, upstream_tokens=0, overhead_tokens=600):
+    """
+    Returns the number of tokens left for assembled context in one task prompt.
+
+    The model's context window has to hold the agent's system prompt and task
+    instructions (`overhead_tokens`), the outputs of upstream tasks crewai
+    appends as context (`upstream_tokens`) and the response (`output_tokens`).
+    """
+    return max(256, context_window_size - output_tokens - upstream_tokens - overhead_tokens)
+
+
+def truncate_to_tokens(text, max_tokens):
+    """
+    Cuts `text` down to about `max_tokens`, at a line or sentence boundary where possible.
+    """
+    text = (text or "").strip()
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    limit = max(0, max_tokens * CHARS_PER_TOKEN - len(TRUNCATION_MARKER) - 1)
+    cut = text[:limit]
+    boundary = max(cut.rfind("\n"), cut.rfind(". "))
+    if boundary > limit // 2:
+        cut = cut[:boundary + 1]
+    return f"{cut.rstrip()}\n{TRUNCATION_MARKER}" if cut.strip() else ""
+
+
+def summarize_to_tokens(text, max_tokens):
+    """
+    Extractive digest of `text`: headings, list items and the first sentence
+    of every paragraph, in their original order, cut to `max_tokens`.
+    """
+    text = (text or "").strip()
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    kept = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        for line in paragraph.strip().split("\n"):
+            line = line.strip()
+            if not line:
+                continue
+            if line.endswith(":") or line.startswith(("-", "*", "#")) or len(line) < 80:
+                kept.append(line)
+            else:
+                kept.append(re.split(r"(?<=[.!?])\s", line, maxsplit=1)[0])
+    return truncate_to_tokens("\n".join(kept), max_tokens)
+
+
+class ContextSection:
+    """
+    One named block of context. Lower `priority` values are filled first.
+    Sections that do not fit are summarized, or dropped if less than
+    `min_tokens` of budget is left for them.
+    """
+
+    def __init__(self, title, text, priority=0, min_tokens=64):
+        self.title = title
+        self.text = (text or "").strip()
+        self.priority = priority
+        self.min_tokens = min_tokens
+
+
+def assemble_context(sections, budget, label=""):
+    """
+    Fits `sections` into `budget` tokens.
+
+    Returns (text, report): the assembled context, in the order the sections
+    were given, and a dict with the tokens used per section and in total.
+    """
+    remaining = budget
+    rendered = {}
+    report = {"label": label, "budget": budget, "sections": {}}
+    for section in sorted((s for s in sections if s.text), key=lambda s: s.priority):
+        header_tokens = estimate_tokens(f"{section.title}:\n")
+        available = remaining - header_tokens
+        full_tokens = estimate_tokens(section.text)
+        if full_tokens <= available:
+            text, mode = section.text, "full"
+        elif available >= section.min_tokens:
+            text, mode = summarize_to_tokens(section.text, available), "summarized"
+        else:
+            report["sections"][section.title] = {"tokens": 0, "original_tokens": full_tokens, "mode": "dropped"}
+            continue
+        used = header_tokens + estimate_tokens(text)
+        remaining -= used
+        rendered[id(section)] = f"{section.title}:\n{text}"
+        report["sections"][section.title] = {"tokens": used, "original_tokens": full_tokens, "mode": mode}
+
+    report["tokens"] = budget - remaining
+    summary = ", ".join(f"{title} {info['tokens']} ({info['mode']})" for title, info in report["sections"].items())
+    logger.info(f"{label} context: {report['tokens']}/{budget} tokens [{summary}]")
+    text = "\n\n".join(rendered[id(section)] for section in sections if id(section) in rendered)
+    return text, report
@@ -0,0 +1,177 @@
+import re
+import logging
+import importlib
+import threading
+from collections.abc import Mapping
+from quality_gate import QUALITY_DEFAULTS
+
+logger = logging.getLogger("GenreConfig")
+
+# Settings every genre has; a genre module, or the genre it EXTENDS, overrides them.
+# A float default marks a 0-1 knob.
+GENRE_DEFAULTS = {
+    "NUM_CHAPTERS": 3,
+    "NARRATIVE_STYLE": "third_person_limited",
+    "PACING_SPEED_CHAPTER_START": 0.5,
+    "PACING_SPEED_CHAPTER_MID": 0.5,
+    "PACING_SPEED_CHAPTER_END": 0.5,
+    "SETTING_INTEGRATION": 0.5,
+    "CHARACTER_DEPTH": 0.5,
+    "CHARACTER_RELATIONSHIP_DEPTH": 0.5,
+    "PLOT_COMPLEXITY": 0.5,
+    "PROSE_COMPLEXITY": 0.5,
+    "ITEM_SIGNIFICANCE": "medium",
+    "ROLE_MODEL_TIERS": {},
+    "ROLE_MODELS": {},
+    "MODEL_TIERS": {},
+    **QUALITY_DEFAULTS,
+}
+
+# The genre guidance in the goal of each agent role, rendered once per genre (see GenreConfig.role_fragments)
+ROLE_GUIDANCE = {
+    "Story Planner": "Incorporate the genre-specific pacing: {PACING_SPEED_CHAPTER_START}, {PACING_SPEED_CHAPTER_MID}, {PACING_SPEED_CHAPTER_END}.",
+    "Outline Creator": "Incorporate the genre-specific narrative style: {NARRATIVE_STYLE}.",
+    "Setting Builder": "Incorporate the genre-specific setting integration: {SETTING_INTEGRATION}.",
+    "Character Creator": "Incorporate the genre-specific character depth: {CHARACTER_DEPTH}.",
+    "Relationship Architect": "Incorporate the genre-specific relationship depth: {CHARACTER_RELATIONSHIP_DEPTH}.",
+    "Plot Agent": "Incorporate the genre-specific plot complexity: {PLOT_COMPLEXITY}.",
+    "Writer": "Each chapter MUST be at least {MIN_WORDS_PER_CHAPTER} words in length. Consider this a HARD REQUIREMENT. If your output is shorter, continue writing until you reach this minimum length.",
+    "Editor": "Verify that each chapter meets the length requirement of between {MIN_WORDS_PER_CHAPTER} and {MAX_WORDS_PER_CHAPTER} words. Incorporate the genre-specific editing style: {PROSE_COMPLEXITY}.",
+    "Item Developer": "Incorporate the genre-specific item significance: {ITEM_SIGNIFICANCE}.",
+}
+
+# Genre module globals that are settings; imported modules, functions and classes are not
+SETTING_NAME = re.compile(r"^[A-Z][A-Z0-9_]*$")
+SETTING_TYPES = (bool, int, float, str, list, tuple, dict, type(None))
+
+
+class GenreConfigError(ValueError):
+    pass
+
+
+def render_role_fragments(settings):
+    """
+    Returns the genre guidance of every role in ROLE_GUIDANCE for `settings`,
+    a mapping of genre settings; settings it lacks take their GENRE_DEFAULTS.
+    Without a GENRE the guidance does not name the genre.
+    """
+    values = {**GENRE_DEFAULTS, **settings}
+    genre = f"A {values['GENRE']} story. " if values.get("GENRE") else ""
+    return {role: f"{genre}{guidance.format_map(values)}" for role, guidance in ROLE_GUIDANCE.items()}
+
+
+def validate_settings(name, settings):
+    """
+    Returns the problems with a genre's settings: values of the wrong type,
+    0-1 knobs (float settings) out of range and minimums above their maximums.
+    """
+    problems = []
+    for key, value in settings.items():
+        default = GENRE_DEFAULTS.get(key)
+        is_number = isinstance(value, (int, float)) and not isinstance(value, bool)
+        if isinstance(default, float) or (default is None and isinstance(value, float)):
+            if not is_number or not 0 <= value <= 1:
+                problems.append(f"{key} must be a number from 0 to 1, not {value!r}")
+        elif isinstance(default, int) and not isinstance(default, bool):
+            if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+                problems.append(f"{key} must be a positive whole number, not {value!r}")
+        elif default is not None and not isinstance(value, type(default)):
+            problems.append(f"{key} must be a {type(default).__name__}, not {value!r}")
+    for low, high in (("MIN_WORDS_PER_CHAPTER", "MAX_WORDS_PER_CHAPTER"), ("MIN_DIALOGUE_RATIO", "MAX_DIALOGUE_RATIO")):
+        if not any(problem.startswith((low, high)) for problem in problems) and settings[low] > settings[high]:
+            problems.append(f"{low} ({settings[low]}) is above {high} ({settings[high]})")
+    return [f"genre {name}: {problem}" for problem in problems]
+
+
+class GenreConfig(Mapping):
+    """
+    The validated settings of one genre: GENRE_DEFAULTS, overridden by the
+    settings of the genres it extends, overridden by its own. Read-only, so one
+    instance is shared by every agent and task of a run (see load_genre_config).
+    The genre guidance of every agent role is rendered once, on creation.
+
+    Raises GenreConfigError listing every invalid setting.
+    """
+
+    def __init__(self, name, settings=None, extends=()):
+        self.name = name
+        # The genres this one inherits from, nearest first
+        self.extends = tuple(extends)
+        self._settings = {**GENRE_DEFAULTS, **(settings or {}), "GENRE": name}
+        problems = validate_settings(name, self._settings)
+        if problems:
+            raise GenreConfigError("; ".join(problems))
+        self.role_fragments = render_role_fragments(self._settings)
+
+    def __getitem__(self, key):
+        return self._settings[key]
+
+    def __iter__(self):
+        return iter(self._settings)
+
+    def __len__(self):
+        return len(self._settings)
+
+    @property
+    def num_chapters(self):
+        return self._settings["NUM_CHAPTERS"]
+
+    @property
+    def min_words(self):
+        return self._settings["MIN_WORDS_PER_CHAPTER"]
+
+    @property
+    def max_words(self):
+        return self._settings["MAX_WORDS_PER_CHAPTER"]
+
+    def role_fragment(self, role):
+        """
+        Returns the genre guidance for an agent role's goal, or "" for roles without any.
+        """
+        return self.role_fragments.get(role, "")
+
+
+def module_settings(genre, extended_by=()):
+    """
+    Returns the settings of genres/<genre>.py merged over those of the genre it
+    names in EXTENDS, and the chain of genres it extends, nearest first.
+    """
+    if genre in extended_by:
+        raise GenreConfigError(f"Genres extend each other in a cycle: {' -> '.join(extended_by + (genre,))}")
+    try:
+        module = importlib.import_module(f"genres.{genre}")
+    except ModuleNotFoundError as e:
+        if e.name != f"genres.{genre}" or not extended_by:
+            raise
+        raise GenreConfigError(f"Genre {extended_by[-1]} extends '{genre}', which does not exist.") from e
+    settings = {key: value for key, value in vars(module).items() if SETTING_NAME.match(key) and isinstance(value, SETTING_TYPES)}
+    parent = settings.pop("EXTENDS", None)
+    if not parent:
+        return settings, ()
+    parent_settings, chain = module_settings(parent, extended_by + (genre,))
+    return {**parent_settings, **settings}, (parent,) + chain
+
+
+_configs = {}
+_configs_lock = threading.Lock()
+
+
+def load_genre_config(genre):
+    """
+    Returns the GenreConfig of genres/<genre>.py, loaded and validated once per
+    process. A genre without a module gets the defaults.
+    """
+    with _configs_lock:
+        config = _configs.get(genre)
+        if config is None:
+            try:
+                settings, extends = module_settings(genre)
+                config = GenreConfig(genre, settings, extends)
+                logger.info(f"Successfully loaded genre configuration for {genre}" + (f" (extends {' -> '.join(extends)})" if extends else ""))
+            except ModuleNotFoundError as e:
+                if e.name != f"genres.{genre}":
+                    raise
+                logger.error(f"Genre configuration for '{genre}' not found. Using default settings.")
+                config = GenreConfig(genre)
+            _configs[genre] = config
+        return config
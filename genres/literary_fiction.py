@@ -99,3 +99,16 @@ RHETORICAL_TECHNIQUES = 1.0
 PERSONAL_EXPERIENCES = 1.0
 CHARACTER_DEVELOPMENT = 1.0
 NATURAL_FLOW = 1.0
+
+# --- Model Routing ---
+# Roles listed here run on the model of their tier (MODEL_TIER_<TIER> in .env, or MODEL_TIERS below);
+# ROLE_MODELS pins a role to a model. Unlisted roles use the default model.
+ROLE_MODEL_TIERS = {}  # e.g. {"Item Developer": "small", "Outline Compiler": "small", "Researcher": "small"}
+ROLE_MODELS = {}       # e.g. {"Writer": "ollama/llama3.1:8b"}
+
+# --- Quality Gate ---
+# Local checks that decide whether a draft needs a critic/revise pass
+MIN_KEY_EVENT_COVERAGE = 0.6   # Share of the outline's key events the chapter must cover
+MAX_REPEATED_TRIGRAMS = 0.08   # Share of repeated three-word phrases allowed
+MIN_DIALOGUE_RATIO = 0.1       # Share of words in dialogue
+MAX_DIALOGUE_RATIO = 0.5
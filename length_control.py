@@ -0,0 +1,86 @@
+import re
+from quality_gate import words_of
+
+# Lines that separate scenes: "***", "* * *", "#", "~~~", "<hr>"
+SCENE_BREAK_PATTERN = re.compile(r"\n\s*(?:<hr\s*/?>|(?:\*\s*){3,}|#|~{3,}|-{3,})\s*\n")
+PARAGRAPH_PATTERN = re.compile(r"\n\s*\n|(?<=</p>)\s*")
+
+
+def count_words(text):
+    return len(words_of(text or ""))
+
+
+def split_scenes(text):
+    """
+    Splits chapter text at scene breaks. Each scene keeps the break that follows it.
+    """
+    scenes = []
+    start = 0
+    for match in SCENE_BREAK_PATTERN.finditer(text):
+        scenes.append(text[start:match.end()])
+        start = match.end()
+    if text[start:].strip():
+        scenes.append(text[start:])
+    return scenes
+
+
+def split_paragraphs(text):
+    return [paragraph for paragraph in PARAGRAPH_PATTERN.split(text) if paragraph.strip()]
+
+
+def _keep_leading(parts, max_words, separator=""):
+    kept, words = [], 0
+    for part in parts:
+        part_words = count_words(part)
+        if kept and words + part_words > max_words:
+            break
+        kept.append(part)
+        words += part_words
+    return separator.join(kept)
+
+
+def trim_to_words(text, max_words):
+    """
+    Shortens text to at most `max_words` words by dropping whole scenes from
+    the end, or whole paragraphs when the first scene alone is too long.
+    The text is never cut to nothing: at least one scene (or paragraph) stays.
+    """
+    if count_words(text) <= max_words:
+        return text
+    scenes = split_scenes(text)
+    if len(scenes) > 1 and count_words(scenes[0]) <= max_words:
+        # The last kept scene still carries the break that led to the dropped ones
+        trimmed = _keep_leading(scenes, max_words)
+        breaks = list(SCENE_BREAK_PATTERN.finditer(trimmed))
+        if breaks and not trimmed[breaks[-1].end():].strip():
+            trimmed = trimmed[:breaks[-1].start()]
+        return trimmed
+    return _keep_leading(split_paragraphs(text), max_words, separator="\n\n")
+
+
+def ending(text, words=300):
+    """
+    Returns the last paragraphs of the text, about `words` words, for a continuation prompt.
+    """
+    paragraphs = split_paragraphs(text)
+    tail = []
+    count = 0
+    while paragraphs and (not tail or count + count_words(paragraphs[-1]) <= words):
+        paragraph = paragraphs.pop()
+        tail.insert(0, paragraph)
+        count += count_words(paragraph)
+    return "\n\n".join(tail)
+
+
+def append_continuation(text, continuation):
+    """
+    Appends a continuation to the chapter, dropping paragraphs at its start
+    that only repeat the end of the chapter.
+    """
+    existing = {" ".join(paragraph.split()) for paragraph in split_paragraphs(text)[-5:]}
+    paragraphs = split_paragraphs(continuation)
+    while paragraphs and " ".join(paragraphs[0].split()) in existing:
+        paragraphs.pop(0)
+    if not paragraphs:
+        return text
+    return text.rstrip() + "\n\n" + "\n\n".join(paragraph.strip() for paragraph in paragraphs)
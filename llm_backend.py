@@ -0,0 +1,227 @@
+import os
+import time
+import logging
+import threading
+from crewai import LLM
+from llm_cache import get_response_cache, make_cache_key, CacheMissError
+from streaming import current_stream
+from task_metrics import record_llm_call, count_tokens
+from agent_metrics import agent_metrics
+from resilience import call_with_retry, llm_retry_policy, llm_timeout, get_circuit_breaker
+from ollama_client import get_ollama_client
+from prompt_layout import prefix_reuse
+
+logger = logging.getLogger("LLMBackend")
+
+# LLM settings that change the response, so they are part of the response cache key
+CACHE_KEY_ATTRIBUTES = ("temperature", "top_p", "max_tokens", "max_completion_tokens", "stop", "presence_penalty",
+                        "frequency_penalty", "seed", "response_format")
+# Call arguments that change the response, also part of the key; everything else is left out
+CACHE_KEY_ARGUMENTS = ("tools", "available_functions", "response_model")
+
+
+def tool_key(tool):
+    """
+    Returns what identifies a tool the model is offered: its function schema, or
+    the name, description and argument schema of a tool object.
+    """
+    if isinstance(tool, dict):
+        return tool
+    return {"name": getattr(tool, "name", type(tool).__name__), "description": getattr(tool, "description", None),
+            "args": schema_key(getattr(tool, "args_schema", None))}
+
+
+def schema_key(model):
+    """
+    Returns the JSON schema of a pydantic model class, or its name for any other class.
+    """
+    if model is None:
+        return None
+    if hasattr(model, "model_json_schema"):
+        return model.model_json_schema()
+    return getattr(model, "__name__", str(model))
+
+
+class BookWriterLLM(LLM):
+    """
+    crewai LLM used by every agent. Calls go through the response cache, when
+    one is configured, before they reach the model backend. Calls made while a
+    token stream is active on the thread (see streaming.streaming_to) are
+    streamed into it. Failed backend calls are retried with `retry_policy`,
+    through the circuit `breaker` when one is given. With an Ollama `client`
+    (see ollama_client.py), calls go through its pooled keep-alive connections
+    instead of litellm.
+    """
+
+    def __init__(self, model, cache=None, role=None, retry_policy=None, breaker=None, client=None, **kwargs):
+        super().__init__(model=model, **kwargs)
+        self.cache = cache
+        self.role = role  # agent role the call metrics are labelled with
+        self.retry_policy = retry_policy
+        self.breaker = breaker
+        self.client = client
+
+    def call(self, messages, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            response, cache_hit = self._cached_call(messages, *args, **kwargs)
+        except Exception:
+            agent_metrics.observe_error(self.role)
+            raise
+        seconds = time.perf_counter() - started
+        if not cache_hit:
+            prefix_reuse.observe(self.model, self.role, messages)
+        prompt_tokens, completion_tokens = count_tokens(messages, response)
+        record_llm_call(prompt_tokens, completion_tokens, seconds)
+        agent_metrics.observe_call(self.role, seconds, prompt_tokens, completion_tokens, cache_hit=cache_hit)
+        return response
+
+    def _cached_call(self, messages, *args, **kwargs):
+        """
+        Returns the response and whether it came from the cache (None without a cache).
+        """
+        if self.cache is None:
+            return self._complete_with_retry(messages, *args, **kwargs), None
+
+        key = make_cache_key(self.model, messages, **self._cache_params(args, kwargs))
+        response = self.cache.get(key)
+        if response is not None:
+            logger.debug(f"Cache hit for {self.model} ({key[:12]})")
+            if current_stream() is not None:
+                current_stream().write(response)
+            return response, True
+        if self.cache.replay:
+            raise CacheMissError(f"No cached response for {self.model} ({key[:12]}) in replay mode.")
+
+        response = self._complete_with_retry(messages, *args, **kwargs)
+        if response:
+            self.cache.put(key, response, model=self.model)
+        return response, False
+
+    def _cache_params(self, args, kwargs):
+        """
+        Returns everything besides the messages that changes the response: the sampling
+        settings and the call arguments in CACHE_KEY_ARGUMENTS. Any other argument
+        (callbacks, crewai's from_task and from_agent) only observes the call and is
+        left out, so the key is the same across runs.
+        """
+        params = {attribute: getattr(self, attribute, None) for attribute in CACHE_KEY_ATTRIBUTES}
+        if isinstance(params["response_format"], type):
+            params["response_format"] = schema_key(params["response_format"])
+        # Positional arguments in the order of crewai's LLM.call(messages, tools, callbacks, available_functions)
+        arguments = {**dict(zip(("tools", "callbacks", "available_functions"), args)), **kwargs}
+        if arguments.get("tools"):
+            params["tools"] = [tool_key(tool) for tool in arguments["tools"]]
+        if arguments.get("available_functions"):
+            params["available_functions"] = sorted(arguments["available_functions"])
+        if arguments.get("response_model") is not None:
+            params["response_model"] = schema_key(arguments["response_model"])
+        return {name: value for name, value in params.items() if value is not None}
+
+    def _complete_with_retry(self, messages, *args, **kwargs):
+        if self.retry_policy is None:
+            return self._complete(messages, *args, **kwargs)
+
+        def on_retry(retry, error):
+            agent_metrics.observe_retry(self.role)
+            if current_stream() is not None:
+                current_stream().reset()
+
+        return call_with_retry(lambda: self._complete(messages, *args, **kwargs), self.retry_policy, self.breaker,
+                               on_retry=on_retry, label=f"{self.role or self.model} LLM call")
+
+    def _complete(self, messages, *args, **kwargs):
+        stream = current_stream()
+        if self.client is not None and not kwargs.get("tools"):
+            return self._chat(messages, stream)
+        if stream is None or kwargs.get("tools"):
+            return super().call(messages, *args, **kwargs)
+        return self._stream(messages, stream)
+
+    def _chat(self, messages, stream):
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+        options = {}
+        for attribute, option in (("temperature", "temperature"), ("max_tokens", "num_predict"), ("stop", "stop")):
+            value = getattr(self, attribute, None)
+            if value:
+                options[option] = value
+        return self.client.chat(self.model.split("/", 1)[1], messages, options=options,
+                                on_token=stream.write if stream is not None else None)
+
+    def _stream(self, messages, stream):
+        import litellm
+
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+        params = {"model": self.model, "messages": messages, "stream": True}
+        for attribute, param in (("temperature", "temperature"), ("max_tokens", "max_tokens"), ("stop", "stop"),
+                                 ("timeout", "timeout"), ("base_url", "api_base"), ("api_key", "api_key")):
+            value = getattr(self, attribute, None)
+            if value:
+                params[param] = value
+
+        chunks = []
+        for chunk in litellm.completion(**params):
+            text = chunk.choices[0].delta.content or ""
+            stream.write(text)
+            chunks.append(text)
+        return "".join(chunks)
+
+
+def ollama_client_enabled():
+    """
+    OLLAMA_CLIENT: "pooled" (default) sends ollama/ models through ollama_client.py, "litellm" through litellm.
+    """
+    return os.getenv('OLLAMA_CLIENT', 'pooled').lower() != 'litellm'
+
+
+def warm_up(models):
+    """
+    Loads the Ollama models among `models` before the first task needs them,
+    so no chapter pays the model's load time. A model that fails to load is
+    logged; its first call then loads it, with the usual retries.
+    """
+    if not ollama_client_enabled() or os.getenv('OLLAMA_WARM_UP', 'on').lower() in ('0', 'off', 'false', 'no'):
+        return
+    client = get_ollama_client()
+    for model in sorted(set(models)):
+        if isinstance(model, str) and model.startswith("ollama/"):
+            started = time.perf_counter()
+            try:
+                if client.warm_up(model.split("/", 1)[1]):
+                    logger.info(f"Warmed up {model} in {time.perf_counter() - started:.1f}s")
+            except Exception as e:
+                logger.warning(f"Could not warm up {model}: {e}")
+
+
+# LLMs built so far, keyed by (model, role); the books of a batch share them
+_llms = {}
+_llms_lock = threading.Lock()
+
+
+def build_llm(model_to_use, role=None):
+    """
+    Returns the LLM an agent should use for `model_to_use`, with its calls
+    labelled `role` in the agent metrics.
+    Model names are wrapped in a BookWriterLLM ("mock/..." names in the offline
+    MockLLM) with the configured cache, retries, circuit breaker and per-call
+    timeout; LLM instances are used as they are. Calls keep no state on the
+    LLM, so there is one per model and role for the whole process.
+    """
+    if not isinstance(model_to_use, str):
+        return model_to_use
+    with _llms_lock:
+        llm = _llms.get((model_to_use, role))
+        if llm is None:
+            options = {"cache": get_response_cache(), "role": role, "retry_policy": llm_retry_policy(),
+                       "breaker": get_circuit_breaker(), "timeout": llm_timeout()}
+            if model_to_use.startswith("mock/"):
+                from mock_llm import MockLLM  # mock_llm builds on this module
+                llm = MockLLM(model=model_to_use, **options)
+            elif model_to_use.startswith("ollama/") and ollama_client_enabled():
+                llm = BookWriterLLM(model=model_to_use, client=get_ollama_client(), **options)
+            else:
+                llm = BookWriterLLM(model=model_to_use, **options)
+            _llms[(model_to_use, role)] = llm
+        return llm
@@ -0,0 +1,169 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger("LLMCache")
+
+
+class CacheMissError(KeyError):
+    """Raised in replay mode when a prompt has no cached response."""
+
+
+def make_cache_key(model, messages, **params):
+    """
+    Returns a content hash for one LLM call.
+
+    `messages` already carries the agent's system prompt (role, goal, backstory)
+    and the task description with its context, so hashing them together with the
+    model name and `params` (sampling settings such as max_tokens and stop, and
+    call arguments such as tools) identifies the call exactly. Raises TypeError for
+    values that are not plain JSON, whose str() may not be stable across runs.
+    """
+    payload = json.dumps({"model": model, "messages": messages, "params": params}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Persistent on-disk cache of LLM responses, one JSON file per key.
+
+    Entries older than `max_age` seconds are ignored and removed; when the cache
+    grows beyond `max_bytes` the least recently used entries are evicted. With
+    `replay` set the cache is read-only: nothing is written or evicted.
+    """
+
+    def __init__(self, directory, max_bytes=None, max_age=None, replay=False):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.replay = replay
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(os.path.getsize(path) for path in self._entry_paths())
+        if not replay:
+            self.evict()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _entry_paths(self):
+        for root, _, files in os.walk(self.directory):
+            for filename in files:
+                if filename.endswith(".json"):
+                    yield os.path.join(root, filename)
+
+    def _expired(self, entry):
+        return self.max_age is not None and time.time() - entry.get("created", 0) > self.max_age
+
+    def get(self, key):
+        """
+        Returns the cached response for `key`, or None.
+        """
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            entry = None
+        if entry is not None and self._expired(entry):
+            entry = None
+            if not self.replay:
+                self._remove(path)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        if not self.replay:
+            try:
+                os.utime(path)  # Mark as recently used for eviction
+            except FileNotFoundError:
+                pass
+        return entry["response"]
+
+    def put(self, key, response, model=None):
+        """
+        Stores `response` under `key`. Does nothing in replay mode.
+        """
+        if self.replay:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"model": model, "created": time.time(), "response": response}, f)
+        with self._lock:
+            if os.path.exists(path):
+                self._size -= os.path.getsize(path)
+            os.replace(temp_path, path)
+            self._size += os.path.getsize(path)
+            over_budget = self.max_bytes is not None and self._size > self.max_bytes
+        if over_budget:
+            self.evict()
+
+    def _remove(self, path):
+        with self._lock:
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+                self._size -= size
+            except FileNotFoundError:
+                pass
+
+    def evict(self):
+        """
+        Removes expired entries, then least recently used ones until the cache fits in `max_bytes`.
+        """
+        entries = []
+        for path in self._entry_paths():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if self.max_age is not None and time.time() - stat.st_mtime > self.max_age:
+                self._remove(path)  # Not used within max_age, so it was also created before that
+            else:
+                entries.append((stat.st_mtime, path))
+        if self.max_bytes is None:
+            return
+        entries.sort()
+        while entries and self._size > self.max_bytes:
+            _, path = entries.pop(0)
+            self._remove(path)
+            logger.debug(f"Evicted cache entry {os.path.basename(path)}")
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """
+    Returns the process-wide response cache configured from the environment, or None.
+
+    LLM_CACHE: "off" (default), "on", or "replay" (read-only; a miss is an error)
+    LLM_CACHE_DIR: cache directory (default ".llm_cache")
+    LLM_CACHE_MAX_MB: size limit in megabytes
+    LLM_CACHE_MAX_AGE_DAYS: entries older than this are dropped
+    """
+    global _response_cache
+    mode = os.getenv('LLM_CACHE', 'off').lower()
+    if mode not in ('on', 'replay'):
+        return None
+    with _response_cache_lock:
+        if _response_cache is None:
+            max_mb = os.getenv('LLM_CACHE_MAX_MB')
+            max_age_days = os.getenv('LLM_CACHE_MAX_AGE_DAYS')
+            _response_cache = ResponseCache(
+                os.getenv('LLM_CACHE_DIR', '.llm_cache'),
+                max_bytes=int(float(max_mb) * 1024 * 1024) if max_mb else None,
+                max_age=float(max_age_days) * 86400 if max_age_days else None,
+                replay=mode == 'replay'
+            )
+            logger.info(f"LLM response cache enabled in {mode} mode at {_response_cache.directory}")
+        return _response_cache
@@ -0,0 +1,104 @@
+import os
+import json
+import queue
+import atexit
+import hashlib
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from dotenv import load_dotenv
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_listeners = []
+_configured = False
+_configure_lock = threading.Lock()
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """
+    Formats each record as one JSON object per line.
+    """
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "logger": record.name,
+            "level": record.levelname,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def _file_handler(filename, max_bytes, backup_count, structured):
+    handler = RotatingFileHandler(filename, mode='a', maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+    handler.setFormatter(JsonLinesFormatter() if structured else logging.Formatter(LOG_FORMAT))
+    return handler
+
+
+def _attach_queue(logger, handler):
+    """
+    Routes `logger` through a queue: the generation threads only enqueue records,
+    a background listener thread does the file writes.
+    """
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    listener.start()
+    _listeners.append(listener)
+    logger.addHandler(QueueHandler(log_queue))
+
+
+def configure_logging(log_file='book_writer.log', comm_log_file='agent_communication.log', level=logging.DEBUG):
+    """
+    Sets up asynchronous, size-rotated logging for book_writer.log and
+    agent_communication.log. Safe to call more than once; only the first call
+    configures anything.
+
+    LOG_FORMAT: "text" (default) or "jsonl" for one JSON object per line
+    LOG_MAX_MB: rotate a log file once it reaches this size (default 50)
+    LOG_BACKUP_COUNT: number of rotated files to keep (default 5)
+    LOG_CONTENT: "full" (default) logs generated text as is, "hash" only its length and hash
+    """
+    global _configured
+    with _configure_lock:
+        if _configured:
+            return
+        _configured = True
+        load_dotenv()  # agents.py configures logging on import, before main.py loads .env
+        structured = os.getenv('LOG_FORMAT', 'text').lower() == 'jsonl'
+        max_bytes = int(float(os.getenv('LOG_MAX_MB', 50)) * 1024 * 1024)
+        backup_count = int(os.getenv('LOG_BACKUP_COUNT', 5))
+
+        root = logging.getLogger()
+        root.setLevel(level)
+        _attach_queue(root, _file_handler(log_file, max_bytes, backup_count, structured))
+
+        # Agent communications also go to their own file
+        comm_logger = logging.getLogger("AgentCommunicationLogger")
+        comm_logger.setLevel(logging.INFO)
+        _attach_queue(comm_logger, _file_handler(comm_log_file, max_bytes, backup_count, structured))
+
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """
+    Writes out every queued record and stops the listener threads.
+    """
+    with _configure_lock:
+        while _listeners:
+            _listeners.pop().stop()
+
+
+def log_content(text):
+    """
+    Returns generated text for a log message: the text itself, or with
+    LOG_CONTENT=hash just its length and a content hash.
+    """
+    text = "" if text is None else str(text)
+    if os.getenv('LOG_CONTENT', 'full').lower() != 'hash':
+        return text
+    return f"<{len(text)} chars, sha256 {hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]}>"
@@ -0,0 +1,130 @@
+import os
+import re
+import time
+import random
+import hashlib
+from llm_backend import BookWriterLLM
+from streaming import current_stream
+
+VOCABULARY = """
+tide sand wave shell gull pier dune salt wind sun towel cooler laugh shout friend sister brother morning evening
+storm cloud boat rope lighthouse harbor path water foam horizon memory promise secret map compass kite umbrella
+walked watched whispered remembered carried waited turned smiled wondered followed reached slipped gathered drifted
+slowly quietly suddenly together again almost always never softly brightly
+the a of and to in over under beside toward with from
+""".split()
+
+
+def _words(rng, count):
+    words = [rng.choice(VOCABULARY) for _ in range(count)]
+    return " ".join(words)
+
+
+def _sentence(rng, length=12):
+    text = _words(rng, length)
+    return text[0].upper() + text[1:] + "."
+
+
+def _prose(rng, word_count):
+    paragraphs = []
+    remaining = word_count
+    while remaining > 0:
+        sentences = []
+        paragraph_words = min(remaining, rng.randint(40, 80))
+        written = 0
+        while written < paragraph_words:
+            length = min(rng.randint(8, 16), paragraph_words - written)
+            sentences.append(_sentence(rng, max(length, 1)))
+            written += max(length, 1)
+        paragraphs.append(" ".join(sentences))
+        remaining -= written
+    return "\n\n".join(paragraphs)
+
+
+def _outline(rng, num_chapters):
+    chapters = []
+    for number in range(1, num_chapters + 1):
+        events = "\n".join(f"- {_sentence(rng, 8)}" for _ in range(3))
+        chapters.append(f"""Chapter {number}: {_words(rng, 3).title()}
+Key Events:
+{events}
+Character Developments: {_sentence(rng)}
+Setting: {_sentence(rng, 8)}
+Tone: {rng.choice(['hopeful', 'tense', 'wistful', 'playful'])}
+Items: {rng.choice(VOCABULARY)}, {rng.choice(VOCABULARY)}""")
+    return "\n\n".join(chapters)
+
+
+def _story_state_update(rng):
+    return f"""CHARACTERS:
+- Mara Quinn: {_sentence(rng, 8)}
+- Theo Quinn: {_sentence(rng, 8)}
+OPEN THREADS:
+- {_sentence(rng, 6)}
+ITEMS:
+- Brass compass: {_sentence(rng, 5)}
+TIMELINE:
+- {_sentence(rng, 8)}
+- {_sentence(rng, 8)}"""
+
+
+# Task descriptions that expect a whole-book outline rather than prose
+OUTLINE_TASK_MARKERS = ("create a detailed chapter outline for each chapter", "compile the final book outline")
+
+
+def generate_response(messages, words=300):
+    """
+    Returns a deterministic response for `messages`: the same prompt always
+    gives the same text. Outline and story state prompts get text in the
+    format the pipeline parses, with as many chapters as the agents' "N-chapter
+    story" prompt asks for; everything else gets `words` words of prose.
+    """
+    if isinstance(messages, str):
+        messages = [{"role": "user", "content": messages}]
+    prompt = "\n".join(str(message.get("content", "")) for message in messages)
+    rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).hexdigest())
+    task_text = str(messages[-1].get("content", "")).lower()
+    if "update the story state" in task_text:
+        body = _story_state_update(rng)
+    elif any(marker in task_text for marker in OUTLINE_TASK_MARKERS):
+        chapters = re.search(r"(\d+)-chapter", prompt)
+        body = _outline(rng, int(chapters.group(1)) if chapters else 3)
+    else:
+        body = _prose(rng, words)
+    # crewai's agent loop expects a final answer marker from ReAct-style agents
+    return f"Thought: I now can give a great answer\nFinal Answer: {body}"
+
+
+class MockLLM(BookWriterLLM):
+    """
+    Offline stand-in for the model backend, selected with a "mock/..." model
+    name. Responses are deterministic and their size, latency and token rate
+    are configurable, so the pipeline's own overhead can be measured without
+    a GPU or network:
+
+    MOCK_LLM_WORDS: words of prose per response (default 300)
+    MOCK_LLM_LATENCY: seconds before the first token (default 0)
+    MOCK_LLM_TOKENS_PER_SECOND: generation speed, 0 for instant (default 0)
+    """
+
+    def __init__(self, model, words=None, latency=None, tokens_per_second=None, **kwargs):
+        super().__init__(model=model, **kwargs)
+        self.words = int(words if words is not None else os.getenv('MOCK_LLM_WORDS', 300))
+        self.latency = float(latency if latency is not None else os.getenv('MOCK_LLM_LATENCY', 0))
+        self.tokens_per_second = float(tokens_per_second if tokens_per_second is not None else os.getenv('MOCK_LLM_TOKENS_PER_SECOND', 0))
+
+    def _complete(self, messages, *args, **kwargs):
+        response = generate_response(messages, words=self.words)
+        if self.latency:
+            time.sleep(self.latency)
+        stream = current_stream()
+        # Emit the response a word at a time, about 1.35 tokens per word
+        delay = 1.35 / self.tokens_per_second if self.tokens_per_second else 0
+        if stream is None and not delay:
+            return response
+        for word in response.split(" "):
+            if delay:
+                time.sleep(delay)
+            if stream is not None:
+                stream.write(word + " ")
+        return response
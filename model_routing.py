@@ -0,0 +1,72 @@
+import os
+import re
+import logging
+
+logger = logging.getLogger("ModelRouting")
+
+# Roles that do short, structured work and usually hold up on a small model
+SMALL_TIER_CANDIDATES = ("Item Developer", "Outline Compiler", "Researcher", "Editor")
+
+
+def role_env_name(role):
+    """
+    Returns the environment suffix of a role: "Story Planner" -> "STORY_PLANNER".
+    """
+    return re.sub(r"[^A-Z0-9]+", "_", role.upper()).strip("_")
+
+
+def parse_role_tiers(value):
+    """
+    Parses "Item Developer=small,Editor=small" into {"Item Developer": "small", "Editor": "small"}.
+    """
+    tiers = {}
+    for entry in value.split(","):
+        if not entry.strip():
+            continue
+        role, separator, tier = entry.partition("=")
+        if not separator or not tier.strip():
+            raise ValueError(f"Invalid role tier {entry!r}; expected Role=tier.")
+        tiers[role.strip()] = tier.strip().lower()
+    return tiers
+
+
+def qualify_model(model, default_model):
+    """
+    Gives a bare model name ("llama3.2:1b") the backend prefix of the default model.
+    """
+    if "/" in model or "/" not in default_model:
+        return model
+    return f"{default_model.split('/', 1)[0]}/{model}"
+
+
+def resolve_role_model(role, default_model, genre_config=None, environ=None):
+    """
+    Returns the model for `role`, first match wins:
+
+    1. MODEL_<ROLE> in the environment, e.g. MODEL_ITEM_DEVELOPER=llama3.2:1b
+    2. ROLE_MODELS[role] in the genre config
+    3. the role's tier, from ROLE_MODEL_TIERS in the environment ("Editor=small,...")
+       or the genre config (a dict), mapped to a model by MODEL_TIER_<TIER>
+       (or the genre config's MODEL_TIERS)
+    4. `default_model`
+
+    Bare model names get the default model's backend prefix. Non-string
+    default models (LLM instances) are used for every role as they are.
+    """
+    if not isinstance(default_model, str):
+        return default_model
+    genre_config = genre_config or {}
+    environ = os.environ if environ is None else environ
+
+    model = environ.get(f"MODEL_{role_env_name(role)}") or genre_config.get("ROLE_MODELS", {}).get(role)
+    if not model:
+        tiers = dict(genre_config.get("ROLE_MODEL_TIERS", {}))
+        tiers.update(parse_role_tiers(environ.get("ROLE_MODEL_TIERS", "")))
+        tier = tiers.get(role)
+        if tier:
+            model = environ.get(f"MODEL_TIER_{tier.upper()}") or genre_config.get("MODEL_TIERS", {}).get(tier)
+            if not model:
+                logger.warning(f"No model configured for tier '{tier}' of {role}; using {default_model}.")
+    if not model:
+        return default_model
+    return qualify_model(model, default_model)
@@ -0,0 +1,215 @@
+import os
+import json
+import time
+import logging
+import threading
+import http.client
+from collections import deque
+from urllib.parse import urlsplit
+
+logger = logging.getLogger("OllamaClient")
+
+
+class OllamaError(RuntimeError):
+    """
+    An error response from the Ollama server; `status_code` is the HTTP status
+    (resilience.is_transient retries 429 and 5xx).
+    """
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class OllamaClient:
+    """
+    Client for the Ollama HTTP API that keeps its connections open. At most
+    `pool_size` requests are in flight at once; each takes an idle keep-alive
+    connection (the most recently used first) or opens a new one, and hands
+    it back when the response has been read. A connection the server closed
+    while it was idle is replaced and the request sent again.
+
+    Every request carries `keep_alive`, so the model stays loaded between
+    calls, and `options` (e.g. num_ctx), so calls never reload the model with
+    a different context size.
+
+    `timeout` bounds a whole request, from sending it to reading the last
+    streamed token, not just each socket operation: every read may only take
+    what is left of it, and a request past it raises TimeoutError.
+    """
+
+    def __init__(self, base_url="http://localhost:11434", pool_size=4, timeout=None, keep_alive="30m", options=None,
+                 connection_factory=None):
+        parts = urlsplit(base_url if "://" in base_url else f"http://{base_url}")
+        self.base_url = base_url
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port
+        self.secure = parts.scheme == "https"
+        self.path_prefix = parts.path.rstrip("/")
+        self.timeout = timeout
+        self.keep_alive = keep_alive
+        self.options = dict(options or {})
+        self.connection_factory = connection_factory or self._connect
+        self.connections_opened = 0
+        self._slots = threading.BoundedSemaphore(max(1, pool_size))
+        self._idle = deque()
+        self._lock = threading.Lock()
+        self._warm = set()
+
+    def _connect(self):
+        connection_class = http.client.HTTPSConnection if self.secure else http.client.HTTPConnection
+        return connection_class(self.host, self.port, timeout=self.timeout)
+
+    def _checkout(self):
+        """
+        Returns an idle connection, or a new one, and whether it was reused.
+        """
+        try:
+            return self._idle.pop(), True
+        except IndexError:
+            return self._checkout_new(), False
+
+    def _checkout_new(self):
+        with self._lock:
+            self.connections_opened += 1
+        return self.connection_factory()
+
+    def _bound_by_deadline(self, connection, deadline):
+        """
+        Limits the next socket operations of `connection` to the time left until
+        `deadline`; raises TimeoutError once it has passed.
+        """
+        if deadline is None:
+            return
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"Ollama request took longer than {self.timeout}s")
+        connection.timeout = remaining
+        if getattr(connection, "sock", None) is not None:
+            connection.sock.settimeout(remaining)
+
+    def _send(self, connection, path, payload):
+        connection.request("POST", self.path_prefix + path, body=json.dumps(payload).encode("utf-8"),
+                           headers={"Content-Type": "application/json", "Connection": "keep-alive"})
+        return connection.getresponse()
+
+    def _post(self, path, payload, read):
+        """
+        Posts `payload` as JSON to `path` and returns read(response, check_deadline),
+        where check_deadline() is to be called before every read of a streamed response.
+        """
+        with self._slots:
+            deadline = None if self.timeout is None else time.monotonic() + self.timeout
+            connection, reused = self._checkout()
+
+            def check_deadline():
+                self._bound_by_deadline(connection, deadline)
+
+            try:
+                try:
+                    check_deadline()
+                    response = self._send(connection, path, payload)
+                except (ConnectionError, http.client.BadStatusLine):
+                    if not reused:
+                        raise
+                    # The server dropped the idle connection; send the request on a fresh one
+                    connection.close()
+                    connection, reused = self._checkout_new(), False
+                    check_deadline()
+                    response = self._send(connection, path, payload)
+                if response.status >= 400:
+                    body = response.read().decode("utf-8", errors="replace")
+                    raise OllamaError(f"Ollama {path} returned HTTP {response.status}: {body[:300]}", status_code=response.status)
+                check_deadline()
+                result = read(response, check_deadline)
+                response.read()  # The connection can only be reused once the response is fully read
+            except BaseException:
+                connection.close()
+                raise
+            if response.will_close:
+                connection.close()
+            else:
+                self._idle.append(connection)
+            return result
+
+    def chat(self, model, messages, options=None, on_token=None):
+        """
+        Returns the reply of `model` to the chat `messages`. With `on_token`,
+        the reply is streamed and every piece of text is passed to it as it arrives.
+        """
+        payload = {"model": model, "messages": messages, "stream": on_token is not None,
+                   "keep_alive": self.keep_alive, "options": {**self.options, **(options or {})}}
+
+        def read(response, check_deadline):
+            if on_token is None:
+                data = json.loads(response.read())
+                return data.get("message", {}).get("content", "")
+            pieces = []
+            for line in response:
+                # A model trickling out tokens never trips the socket timeout, so the deadline is checked per line
+                check_deadline()
+                if not line.strip():
+                    continue
+                data = json.loads(line)
+                if data.get("error"):
+                    raise OllamaError(f"Ollama error: {data['error']}")
+                text = data.get("message", {}).get("content", "")
+                if text:
+                    on_token(text)
+                    pieces.append(text)
+                if data.get("done"):
+                    break
+            return "".join(pieces)
+
+        return self._post("/api/chat", payload, read)
+
+    def warm_up(self, model):
+        """
+        Loads `model` into memory, with this client's options, unless this client
+        already did. Returns False when it was already warm.
+        """
+        with self._lock:
+            if model in self._warm:
+                return False
+            self._warm.add(model)
+        try:
+            self._post("/api/generate", {"model": model, "prompt": "", "stream": False, "keep_alive": self.keep_alive,
+                                         "options": self.options}, lambda response, check_deadline: response.read())
+        except Exception:
+            with self._lock:
+                self._warm.discard(model)
+            raise
+        logger.info(f"Model {model} loaded on {self.base_url}")
+        return True
+
+    def close(self):
+        while self._idle:
+            self._idle.pop().close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_ollama_client():
+    """
+    Returns the process-wide Ollama client configured from the environment.
+
+    OLLAMA_BASE_URL: server address (default http://localhost:11434)
+    OLLAMA_POOL_SIZE: connections kept open, i.e. requests in flight (default the larger of
+        MAX_CONCURRENT_TASKS and BATCH_CONCURRENT_TASKS, so the pool never caps a batch below its task slots)
+    OLLAMA_KEEP_ALIVE: how long the server keeps the model loaded after a call (default 30m)
+    OLLAMA_CONTEXT_WINDOW: num_ctx of every call
+    LLM_TIMEOUT: seconds a whole request may take (see resilience.llm_timeout)
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            from resilience import llm_timeout
+            pool_size = os.getenv('OLLAMA_POOL_SIZE') or max(int(os.getenv('MAX_CONCURRENT_TASKS', 4)),
+                                                             int(os.getenv('BATCH_CONCURRENT_TASKS') or 0))
+            context_window = os.getenv('OLLAMA_CONTEXT_WINDOW')
+            _client = OllamaClient(os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434'), pool_size=int(pool_size),
+                                   timeout=llm_timeout(), keep_alive=os.getenv('OLLAMA_KEEP_ALIVE', '30m'),
+                                   options={"num_ctx": int(context_window)} if context_window else None)
+        return _client
@@ -0,0 +1,133 @@
+import re
+import logging
+
+logger = logging.getLogger("OutlineIndex")
+
+# Same "Chapter N: Title" convention as parse_outline in test_outline.py, tolerating
+# the markdown decoration ("**Chapter 1: ...**", "### Chapter 1 - ...") models like to add
+CHAPTER_PATTERN = re.compile(r"^[#*\s]*Chapter (\d+)\s*[:.\-–]\s*(.*?)[*\s]*$", re.IGNORECASE)
+FIELD_PATTERN = re.compile(r"^[#*\s-]*(Title|Key Events|Character Developments|Setting|Tone|Items)[*\s]*:[*\s]*(.*)$", re.IGNORECASE)
+# Top-level outline sections such as "CHARACTER PROFILES:" end the chapter that precedes them; the colon
+# is required, since chapters often contain all-caps scene headings or place names ("THE OLD PIER")
+SECTION_PATTERN = re.compile(r"^[#*\s]*[A-Z][A-Z _]{3,}:[*\s]*$")
+LIST_FIELDS = ("key_events", "items")
+
+
+class ChapterOutline:
+    """
+    The outline of one chapter: title, key events, character developments,
+    setting, tone and items, plus the raw outline text of the chapter.
+    """
+
+    def __init__(self, number, title=""):
+        self.number = number
+        self.title = title
+        self.key_events = []
+        self.character_developments = ""
+        self.setting = ""
+        self.tone = ""
+        self.items = []
+        self.text = ""
+
+    def summary(self):
+        """
+        Returns a one-paragraph digest (title and key events) for neighbouring chapters.
+        """
+        events = "; ".join(self.key_events)
+        return f"Chapter {self.number}: {self.title}" + (f" - Key Events: {events}" if events else "")
+
+
+class OutlineIndex:
+    """
+    The compiled book outline, split once into a chapter number -> ChapterOutline index.
+    """
+
+    def __init__(self, chapters=None, preamble=""):
+        self.chapters = chapters or {}
+        self.preamble = preamble
+
+    def __contains__(self, chapter_number):
+        return chapter_number in self.chapters
+
+    def __len__(self):
+        return len(self.chapters)
+
+    def get(self, chapter_number):
+        return self.chapters.get(chapter_number)
+
+    @classmethod
+    def parse(cls, outline_text):
+        chapters = {}
+        preamble = []
+        current = None
+        lines = []
+        field = None
+
+        def close():
+            if current is None:
+                return
+            current.text = "\n".join(lines).strip()
+            previous = chapters.get(current.number)
+            # Outlines sometimes repeat a chapter; keep the most detailed version
+            if previous is None or len(current.text) > len(previous.text):
+                chapters[current.number] = current
+
+        for raw_line in (outline_text or "").split("\n"):
+            line = raw_line.strip()
+            chapter_match = CHAPTER_PATTERN.match(line)
+            if chapter_match:
+                close()
+                current = ChapterOutline(int(chapter_match.group(1)), chapter_match.group(2).strip())
+                lines = [line]
+                field = None
+                continue
+            if current is None:
+                preamble.append(raw_line)
+                continue
+            if SECTION_PATTERN.match(line) and not FIELD_PATTERN.match(line):
+                close()
+                current = None
+                preamble.append(raw_line)
+                continue
+
+            lines.append(line)
+            field_match = FIELD_PATTERN.match(line)
+            if field_match:
+                field = field_match.group(1).lower().replace(" ", "_")
+                value = field_match.group(2).strip()
+                if field == "title":
+                    current.title = value or current.title
+                    field = None
+                elif field in LIST_FIELDS:
+                    getattr(current, field).extend(item.strip() for item in value.split(",") if item.strip())
+                else:
+                    setattr(current, field, value)
+            elif field and line:
+                value = line.lstrip("-*• ").strip()
+                if field in LIST_FIELDS:
+                    getattr(current, field).append(value)
+                else:
+                    setattr(current, field, f"{getattr(current, field)} {value}".strip())
+        close()
+
+        logger.info(f"Indexed outline: {len(chapters)} chapters")
+        return cls(chapters, "\n".join(preamble).strip())
+
+    def slice(self, chapter_number, neighbors=1):
+        """
+        Returns the full outline of `chapter_number` preceded and followed by a
+        digest of up to `neighbors` chapters on each side, or "" if the chapter
+        is not in the outline.
+        """
+        chapter = self.chapters.get(chapter_number)
+        if chapter is None:
+            return ""
+        before = [self.chapters[n].summary() for n in range(chapter_number - neighbors, chapter_number) if n in self.chapters]
+        after = [self.chapters[n].summary() for n in range(chapter_number + 1, chapter_number + neighbors + 1) if n in self.chapters]
+        parts = []
+        if before:
+            parts.append("Previous chapters:\n" + "\n".join(before))
+        parts.append(chapter.text)
+        if after:
+            parts.append("Following chapters:\n" + "\n".join(after))
+        return "\n\n".join(parts)
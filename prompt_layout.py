@@ -0,0 +1,91 @@
+import os
+import threading
+from collections import deque
+from context_assembler import estimate_tokens
+
+
+def layered_prompt(instruction, *layers):
+    """
+    Joins a prompt from its instruction and (heading, text) layers, in the
+    order given. Callers pass the layers from the most to the least widely
+    shared (static persona or instruction, genre, book, chapter), so prompts
+    that differ only in their last layers start with the same text and the
+    model server can reuse its KV cache for that prefix. Empty layers are left out.
+    """
+    parts = [instruction.strip()]
+    for heading, text in layers:
+        text = (text or "").strip()
+        if text:
+            parts.append(f"{heading}:\n{text}")
+    return "\n\n".join(parts)
+
+
+def prompt_text(messages):
+    """
+    Flattens chat messages into the text a model server sees, in order.
+    """
+    if isinstance(messages, str):
+        return messages
+    return "\n".join(f"{message.get('role', '')}: {message.get('content') or ''}" for message in messages)
+
+
+def shared_prefix_length(a, b):
+    """
+    Returns the length of the longest common prefix of two strings.
+    """
+    limit = min(len(a), len(b))
+    # Compare in blocks first, so long shared prefixes cost a few slice comparisons
+    length, block = 0, 4096
+    while block:
+        while length + block <= limit and a[length:length + block] == b[length:length + block]:
+            length += block
+        block //= 8
+    return length
+
+
+class PrefixReuse:
+    """
+    Measures how much of each prompt a model server could serve from its KV
+    cache: the longest prefix the prompt shares with one of the last `window`
+    prompts sent to the same model. Totals are kept per agent role.
+    """
+
+    def __init__(self, window=8):
+        self.window = window
+        self._recent = {}  # model -> recent prompts, newest last
+        self._roles = {}
+        self._lock = threading.Lock()
+
+    def observe(self, model, role, messages):
+        """
+        Records one prompt and returns the estimated number of its tokens shared with an earlier prompt.
+        """
+        text = prompt_text(messages)
+        with self._lock:
+            recent = self._recent.setdefault(model, deque(maxlen=self.window))
+            shared = max((shared_prefix_length(text, earlier) for earlier in recent), default=0)
+            recent.append(text)
+            totals = self._roles.setdefault(role or "unknown", {"calls": 0, "prompt_tokens": 0, "shared_tokens": 0})
+            totals["calls"] += 1
+            totals["prompt_tokens"] += estimate_tokens(text)
+            totals["shared_tokens"] += estimate_tokens(text[:shared])
+        return estimate_tokens(text[:shared])
+
+    def snapshot(self):
+        """
+        Returns the calls, estimated prompt and shared tokens and reuse ratio of every role, plus a "total".
+        """
+        with self._lock:
+            roles = {role: dict(totals) for role, totals in sorted(self._roles.items())}
+        total = {"calls": 0, "prompt_tokens": 0, "shared_tokens": 0}
+        for totals in roles.values():
+            for name in total:
+                total[name] += totals[name]
+        roles["total"] = total
+        for totals in roles.values():
+            totals["reuse_ratio"] = round(totals["shared_tokens"] / totals["prompt_tokens"], 4) if totals["prompt_tokens"] else None
+        return roles
+
+
+# Process-wide prefix reuse of every LLM call; PREFIX_REUSE_WINDOW prompts per model are compared
+prefix_reuse = PrefixReuse(window=int(os.getenv('PREFIX_REUSE_WINDOW', 8)))
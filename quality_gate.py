@@ -0,0 +1,112 @@
+import re
+from retrieval_index import strip_html, tokenize
+
+# Thresholds used when the genre config does not set them
+QUALITY_DEFAULTS = {
+    "MIN_WORDS_PER_CHAPTER": 1600,
+    "MAX_WORDS_PER_CHAPTER": 3000,
+    "MIN_KEY_EVENT_COVERAGE": 0.6,   # share of outline key events the chapter must mention
+    "MAX_REPEATED_TRIGRAMS": 0.08,   # share of word trigrams that may be repeats
+    "MIN_DIALOGUE_RATIO": 0.05,      # share of words inside quotation marks
+    "MAX_DIALOGUE_RATIO": 0.6,
+}
+
+WORD_PATTERN = re.compile(r"[A-Za-z0-9']+")
+QUOTE_PATTERN = re.compile(r'"([^"]*)"|“([^”]*)”')
+
+
+def words_of(text):
+    return WORD_PATTERN.findall(strip_html(text))
+
+
+def repeated_trigram_ratio(words):
+    """
+    Returns the share of word trigrams that occur more than once in `words`.
+    """
+    trigrams = list(zip(words, words[1:], words[2:]))
+    if not trigrams:
+        return 0.0
+    return round(1 - len(set(trigrams)) / len(trigrams), 4)
+
+
+def dialogue_ratio(text):
+    """
+    Returns the share of words that are inside quotation marks.
+    """
+    text = strip_html(text)
+    total = len(WORD_PATTERN.findall(text))
+    if not total:
+        return 0.0
+    quoted = sum(len(WORD_PATTERN.findall(a or b)) for a, b in QUOTE_PATTERN.findall(text))
+    return round(quoted / total, 4)
+
+
+def key_event_coverage(text, key_events, min_overlap=0.5):
+    """
+    Returns the share of `key_events` the text covers, and the events it misses.
+    An event counts as covered when at least `min_overlap` of its content words
+    appear in the text.
+    """
+    if not key_events:
+        return 1.0, []
+    terms = set(tokenize(strip_html(text)))
+    missed = []
+    for event in key_events:
+        event_terms = set(tokenize(event))
+        if event_terms and len(event_terms & terms) / len(event_terms) < min_overlap:
+            missed.append(event)
+    return round(1 - len(missed) / len(key_events), 4), missed
+
+
+class QualityReport:
+    """
+    Result of the local chapter checks: the measured values, the checks that
+    failed and whether the chapter passed them all.
+    """
+
+    def __init__(self, measurements, failures):
+        self.measurements = measurements
+        self.failures = failures
+
+    @property
+    def passed(self):
+        return not self.failures
+
+    def summary(self):
+        return "passed" if self.passed else "; ".join(self.failures)
+
+    def to_dict(self):
+        return {"passed": self.passed, "failures": list(self.failures), **self.measurements}
+
+
+def assess_chapter(text, key_events=None, genre_config=None):
+    """
+    Checks a chapter without calling a model: word count against the genre's
+    MIN/MAX_WORDS_PER_CHAPTER, coverage of the outline's key events, repeated
+    trigrams and the share of dialogue. Thresholds come from the genre config,
+    falling back to QUALITY_DEFAULTS.
+    """
+    config = dict(QUALITY_DEFAULTS)
+    config.update({name: value for name, value in (genre_config or {}).items() if name in QUALITY_DEFAULTS})
+    words = words_of(text)
+    coverage, missed = key_event_coverage(text, key_events or [])
+    measurements = {
+        "words": len(words),
+        "key_event_coverage": coverage,
+        "repeated_trigrams": repeated_trigram_ratio([word.lower() for word in words]),
+        "dialogue_ratio": dialogue_ratio(text),
+    }
+
+    failures = []
+    if measurements["words"] < config["MIN_WORDS_PER_CHAPTER"]:
+        failures.append(f"too short ({measurements['words']} words, minimum {config['MIN_WORDS_PER_CHAPTER']})")
+    elif measurements["words"] > config["MAX_WORDS_PER_CHAPTER"]:
+        failures.append(f"too long ({measurements['words']} words, maximum {config['MAX_WORDS_PER_CHAPTER']})")
+    if coverage < config["MIN_KEY_EVENT_COVERAGE"]:
+        failures.append("key events missing: " + " | ".join(missed))
+    if measurements["repeated_trigrams"] > config["MAX_REPEATED_TRIGRAMS"]:
+        failures.append(f"repetitive phrasing ({measurements['repeated_trigrams']:.0%} repeated trigrams)")
+    if not config["MIN_DIALOGUE_RATIO"] <= measurements["dialogue_ratio"] <= config["MAX_DIALOGUE_RATIO"]:
+        failures.append(f"dialogue balance off ({measurements['dialogue_ratio']:.0%} of words in dialogue, "
+                        f"expected {config['MIN_DIALOGUE_RATIO']:.0%}-{config['MAX_DIALOGUE_RATIO']:.0%})")
+    return QualityReport(measurements, failures)
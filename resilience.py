@@ -0,0 +1,234 @@
+import os
+import time
+import random
+import logging
+import threading
+
+logger = logging.getLogger("Resilience")
+
+# Exception class names (litellm, httpx, requests) that mean the backend may succeed if asked again
+TRANSIENT_ERROR_NAMES = {
+    "Timeout", "TimeoutError", "ReadTimeout", "ConnectTimeout", "APITimeoutError",
+    "APIConnectionError", "ConnectionError", "ServiceUnavailableError", "InternalServerError",
+    "RateLimitError", "BadGatewayError", "RemoteProtocolError",
+}
+
+
+def is_transient(error):
+    """
+    Returns True for errors worth retrying: timeouts, dropped connections,
+    rate limits and 5xx responses from the model backend.
+    """
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    if any(cls.__name__ in TRANSIENT_ERROR_NAMES for cls in type(error).__mro__):
+        return True
+    status = getattr(error, "status_code", None)
+    return isinstance(status, int) and (status == 429 or status >= 500)
+
+
+def is_retryable_task_error(error):
+    """
+    Returns True when a failed task is worth running again: its LLM call failed on
+    a transient error or an open circuit. crewai may wrap the error of the call,
+    so the errors it was raised from count too.
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        if is_transient(error) or isinstance(error, CircuitOpenError):
+            return True
+        seen.add(id(error))
+        error = error.__cause__ or error.__context__
+    return False
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter: the delay before retry n is drawn
+    uniformly from [0, min(max_delay, base_delay * 2**n)].
+    """
+
+    def __init__(self, attempts=3, base_delay=2.0, max_delay=60.0, rng=None):
+        self.attempts = max(1, int(attempts))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rng = rng or random.Random()
+
+    def delay(self, retry):
+        return self.rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** retry))
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Stops calls to an unhealthy backend. After `failure_threshold` consecutive
+    transient failures the circuit opens: callers (and the scheduler, through
+    wait_until_available) wait `reset_timeout` seconds, then a single probe
+    call is let through. Its success closes the circuit, its failure opens it
+    again.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=60.0, clock=time.monotonic):
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._condition = threading.Condition()
+
+    def _refresh(self):
+        if self.state == "open" and self.clock() - self.opened_at >= self.reset_timeout:
+            self.state = "half_open"
+            self._probing = False
+
+    def _wait(self, deadline):
+        """
+        Waits for a state change or the end of the open period; False once `deadline` has passed.
+        """
+        timeout = None
+        if self.state == "open":
+            timeout = max(0.0, self.opened_at + self.reset_timeout - self.clock())
+        if deadline is not None:
+            remaining = deadline - self.clock()
+            if remaining <= 0:
+                return False
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        self._condition.wait(timeout)
+        return True
+
+    def acquire(self, timeout=None):
+        """
+        Blocks until a call may go to the backend. Raises CircuitOpenError
+        if that takes longer than `timeout` seconds.
+        """
+        deadline = None if timeout is None else self.clock() + timeout
+        with self._condition:
+            while True:
+                self._refresh()
+                if self.state == "closed":
+                    return
+                if self.state == "half_open" and not self._probing:
+                    self._probing = True
+                    logger.info("Circuit half open: probing the backend")
+                    return
+                if not self._wait(deadline):
+                    raise CircuitOpenError("Model backend circuit is open.")
+
+    def wait_until_available(self, timeout=None):
+        """
+        Blocks while the circuit is open, without taking the probe slot.
+        Returns False if it is still open after `timeout` seconds.
+        """
+        deadline = None if timeout is None else self.clock() + timeout
+        with self._condition:
+            while True:
+                self._refresh()
+                if self.state != "open":
+                    return True
+                logger.debug("Circuit open: holding back new tasks")
+                if not self._wait(deadline):
+                    return False
+
+    def record_success(self):
+        with self._condition:
+            if self.state != "closed":
+                logger.info("Circuit closed: backend is healthy again")
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+            self._condition.notify_all()
+
+    def record_failure(self):
+        with self._condition:
+            self.failures += 1
+            if self.state == "half_open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+                logger.warning(f"Circuit open after {self.failures} consecutive failures; pausing for {self.reset_timeout}s")
+                self.state = "open"
+                self.opened_at = self.clock()
+                self._probing = False
+            self._condition.notify_all()
+
+
+def call_with_retry(call, policy, breaker=None, retryable=is_transient, on_retry=None, sleep=time.sleep, label="call"):
+    """
+    Calls `call()` until it succeeds, `policy.attempts` times at most, sleeping
+    a jittered backoff delay between attempts. Only errors `retryable` accepts
+    are retried. With a `breaker`, every attempt waits for the circuit and
+    reports its outcome to it. `on_retry(retry, error)` runs before each retry.
+    """
+    for attempt in range(policy.attempts):
+        if breaker is not None:
+            breaker.acquire()
+        try:
+            result = call()
+        except Exception as e:
+            if breaker is not None:
+                # Only backend trouble counts against the circuit; any other error means it answered
+                if is_transient(e):
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+            if attempt + 1 >= policy.attempts or not retryable(e):
+                raise
+            delay = policy.delay(attempt)
+            logger.warning(f"{label} failed ({type(e).__name__}: {e}); retry {attempt + 1} of {policy.attempts - 1} in {delay:.1f}s")
+            if on_retry is not None:
+                on_retry(attempt + 1, e)
+            sleep(delay)
+            continue
+        if breaker is not None:
+            breaker.record_success()
+        return result
+
+
+def llm_retry_policy():
+    """
+    Retry policy of single LLM calls.
+
+    LLM_RETRIES: attempts per call (default 3)
+    LLM_RETRY_BASE_DELAY / LLM_RETRY_MAX_DELAY: backoff bounds in seconds (default 2 / 60)
+    """
+    return RetryPolicy(attempts=int(os.getenv('LLM_RETRIES', 3)),
+                       base_delay=float(os.getenv('LLM_RETRY_BASE_DELAY', 2)),
+                       max_delay=float(os.getenv('LLM_RETRY_MAX_DELAY', 60)))
+
+
+def task_retry_policy():
+    """
+    Retry policy of whole tasks. TASK_RETRIES: extra attempts per task (default 1).
+    """
+    return RetryPolicy(attempts=1 + int(os.getenv('TASK_RETRIES', 1)),
+                       base_delay=float(os.getenv('LLM_RETRY_BASE_DELAY', 2)),
+                       max_delay=float(os.getenv('LLM_RETRY_MAX_DELAY', 60)))
+
+
+def llm_timeout():
+    """
+    Per-call timeout in seconds for the model backend (LLM_TIMEOUT, default 600; 0 disables it).
+    """
+    timeout = float(os.getenv('LLM_TIMEOUT', 600))
+    return timeout or None
+
+
+_breaker = None
+_breaker_lock = threading.Lock()
+
+
+def get_circuit_breaker():
+    """
+    Returns the process-wide circuit breaker of the model backend.
+
+    CIRCUIT_FAILURE_THRESHOLD: consecutive failed calls that open it (default 5)
+    CIRCUIT_RESET_SECONDS: how long it stays open before probing (default 60)
+    """
+    global _breaker
+    with _breaker_lock:
+        if _breaker is None:
+            _breaker = CircuitBreaker(failure_threshold=int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', 5)),
+                                      reset_timeout=float(os.getenv('CIRCUIT_RESET_SECONDS', 60)))
+        return _breaker
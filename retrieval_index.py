@@ -0,0 +1,130 @@
+import os
+import re
+import json
+import math
+import logging
+import threading
+from collections import Counter
+
+logger = logging.getLogger("RetrievalIndex")
+
+TAG_PATTERN = re.compile(r"<[^>]+>")
+TERM_PATTERN = re.compile(r"[a-z0-9']+")
+STOPWORDS = set("""
+a an and are as at be been but by for from had has have he her hers him his i in into is it its me my of on or our
+she so than that the their them then there they this to was we were what when which who will with would you your
+""".split())
+
+
+def strip_html(text):
+    return TAG_PATTERN.sub(" ", text or "")
+
+
+def tokenize(text):
+    return [term for term in TERM_PATTERN.findall(text.lower()) if term not in STOPWORDS and len(term) > 1]
+
+
+def split_passages(text, passage_words=150):
+    """
+    Splits chapter text into passages of about `passage_words` words, on paragraph boundaries.
+    """
+    passages = []
+    current = []
+    count = 0
+    for paragraph in re.split(r"\n\s*\n|</p>", text or ""):
+        paragraph = " ".join(strip_html(paragraph).split())
+        if not paragraph:
+            continue
+        current.append(paragraph)
+        count += len(paragraph.split())
+        if count >= passage_words:
+            passages.append("\n".join(current))
+            current, count = [], 0
+    if current:
+        passages.append("\n".join(current))
+    return passages
+
+
+class RetrievalIndex:
+    """
+    BM25 index over the passages of every written chapter, kept on disk as JSON.
+    Adding a chapter replaces its previous passages, so it can be re-indexed
+    after every revision.
+    """
+
+    def __init__(self, path, passage_words=150, k1=1.5, b=0.75):
+        self.path = path
+        self.passage_words = passage_words
+        self.k1 = k1
+        self.b = b
+        self.passages = []
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.passages = json.load(f)["passages"]
+        self._reindex()
+
+    def _reindex(self):
+        self._term_counts = [Counter(tokenize(passage["text"])) for passage in self.passages]
+        self._lengths = [sum(counts.values()) for counts in self._term_counts]
+        self._average_length = sum(self._lengths) / len(self._lengths) if self._lengths else 0
+        self._document_frequency = Counter()
+        for counts in self._term_counts:
+            self._document_frequency.update(counts.keys())
+
+    def add_chapter(self, chapter_number, text):
+        """
+        Indexes (or re-indexes) the text of `chapter_number` and saves the index.
+        """
+        passages = [{"chapter": chapter_number, "passage": i + 1, "text": passage}
+                    for i, passage in enumerate(split_passages(text, self.passage_words))]
+        with self._lock:
+            self.passages = [p for p in self.passages if p["chapter"] != chapter_number] + passages
+            self.passages.sort(key=lambda p: (p["chapter"], p["passage"]))
+            self._reindex()
+            self._save()
+        logger.info(f"Indexed chapter {chapter_number}: {len(passages)} passages")
+
+    def _save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"passages": self.passages}, f)
+        os.replace(temp_path, self.path)
+
+    def query(self, text, k=4, before_chapter=None):
+        """
+        Returns up to `k` passages ranked by BM25 score for the terms in `text`,
+        optionally only from chapters before `before_chapter`. Each result is a
+        dict with chapter, passage, text and score.
+        """
+        terms = set(tokenize(text))
+        with self._lock:
+            total = len(self.passages)
+            scored = []
+            for index, passage in enumerate(self.passages):
+                if before_chapter is not None and passage["chapter"] >= before_chapter:
+                    continue
+                counts = self._term_counts[index]
+                length_norm = 1 - self.b + self.b * self._lengths[index] / (self._average_length or 1)
+                score = 0.0
+                for term in terms:
+                    frequency = counts.get(term)
+                    if not frequency:
+                        continue
+                    df = self._document_frequency[term]
+                    idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+                    score += idf * frequency * (self.k1 + 1) / (frequency + self.k1 * length_norm)
+                if score > 0:
+                    scored.append(dict(passage, score=round(score, 4)))
+        scored.sort(key=lambda p: (-p["score"], p["chapter"], p["passage"]))
+        return scored[:k]
+
+
+def format_passages(results):
+    """
+    Renders query results for a task prompt.
+    """
+    return "\n\n".join(f"[Chapter {r['chapter']}, passage {r['passage']}]\n{r['text']}" for r in results)
@@ -0,0 +1,108 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from datetime import datetime
+
+logger = logging.getLogger("RunJournal")
+
+
+class RunJournal:
+    """
+    Persists the output of every completed task to a run directory, so an
+    interrupted book can be resumed without repeating finished LLM calls.
+
+    Each task is stored as `<run_dir>/tasks/<key>.json`, written atomically, with
+    a hash of the task description. A recorded output is only reused while the
+    description is unchanged.
+    """
+
+    def __init__(self, run_dir):
+        self.run_dir = run_dir
+        self.tasks_dir = os.path.join(run_dir, "tasks")
+        self._lock = threading.Lock()
+        os.makedirs(self.tasks_dir, exist_ok=True)
+
+    @staticmethod
+    def _digest(description):
+        return hashlib.sha256(description.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.tasks_dir, f"{key}.json")
+
+    def _write_json(self, path, data):
+        temp_path = f"{path}.tmp"
+        with self._lock:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+            os.replace(temp_path, path)
+
+    def record(self, key, description, output, agent=None):
+        """
+        Stores the output of the task registered as `key`.
+        """
+        self._write_json(self._path(key), {
+            "key": key,
+            "agent": agent,
+            "description_sha256": self._digest(description),
+            "completed": time.time(),
+            "output": output,
+        })
+        logger.info(f"Recorded task {key} in {self.run_dir}")
+
+    def lookup(self, key, description):
+        """
+        Returns the recorded output for `key`, or None if the task has not
+        completed or its description has changed since it was recorded.
+        """
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if entry.get("description_sha256") != self._digest(description):
+            logger.info(f"Task {key} changed since it was recorded; it will run again.")
+            return None
+        return entry["output"]
+
+    def completed_keys(self):
+        return sorted(name[:-len(".json")] for name in os.listdir(self.tasks_dir) if name.endswith(".json"))
+
+    def write_metadata(self, **metadata):
+        self._write_json(os.path.join(self.run_dir, "run.json"), metadata)
+
+    def read_metadata(self):
+        try:
+            with open(os.path.join(self.run_dir, "run.json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+
+def new_run_dir(runs_folder):
+    """
+    Creates and returns a fresh run directory inside `runs_folder`, named by its
+    start time to the microsecond. The directory is claimed with exist_ok=False,
+    so runs started at the same moment (e.g. books of a batch sharing a runs
+    folder) never share one.
+    """
+    os.makedirs(runs_folder, exist_ok=True)
+    while True:
+        path = os.path.join(runs_folder, datetime.now().strftime("%Y%m%d-%H%M%S-%f"))
+        try:
+            os.makedirs(path)
+            return path
+        except FileExistsError:
+            continue
+
+
+def latest_run_dir(runs_folder):
+    """
+    Returns the most recent run directory inside `runs_folder`, or None.
+    """
+    if not os.path.isdir(runs_folder):
+        return None
+    runs = sorted(name for name in os.listdir(runs_folder) if os.path.isdir(os.path.join(runs_folder, name)))
+    return os.path.join(runs_folder, runs[-1]) if runs else None
@@ -0,0 +1,111 @@
+import re
+from pywriter.model.chapter import Chapter
+from pywriter.model.scene import Scene
+from pywriter.model.id_generator import create_id
+
+# Scene breakdown format the outline stage is asked for in scene mode
+SCENE_FORMAT = """Scene 1: <scene title>
+Goal: <what the point-of-view character wants in this scene>
+Conflict: <what stands in the way>
+Outcome: <how the scene ends>
+Characters: <names, comma separated>
+Setting: <where and when>"""
+
+SCENE_PATTERN = re.compile(r"^[#*\s]*Scene (\d+)\s*[:.\-–]\s*(.*?)[*\s]*$", re.IGNORECASE)
+SCENE_FIELD_PATTERN = re.compile(r"^[#*\s-]*(Goal|Conflict|Outcome|Characters|Setting)[*\s]*:[*\s]*(.*)$", re.IGNORECASE)
+
+# yWriter scene status "Outline" and "Draft", see Scene.STATUS
+STATUS_OUTLINE = 1
+STATUS_DRAFT = 2
+
+
+def parse_scenes(text):
+    """
+    Parses a "Scene N: Title" breakdown into a list of dicts with number,
+    title, goal, conflict, outcome, characters and setting.
+    """
+    scenes = []
+    current = None
+    for line in (text or "").splitlines():
+        match = SCENE_PATTERN.match(line)
+        if match:
+            current = {"number": int(match.group(1)), "title": match.group(2).strip(), "goal": "", "conflict": "",
+                       "outcome": "", "characters": "", "setting": ""}
+            scenes.append(current)
+            continue
+        field = SCENE_FIELD_PATTERN.match(line)
+        if field and current is not None:
+            current[field.group(1).lower()] = field.group(2).strip()
+    return scenes
+
+
+def scenes_from_key_events(key_events, setting=""):
+    """
+    One scene per outline key event, for outlines without a scene breakdown.
+    """
+    return [{"number": number, "title": event.rstrip("."), "goal": event, "conflict": "", "outcome": "",
+             "characters": "", "setting": setting}
+            for number, event in enumerate(key_events, start=1)]
+
+
+class ScenePlan:
+    """
+    The scenes of one chapter as pywriter elements: a Chapter whose srtScenes
+    lists the IDs of its Scene objects, in story order.
+    """
+
+    def __init__(self, chapter_number, scene_specs, taken_ids=None):
+        self.chapter_number = chapter_number
+        self.chapter = Chapter()
+        self.chapter.title = f"Chapter {chapter_number}"
+        self.chapter.chLevel = 0
+        self.chapter.chType = 0
+        self.chapter.srtScenes = []
+        self.scenes = {}
+        taken_ids = taken_ids if taken_ids is not None else set()
+        for spec in scene_specs:
+            scene_id = create_id(taken_ids)
+            taken_ids.add(scene_id)
+            scene = Scene()
+            scene.title = spec["title"] or f"Scene {spec['number']}"
+            scene.desc = spec.get("setting", "")
+            scene.goal = spec.get("goal", "")
+            scene.conflict = spec.get("conflict", "")
+            scene.outcome = spec.get("outcome", "")
+            scene.notes = spec.get("characters", "")
+            scene.scType = 0
+            scene.status = STATUS_OUTLINE
+            self.scenes[scene_id] = scene
+            self.chapter.srtScenes.append(scene_id)
+
+    def __len__(self):
+        return len(self.chapter.srtScenes)
+
+    def ordered(self):
+        return [(scene_id, self.scenes[scene_id]) for scene_id in self.chapter.srtScenes]
+
+    def brief(self, scene_id):
+        """
+        Returns the scene's own part of a drafting prompt.
+        """
+        scene = self.scenes[scene_id]
+        position = self.chapter.srtScenes.index(scene_id) + 1
+        lines = [f"Scene {position} of {len(self)}: {scene.title}"]
+        for label, value in (("Goal", scene.goal), ("Conflict", scene.conflict), ("Outcome", scene.outcome),
+                             ("Characters", scene.notes), ("Setting", scene.desc)):
+            if value:
+                lines.append(f"{label}: {value}")
+        return "\n".join(lines)
+
+    def set_draft(self, scene_id, text):
+        self.scenes[scene_id].sceneContent = text
+        self.scenes[scene_id].status = STATUS_DRAFT
+
+    def word_count(self):
+        return sum(scene.wordCount for scene in self.scenes.values())
+
+    def draft_text(self):
+        """
+        Returns the scene drafts joined with scene breaks, in chapter order.
+        """
+        return "\n\n* * *\n\n".join((scene.sceneContent or "").strip() for _, scene in self.ordered())
@@ -0,0 +1,267 @@
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+logger = logging.getLogger("Scheduler")
+
+
+def build_task_graph(tasks, after=None):
+    """
+    Derives a dependency graph from each task's `context`, plus the ordering-only
+    dependencies in `after` (id(task) -> tasks that must finish first). Unlike
+    context, `after` only orders tasks that are already part of the graph.
+
+    Returns (order, dependencies) where `order` lists every task to run, in the
+    order it was given, and `dependencies` maps id(task) to the ids of the tasks
+    it has to wait for. Context tasks that already have an output are treated as
+    done; context tasks that have not run yet are pulled into the graph.
+    """
+    order = []
+    dependencies = {}
+    after = after or {}
+    requested = {id(task) for task in tasks}
+    pending = list(tasks)
+    while pending:
+        task = pending.pop(0)
+        if id(task) in dependencies:
+            continue
+        order.append(task)
+        dependencies[id(task)] = []
+        for upstream in task.context or []:
+            if upstream.output is not None and id(upstream) not in requested:
+                continue  # Already executed, e.g. an outline task reused by a chapter
+            dependencies[id(task)].append(id(upstream))
+            pending.append(upstream)
+        for upstream in after.get(id(task), []):
+            if id(upstream) in requested and id(upstream) not in dependencies[id(task)]:
+                dependencies[id(task)].append(id(upstream))
+
+    # Walk the graph once to reject cycles before anything is executed
+    state = {}
+    for task in order:
+        stack = [(id(task), iter(dependencies[id(task)]))]
+        state[id(task)] = "visiting"
+        while stack:
+            key, children = stack[-1]
+            child = next(children, None)
+            if child is None:
+                state[key] = "done"
+                stack.pop()
+            elif state.get(child) == "visiting":
+                raise ValueError("Task graph contains a dependency cycle.")
+            elif child not in state:
+                state[child] = "visiting"
+                stack.append((child, iter(dependencies[child])))
+    return order, dependencies
+
+
+def critical_path_length(order, dependencies):
+    """
+    Returns the number of tasks on the longest dependency chain.
+    """
+    depth = {}
+    remaining = list(order)
+    while remaining:
+        for task in list(remaining):
+            upstream = dependencies[id(task)]
+            if all(key in depth for key in upstream):
+                depth[id(task)] = 1 + max((depth[key] for key in upstream), default=0)
+                remaining.remove(task)
+    return max(depth.values(), default=0)
+
+
+def parse_stage_limits(value):
+    """
+    Parses a "Stage=limit,Stage=limit" string (e.g. "Writer=1,Researcher=2") into a dict.
+    """
+    limits = {}
+    for item in (value or "").split(","):
+        if not item.strip():
+            continue
+        stage, _, limit = item.partition("=")
+        limits[stage.strip()] = max(1, int(limit))
+    return limits
+
+
+def run_task_graph(tasks, run_task, max_workers=1, stage_of=None, stage_limits=None, default_stage_limit=None, fail_fast=True, after=None,
+                   admission=None):
+    """
+    Runs `tasks` (and any unexecuted context tasks) as soon as their context is
+    complete, with at most `max_workers` tasks in flight at once.
+
+    `run_task` is called with a single task and its return value is collected.
+    Returns a dict mapping id(task) to that result.
+
+    When `stage_of` is given, it maps a task to a stage name and at most
+    `stage_limits[stage]` (or `default_stage_limit`) tasks of a stage run at the
+    same time. Ready tasks are started in the order they were given, so earlier
+    work (e.g. an earlier chapter) always goes first when a stage frees up.
+
+    If a task raises and `fail_fast` is set, no new tasks are started, the
+    running ones are allowed to finish and the first exception is re-raised.
+    Otherwise the failure is logged, the tasks depending on it are skipped and
+    everything else keeps running.
+
+    `after` adds dependencies that are not part of a task's context, see
+    build_task_graph. They only order tasks: when such an upstream task fails or
+    is skipped, the tasks waiting on it still run.
+
+    `admission`, when given, is called before every task is started. It may
+    block to pause scheduling (e.g. while the model backend is unhealthy);
+    tasks already running are not affected.
+    """
+    order, dependencies = build_task_graph(tasks, after=after)
+    max_workers = max(1, int(max_workers))
+    stage_limits = stage_limits or {}
+    logger.info(f"Scheduling {len(order)} tasks, critical path {critical_path_length(order, dependencies)}, max concurrency {max_workers}")
+
+    position = {id(task): index for index, task in enumerate(order)}
+    ordering_only = {(id(task), id(upstream)) for task in order for upstream in (after or {}).get(id(task), [])
+                     if id(upstream) not in {id(context_task) for context_task in task.context or []}}
+    waiting_on = {key: set(upstream) for key, upstream in dependencies.items()}
+    dependents = {key: [] for key in dependencies}
+    for key, upstream in dependencies.items():
+        for upstream_key in upstream:
+            dependents[upstream_key].append(key)
+
+    def stage_is_free(task):
+        if stage_of is None:
+            return True
+        stage = stage_of(task)
+        limit = stage_limits.get(stage, default_stage_limit)
+        if limit is None:
+            return True
+        return sum(1 for t in running.values() if stage_of(t) == stage) < limit
+
+    def skip_dependents(task):
+        blocked = [id(task)]
+        while blocked:
+            upstream_key = blocked.pop()
+            for key in dependents[upstream_key]:
+                if key in skipped:
+                    continue
+                if (key, upstream_key) in ordering_only:
+                    waiting_on[key].discard(upstream_key)
+                    if not waiting_on[key]:
+                        ready.append(order[position[key]])
+                    continue
+                skipped.add(key)
+                logger.warning(f"Skipping task because an upstream task failed: {order[position[key]].description[:80]}")
+                blocked.append(key)
+
+    ready = [task for task in order if not waiting_on[id(task)]]
+    results = {}
+    running = {}
+    skipped = set()
+    failure = None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while running or (ready and failure is None):
+            for task in list(ready):
+                if failure is not None or len(running) >= max_workers:
+                    break
+                if not stage_is_free(task):
+                    continue
+                if admission is not None:
+                    admission()
+                ready.remove(task)
+                logger.debug(f"Starting task: {task.description[:80]}")
+                running[executor.submit(run_task, task)] = task
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                task = running.pop(future)
+                try:
+                    results[id(task)] = future.result()
+                except Exception as e:
+                    if fail_fast:
+                        logger.error(f"Task failed: {task.description[:80]} ({e})")
+                        failure = failure or e
+                    else:
+                        logger.exception(f"Task failed: {task.description[:80]}", exc_info=e)
+                        skip_dependents(task)
+                    continue
+                for key in dependents[id(task)]:
+                    waiting_on[key].discard(id(task))
+                    if not waiting_on[key] and key not in skipped:
+                        ready.append(order[position[key]])
+            ready.sort(key=lambda t: position[id(t)])
+
+    if failure is not None:
+        raise failure
+    return results
+
+
+class FairGate:
+    """
+    Shares `slots` concurrent task slots between several clients, e.g. the
+    books of a batch. A free slot goes to the next waiting client in turn, so a
+    client with many ready tasks cannot starve the others.
+    """
+
+    def __init__(self, slots):
+        self.slots = max(1, slots)
+        self._condition = threading.Condition()
+        self._waiting = {}  # client -> tickets of its waiting tasks, oldest first
+        self._turns = deque()  # clients with waiting tasks, next to be served first
+        self._granted = set()
+        self._active = 0
+
+    @contextmanager
+    def slot(self, client):
+        ticket = object()
+        with self._condition:
+            if client not in self._waiting:
+                self._waiting[client] = deque()
+                self._turns.append(client)
+            self._waiting[client].append(ticket)
+            self._grant()
+            while ticket not in self._granted:
+                self._condition.wait()
+            self._granted.discard(ticket)
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._active -= 1
+                self._grant()
+
+    def _grant(self):
+        while self._active < self.slots and self._turns:
+            client = self._turns.popleft()
+            tickets = self._waiting[client]
+            self._granted.add(tickets.popleft())
+            self._active += 1
+            if tickets:
+                self._turns.append(client)
+            else:
+                del self._waiting[client]
+        self._condition.notify_all()
+
+
+class StageSlots:
+    """
+    Per-stage concurrency limits shared by every task graph of a run, including
+    graphs started from inside a running task's hooks (revision rounds, length
+    continuations, scene drafts), which run_task_graph's own stage counting
+    does not see. A task holds its stage's slot only while it calls the model.
+    """
+
+    def __init__(self, limits=None, default_limit=None):
+        self.limits = dict(limits or {})
+        self.default_limit = default_limit
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, stage):
+        limit = self.limits.get(stage, self.default_limit)
+        if limit is None:
+            yield
+            return
+        with self._lock:
+            semaphore = self._semaphores.setdefault(stage, threading.BoundedSemaphore(limit))
+        with semaphore:
+            yield
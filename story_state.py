@@ -0,0 +1,135 @@
+import os
+import re
+import json
+import logging
+import threading
+from context_assembler import estimate_tokens, truncate_to_tokens
+
+logger = logging.getLogger("StoryState")
+
+# Section headings of the Memory Keeper's update, mapped to StoryState fields
+UPDATE_SECTIONS = {
+    "CHARACTERS": "characters",
+    "OPEN THREADS": "open_threads",
+    "RESOLVED THREADS": "resolved_threads",
+    "ITEMS": "items",
+    "TIMELINE": "timeline",
+}
+HEADING_PATTERN = re.compile(r"^[#*\s]*(CHARACTERS|OPEN THREADS|RESOLVED THREADS|ITEMS|TIMELINE)[*\s]*:?[*\s]*$", re.IGNORECASE)
+
+UPDATE_FORMAT = """CHARACTERS:
+- [Full name]: [where they are, what they know, how they feel, at the end of this chapter]
+OPEN THREADS:
+- [Unresolved plot thread or question raised so far]
+RESOLVED THREADS:
+- [Thread from the current story state that this chapter resolved]
+ITEMS:
+- [Item name]: [who has it or where it is now]
+TIMELINE:
+- [One line per key event of this chapter, in order]"""
+
+
+def _split_entry(line):
+    name, separator, value = line.partition(":")
+    if not separator:
+        return None, line.strip()
+    return name.strip().strip("*"), value.strip()
+
+
+class StoryState:
+    """
+    Compact continuity record for the book: the current state of every
+    character, open plot threads, where each item is, and a timeline of key
+    events. It is updated from the Memory Keeper's output after every chapter
+    and rendered as a bounded digest for the next chapters' prompts.
+    """
+
+    def __init__(self):
+        self.characters = {}
+        self.open_threads = []
+        self.items = {}
+        self.timeline = []
+        self.chapters = []
+        self._lock = threading.Lock()
+
+    def apply_update(self, chapter_number, update_text):
+        """
+        Merges a Memory Keeper update (see UPDATE_FORMAT) for `chapter_number` into the state.
+        """
+        parsed = {field: [] for field in UPDATE_SECTIONS.values()}
+        field = None
+        for line in (update_text or "").split("\n"):
+            heading = HEADING_PATTERN.match(line.strip())
+            if heading:
+                field = UPDATE_SECTIONS[heading.group(1).upper()]
+                continue
+            entry = line.strip().lstrip("-*• ").strip()
+            if field and entry:
+                parsed[field].append(entry)
+
+        with self._lock:
+            for entry in parsed["characters"]:
+                name, value = _split_entry(entry)
+                if name:
+                    self.characters[name] = value
+            for entry in parsed["items"]:
+                name, value = _split_entry(entry)
+                if name:
+                    self.items[name] = value
+            resolved = {thread.lower() for thread in parsed["resolved_threads"]}
+            self.open_threads = [thread for thread in self.open_threads if thread.lower() not in resolved]
+            for thread in parsed["open_threads"]:
+                if thread.lower() not in resolved and thread not in self.open_threads:
+                    self.open_threads.append(thread)
+            self.timeline.extend(f"Chapter {chapter_number}: {event}" for event in parsed["timeline"])
+            if chapter_number not in self.chapters:
+                self.chapters.append(chapter_number)
+        logger.info(f"Story state updated after chapter {chapter_number}: {len(self.characters)} characters, "
+                    f"{len(self.open_threads)} open threads, {len(self.items)} items, {len(self.timeline)} events")
+
+    def digest(self, max_tokens):
+        """
+        Renders the state in at most about `max_tokens` tokens. Characters,
+        threads and items are current-state facts and come first; the timeline
+        is cut from the oldest end.
+        """
+        with self._lock:
+            if not self.chapters:
+                return ""
+            parts = []
+            if self.characters:
+                parts.append("Characters:\n" + "\n".join(f"- {name}: {value}" for name, value in self.characters.items()))
+            if self.open_threads:
+                parts.append("Open threads:\n" + "\n".join(f"- {thread}" for thread in self.open_threads))
+            if self.items:
+                parts.append("Items:\n" + "\n".join(f"- {name}: {value}" for name, value in self.items.items()))
+            timeline = list(self.timeline)
+
+        text = "\n".join(parts)
+        remaining = max_tokens - estimate_tokens(text) - estimate_tokens("Recent events:\n")
+        recent = []
+        for event in reversed(timeline):
+            cost = estimate_tokens(f"- {event}\n")
+            if cost > remaining:
+                break
+            recent.insert(0, f"- {event}")
+            remaining -= cost
+        if recent:
+            text = f"{text}\nRecent events:\n" + "\n".join(recent)
+        return truncate_to_tokens(text.strip(), max_tokens)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "characters": dict(self.characters),
+                "open_threads": list(self.open_threads),
+                "items": dict(self.items),
+                "timeline": list(self.timeline),
+                "chapters": list(self.chapters),
+            }
+
+    def save(self, path):
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(temp_path, path)
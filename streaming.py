@@ -0,0 +1,163 @@
+import os
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger("Streaming")
+
+_current = threading.local()
+
+
+# Lines of the agents' ReAct output that are not part of the answer. "Final Answer:"
+# only prefixes it, so just the marker is dropped; the other lines are dropped whole.
+REACT_MARKERS = ("Thought:", "Action:", "Action Input:", "Observation:", "Final Answer:")
+ANSWER_MARKER = "Final Answer:"
+
+
+def partial_path(path, name=None):
+    """
+    Returns the file a stream into `path` writes to: `<path>.<name>.partial` for
+    a named stream (e.g. one per chapter stage), `<path>.partial` otherwise.
+    """
+    return f"{path}.{name}.partial" if name else f"{path}.partial"
+
+
+def atomic_write(path, content):
+    """
+    Writes `content` to `path` through a temporary file of its own that is renamed
+    into place, so readers never see a half-written file and streams into the
+    partial files of `path` are left alone.
+    """
+    directory, name = os.path.split(path)
+    fd, temp_path = tempfile.mkstemp(dir=directory or ".", prefix=f".{name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class TokenStream:
+    """
+    Receives generated text token by token: appends it to a partial file,
+    flushed after every chunk, and reports progress to `progress_callback`
+    (called with the label and the number of words so far) every
+    `progress_every` words.
+
+    The ReAct scaffolding of the agents' output (see REACT_MARKERS) is kept out
+    of the file and the word count. The start of a line is held back only until
+    it can no longer be a marker.
+    """
+
+    def __init__(self, path, label="", progress_callback=None, progress_every=100):
+        self.path = path
+        self.label = label
+        self.progress_callback = progress_callback or log_progress
+        self.progress_every = progress_every
+        self.words = 0
+        self._reported = 0
+        self._at_word_boundary = True
+        # The start of the current line while it may still be a marker; None once it cannot
+        self._line_start = ""
+        self._skip_line = False
+        self._file = open(path, "w", encoding="utf-8")
+
+    def write(self, chunk):
+        if not chunk:
+            return
+        text = self._strip_scaffolding(chunk)
+        if not text:
+            return
+        self._file.write(text)
+        self._file.flush()
+        # Count words as they complete, across chunk boundaries
+        for character in text:
+            if character.isspace():
+                self._at_word_boundary = True
+            elif self._at_word_boundary:
+                self._at_word_boundary = False
+                self.words += 1
+        if self.words - self._reported >= self.progress_every:
+            self._reported = self.words
+            self.progress_callback(self.label, self.words)
+
+    def _strip_scaffolding(self, chunk):
+        text = []
+        for character in chunk:
+            if self._skip_line:
+                if character == "\n":
+                    self._skip_line = False
+                    self._line_start = ""
+                continue
+            if self._line_start is None:
+                text.append(character)
+                if character == "\n":
+                    self._line_start = ""
+                continue
+            start = self._line_start + character
+            stripped = start.lstrip()
+            if character == "\n" or not any(marker.startswith(stripped) for marker in REACT_MARKERS):
+                text.append(start)
+                self._line_start = "" if character == "\n" else None
+            elif stripped == ANSWER_MARKER:
+                self._line_start = None
+            elif stripped in REACT_MARKERS:
+                self._skip_line = True
+            else:
+                self._line_start = start
+        return "".join(text)
+
+    def reset(self):
+        """
+        Discards everything streamed so far, e.g. before a failed call is retried.
+        """
+        self._file.seek(0)
+        self._file.truncate()
+        self.words = 0
+        self._reported = 0
+        self._at_word_boundary = True
+        self._line_start = ""
+        self._skip_line = False
+
+    def close(self):
+        if not self._file.closed:
+            # A held-back line start that never became a marker is text
+            if self._line_start:
+                self._file.write(self._line_start)
+            self._file.close()
+            self.progress_callback(self.label, self.words)
+
+
+def log_progress(label, words):
+    logger.info(f"{label}: {words} words streamed")
+
+
+def current_stream():
+    """
+    Returns the TokenStream LLM calls on this thread should write to, or None.
+    """
+    return getattr(_current, "stream", None)
+
+
+@contextmanager
+def streaming_to(path, label="", progress_callback=None, name=None):
+    """
+    Streams every LLM call made on this thread inside the block to the partial
+    file of `path` (see partial_path), a live view of the text being generated.
+    Does nothing when `path` is None.
+    """
+    if path is None:
+        yield None
+        return
+    stream = TokenStream(partial_path(path, name), label, progress_callback)
+    previous = current_stream()
+    _current.stream = stream
+    try:
+        yield stream
+    finally:
+        _current.stream = previous
+        stream.close()
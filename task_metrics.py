@@ -0,0 +1,150 @@
+import re
+import json
+import time
+import threading
+from contextlib import contextmanager
+from context_assembler import estimate_tokens
+from quality_gate import words_of, repeated_trigram_ratio
+
+_current = threading.local()
+
+
+def stage_name(task_key):
+    """
+    Returns the stage of a journal task key: "chapter-3-write" -> "chapter-write".
+    """
+    return re.sub(r"^chapter-\d+-", "chapter-", task_key)
+
+
+class TaskMetrics:
+    """
+    Records wall time, prompt and completion tokens and LLM time of every task.
+    Token counts are estimated from the prompt and response text, the same way
+    the context assembler budgets them.
+    """
+
+    def __init__(self):
+        self.tasks = []
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def task(self, key, role, restored=False):
+        """
+        Times the task run inside the block; LLM calls made on this thread are attributed to it.
+        """
+        record = {"task": key, "stage": stage_name(key), "role": role, "restored": restored,
+                  "wall_seconds": 0.0, "llm_seconds": 0.0, "llm_calls": 0,
+                  "prompt_tokens": 0, "completion_tokens": 0, "ok": False}
+        previous = getattr(_current, "record", None)
+        _current.record = record
+        started = time.perf_counter()
+        try:
+            yield record
+            record["ok"] = True
+        finally:
+            record["wall_seconds"] = round(time.perf_counter() - started, 4)
+            _current.record = previous
+            with self._lock:
+                self.tasks.append(record)
+
+    def report(self, **metadata):
+        """
+        Returns a machine-readable report: every task, and totals per stage and per role.
+        """
+        with self._lock:
+            tasks = list(self.tasks)
+
+        def summarize(records):
+            summary = {name: round(sum(r[name] for r in records), 4)
+                       for name in ("wall_seconds", "llm_seconds", "llm_calls", "prompt_tokens", "completion_tokens")}
+            summary["tasks"] = len(records)
+            summary["overhead_seconds"] = round(summary["wall_seconds"] - summary["llm_seconds"], 4)
+            summary["tokens_per_second"] = round(summary["completion_tokens"] / summary["llm_seconds"], 2) if summary["llm_seconds"] else 0.0
+            # Quality proxies of the outputs, for tasks that recorded them
+            rated = [r for r in records if "output_words" in r]
+            summary["output_words"] = sum(r["output_words"] for r in rated)
+            for name in ("lexical_diversity", "repeated_trigrams"):
+                summary[name] = round(sum(r[name] for r in rated) / len(rated), 4) if rated else None
+            return summary
+
+        def group(field):
+            groups = {}
+            for record in tasks:
+                groups.setdefault(record[field], []).append(record)
+            return {name: summarize(records) for name, records in sorted(groups.items())}
+
+        return {
+            "metadata": metadata,
+            "run_wall_seconds": round(time.time() - self.started, 4),
+            "totals": summarize(tasks),
+            "stages": group("stage"),
+            "roles": group("role"),
+            "tasks": tasks,
+        }
+
+    def save_report(self, path, sections=None, **metadata):
+        """
+        Writes the report to `path`, with any extra top-level `sections` added.
+        """
+        report = self.report(**metadata)
+        report.update(sections or {})
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        return report
+
+
+def output_quality(text):
+    """
+    Returns cheap quality proxies of a task output: its word count, lexical
+    diversity (distinct words / words) and the share of repeated word trigrams.
+    """
+    words = [word.lower() for word in words_of(text or "")]
+    return {
+        "output_words": len(words),
+        "lexical_diversity": round(len(set(words)) / len(words), 4) if words else 0.0,
+        "repeated_trigrams": repeated_trigram_ratio(words),
+    }
+
+
+def count_tokens(messages, response):
+    """
+    Returns the estimated (prompt, completion) tokens of an LLM call.
+    """
+    if isinstance(messages, str):
+        prompt = messages
+    else:
+        prompt = "\n".join(str(message.get("content", "")) for message in messages)
+    return estimate_tokens(prompt), estimate_tokens(response or "")
+
+
+def record_llm_call(prompt_tokens, completion_tokens, seconds):
+    """
+    Attributes one LLM call to the task running on this thread, if any.
+    """
+    record = getattr(_current, "record", None)
+    if record is None:
+        return
+    record["llm_calls"] += 1
+    record["llm_seconds"] = round(record["llm_seconds"] + seconds, 4)
+    record["prompt_tokens"] += prompt_tokens
+    record["completion_tokens"] += completion_tokens
+
+
+def compare_reports(report, baseline, tolerance=0.2, min_seconds=0.05):
+    """
+    Compares wall time, LLM time and orchestration overhead, in total and per
+    stage, against a baseline report. Returns a list of regressions: metrics more
+    than `tolerance` (relative) and `min_seconds` (absolute) slower than the baseline.
+    """
+    regressions = []
+    scopes = [("total", report["totals"], baseline.get("totals", {}))]
+    scopes += [(f"stage {name}", summary, baseline.get("stages", {}).get(name, {})) for name, summary in report["stages"].items()]
+    for scope, current, previous in scopes:
+        for metric in ("wall_seconds", "llm_seconds", "overhead_seconds"):
+            if metric not in previous:
+                continue
+            difference = current[metric] - previous[metric]
+            if difference > min_seconds and difference > tolerance * previous[metric]:
+                regressions.append(f"{scope} {metric}: {previous[metric]:.3f}s -> {current[metric]:.3f}s")
+    return regressions
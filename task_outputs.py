@@ -0,0 +1,22 @@
+def task_output_text(task):
+    """
+    Returns the text produced by a finished task, or "" if it has not run.
+    """
+    output = task.output
+    if output is None:
+        return ""
+    for attribute in ("output_value", "raw", "raw_output"):
+        value = getattr(output, attribute, None)
+        if value:
+            return str(value)
+    return str(output)
+
+
+def restore_task_output(task, text):
+    """
+    Sets a task's output from previously generated text, so downstream tasks
+    receive it as context without the task being executed again.
+    """
+    from crewai.tasks.task_output import TaskOutput
+    task.output = TaskOutput(description=task.description, raw=text, agent=task.agent.role)
+    return task.output
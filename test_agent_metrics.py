@@ -0,0 +1,66 @@
+import json
+import urllib.request
+from agent_metrics import AgentMetrics, Histogram
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram(buckets=(1, 5, 10))
+    for value in (0.5, 3, 3, 20):
+        histogram.observe(value)
+    assert histogram.counts == [1, 3, 3, 4]
+    assert histogram.sum == 26.5
+    assert histogram.quantile(0.5) == 5
+    assert histogram.quantile(1.0) == float("inf")
+    assert Histogram().quantile(0.5) is None
+
+
+def test_snapshot_counts_per_role():
+    metrics = AgentMetrics()
+    metrics.observe_call("Writer", 2.0, prompt_tokens=100, completion_tokens=400, cache_hit=False)
+    metrics.observe_call("Writer", 0.01, prompt_tokens=100, completion_tokens=400, cache_hit=True)
+    metrics.observe_call("Critic", 1.0, prompt_tokens=50, completion_tokens=10)
+    metrics.observe_retry("Critic")
+    metrics.observe_error("Critic")
+
+    snapshot = metrics.snapshot()
+    assert list(snapshot) == ["Critic", "Writer"]
+    assert snapshot["Writer"]["calls"] == 2
+    assert snapshot["Writer"]["cache_hit_rate"] == 0.5
+    assert snapshot["Writer"]["completion_tokens"] == 800
+    # The cache hit's latency is kept out of the backend's
+    assert snapshot["Writer"]["latency_seconds"]["count"] == 1
+    assert snapshot["Writer"]["cache_hit_latency_seconds"]["count"] == 1
+    assert snapshot["Writer"]["tokens_per_second"] == 200.0
+    assert snapshot["Critic"]["cache_hit_rate"] is None
+    assert snapshot["Critic"]["retries"] == 1
+    assert snapshot["Critic"]["errors"] == 1
+
+
+def test_prometheus_text(tmp_path):
+    metrics = AgentMetrics()
+    metrics.observe_call('Story "Planner"', 0.3, prompt_tokens=10, completion_tokens=20)
+    text = metrics.prometheus_text()
+    assert '# TYPE book_writer_llm_calls_total counter' in text
+    assert 'book_writer_llm_calls_total{role="Story \\"Planner\\""} 1' in text
+    assert 'book_writer_llm_latency_seconds_bucket{role="Story \\"Planner\\"",le="0.1"} 0' in text
+    assert 'book_writer_llm_latency_seconds_bucket{role="Story \\"Planner\\"",le="0.5"} 1' in text
+    assert 'book_writer_llm_latency_seconds_count{role="Story \\"Planner\\""} 1' in text
+
+    path = tmp_path / "book_writer.prom"
+    metrics.write_prometheus(str(path))
+    assert path.read_text() == text
+
+
+def test_serve_metrics_endpoints():
+    metrics = AgentMetrics()
+    metrics.observe_call("Writer", 1.0, prompt_tokens=1, completion_tokens=2)
+    server = metrics.serve(0)
+    try:
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        with urllib.request.urlopen(f"{base}/metrics") as response:
+            assert 'book_writer_llm_calls_total{role="Writer"} 1' in response.read().decode()
+        with urllib.request.urlopen(f"{base}/metrics.json") as response:
+            assert json.loads(response.read())["Writer"]["calls"] == 1
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,75 @@
+import json
+import os
+import pytest
+from batch import load_manifest, run_batch
+
+
+def write_manifest(tmp_path, manifest):
+    path = tmp_path / "books.json"
+    path.write_text(json.dumps(manifest), encoding="utf-8")
+    return str(path)
+
+
+def test_load_manifest_names_books_and_gives_each_its_folders(tmp_path):
+    path = write_manifest(tmp_path, {"books": [{"title": "Low Tide", "genre": "literary_fiction"},
+                                              {"initial_prompt": "A storm.", "num_chapters": 2}]})
+    books = load_manifest(path, output_root="out", runs_root="runs")
+    assert [book["name"] for book in books] == ["low-tide", "book-2"]
+    assert books[0]["output_folder"] == os.path.join("out", "low-tide")
+    assert books[1]["runs_folder"] == os.path.join("runs", "book-2")
+    assert books[1]["num_chapters"] == 2
+
+
+def test_load_manifest_rejects_unknown_fields_and_shared_folders(tmp_path):
+    with pytest.raises(ValueError, match="unknown fields"):
+        load_manifest(write_manifest(tmp_path, [{"title": "A", "chapters": 3}]))
+    with pytest.raises(ValueError, match="share the name"):
+        load_manifest(write_manifest(tmp_path, [{"title": "Low Tide"}, {"name": "low tide"}]))
+    with pytest.raises(ValueError, match="share the output folder"):
+        load_manifest(write_manifest(tmp_path, [{"title": "A", "output_folder": "same"}, {"title": "B", "output_folder": "same"}]))
+
+
+def test_run_batch_runs_every_book_through_one_gate(tmp_path):
+    created = []
+
+    class FakeRun:
+        def __init__(self, **settings):
+            self.settings = settings
+            created.append(settings)
+
+        def run(self):
+            with self.settings["task_gate"].slot(self.settings["name"]):
+                if self.settings["name"] == "broken":
+                    raise RuntimeError("backend unavailable")
+
+    books = load_manifest(write_manifest(tmp_path, [{"title": "Low Tide"}, {"title": "Broken"}]),
+                          output_root=str(tmp_path / "out"), runs_root=str(tmp_path / "runs"))
+    outcomes = run_batch(books, concurrent_tasks=1, create_run=FakeRun)
+
+    assert outcomes == {"low-tide": "done", "broken": "failed: backend unavailable"}
+    assert created[0]["task_gate"] is created[1]["task_gate"]
+    assert all(settings["resume"] is None for settings in created)
+
+
+def test_run_batch_reports_process_wide_metrics_once(tmp_path, monkeypatch):
+    created = []
+
+    class FakeRun:
+        def __init__(self, **settings):
+            created.append(settings)
+
+        def run(self):
+            pass
+
+    monkeypatch.setenv("BENCHMARK_REPORT", str(tmp_path / "batch_report.json"))
+    books = load_manifest(write_manifest(tmp_path, [{"title": "Low Tide"}, {"title": "High Tide"}]),
+                          output_root=str(tmp_path / "out"), runs_root=str(tmp_path / "runs"))
+    run_batch(books, concurrent_tasks=2, create_run=FakeRun)
+
+    # Books leave the process-wide metrics out of their own reports
+    assert all(settings["process_metrics"] is False for settings in created)
+    assert created[0]["benchmark_report"] == os.path.join(str(tmp_path / "out"), "low-tide", "benchmark_report.json")
+    with open(tmp_path / "batch_report.json", encoding="utf-8") as f:
+        report = json.load(f)
+    assert report["books"] == {"low-tide": "done", "high-tide": "done"}
+    assert "agents" in report and "total" in report["prefix_reuse"]
@@ -0,0 +1,16 @@
+from benchmark import compare_role_models
+
+
+def _summary(llm_seconds, words, diversity):
+    return {"llm_seconds": llm_seconds, "output_words": words, "lexical_diversity": diversity, "repeated_trigrams": 0.01}
+
+
+def test_compare_role_models():
+    baseline = {"totals": {"wall_seconds": 100.0}, "roles": {"Editor": _summary(40.0, 3000, 0.5)}}
+    routed = {"totals": {"wall_seconds": 75.0}, "roles": {"Editor": _summary(15.0, 2800, 0.45)}}
+    comparison = compare_role_models(baseline, routed, "Editor")
+    assert comparison["llm_seconds_saved"] == 25.0
+    assert comparison["run_seconds_saved"] == 25.0
+    assert comparison["output_words_change"] == -200
+    assert comparison["lexical_diversity_change"] == -0.05
+    assert compare_role_models(baseline, routed, "Writer") is None
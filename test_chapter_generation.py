@@ -7,7 +7,7 @@ from agents import create_agents
 from unittest.mock import patch, MagicMock
 
 # Mock configuration for testing
-MOCK_MODEL = "ollama/llama3.2:latest"
+MOCK_MODEL = "mock/llama3.2:latest"  # Offline deterministic backend, see mock_llm.py
 MOCK_NUM_CHAPTERS = 3
 MOCK_OUTLINE_CONTEXT = "Test outline context."
 MOCK_GENRE_CONFIG = {
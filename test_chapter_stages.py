@@ -0,0 +1,51 @@
+import pytest
+from chapter_stages import CHAPTER_STAGES, ChapterStage, StageGraphError, validate_stage_graph, stage_inputs
+
+
+def test_chapter_pipeline_ends_with_the_edit():
+    final = validate_stage_graph(CHAPTER_STAGES)
+    assert final.name == "edit"
+    assert [stage.name for stage in CHAPTER_STAGES][:6] == ["research", "outline", "write", "critic", "revise", "edit"]
+    edit = next(stage for stage in CHAPTER_STAGES if stage.name == "edit")
+    assert "revise" in edit.inputs
+
+
+def test_reference_to_a_later_stage_fails_fast():
+    stages = [
+        ChapterStage("write", "Writer", produces_text=True),
+        ChapterStage("revise", "Reviser", inputs=("write", "edit"), produces_text=True),
+        ChapterStage("edit", "Editor", inputs=("write",), produces_text=True),
+    ]
+    with pytest.raises(StageGraphError, match="later stage 'edit'"):
+        validate_stage_graph(stages)
+
+
+def test_unknown_input_fails_fast():
+    with pytest.raises(StageGraphError, match="unknown stage 'draft'"):
+        validate_stage_graph([ChapterStage("edit", "Editor", inputs=("draft",), produces_text=True)])
+
+
+def test_unused_output_is_rejected():
+    stages = [
+        ChapterStage("write", "Writer", produces_text=True),
+        ChapterStage("edit", "Editor", inputs=("write",), produces_text=True),
+        ChapterStage("critic", "Critic", inputs=("write",)),
+    ]
+    with pytest.raises(StageGraphError, match="'critic' is never used"):
+        validate_stage_graph(stages)
+
+
+def test_duplicate_and_missing_text_stage():
+    with pytest.raises(StageGraphError, match="Duplicate"):
+        validate_stage_graph([ChapterStage("write", "Writer", produces_text=True)] * 2)
+    with pytest.raises(StageGraphError, match="produces the chapter text"):
+        validate_stage_graph([ChapterStage("research", "Researcher")])
+
+
+def test_stage_inputs_follow_the_graph():
+    tasks = {"research": "R", "outline": "O", "write": "W", "critic": "C"}
+    assert stage_inputs("revise", tasks) == ["C", "W", "O"]
+    with pytest.raises(StageGraphError, match="created first"):
+        stage_inputs("edit", tasks)
+    with pytest.raises(StageGraphError):
+        stage_inputs("polish", tasks)
@@ -0,0 +1,46 @@
+from context_assembler import (ContextSection, assemble_context, context_budget, estimate_tokens,
+                               summarize_to_tokens, truncate_to_tokens, TRUNCATION_MARKER)
+
+OUTLINE = "\n".join(f"Chapter {n}: Title {n}\nKey Events:\n- Event one of chapter {n}.\n- Event two of chapter {n}." for n in range(1, 21))
+PROFILES = "Mara Quinn (Age: 31)\n- Backstory: " + "She grew up by the sea and never left. " * 40
+
+
+def test_budget_leaves_room_for_output_and_upstream_context():
+    assert context_budget(8192, output_tokens=4000, upstream_tokens=1000, overhead_tokens=600) == 2592
+    assert context_budget(4096, output_tokens=5000) == 256
+
+
+def test_truncation_respects_token_limit():
+    text = truncate_to_tokens(PROFILES, 50)
+    assert estimate_tokens(text) <= 50
+    assert text.endswith(TRUNCATION_MARKER)
+    assert truncate_to_tokens("short", 50) == "short"
+
+
+def test_summary_keeps_structure_lines():
+    digest = summarize_to_tokens(PROFILES + "\n\n" + OUTLINE, 200)
+    assert digest.startswith("Mara Quinn (Age: 31)")
+    assert estimate_tokens(digest) <= 200
+
+
+def test_sections_fill_by_priority_and_keep_given_order():
+    sections = [
+        ContextSection("Overall Book Outline", OUTLINE, priority=1),
+        ContextSection("CHARACTER PROFILES", PROFILES, priority=0),
+        ContextSection("ITEM DESCRIPTIONS", "A brass compass.", priority=2, min_tokens=64),
+    ]
+    budget = estimate_tokens(PROFILES) + 150
+    text, report = assemble_context(sections, budget, label="Chapter 1 write")
+
+    assert report["sections"]["CHARACTER PROFILES"]["mode"] == "full"
+    assert report["sections"]["Overall Book Outline"]["mode"] == "summarized"
+    assert report["sections"]["ITEM DESCRIPTIONS"]["mode"] == "dropped"
+    assert report["tokens"] <= budget
+    assert text.index("Overall Book Outline:") < text.index("CHARACTER PROFILES:")
+
+
+def test_everything_fits_in_a_large_window():
+    sections = [ContextSection("Overall Book Outline", OUTLINE), ContextSection("ITEM DESCRIPTIONS", "")]
+    text, report = assemble_context(sections, 65536)
+    assert text == f"Overall Book Outline:\n{OUTLINE}"
+    assert list(report["sections"]) == ["Overall Book Outline"]
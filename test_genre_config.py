@@ -0,0 +1,69 @@
+import sys
+import types
+import pytest
+from genre_config import GenreConfig, GenreConfigError, GENRE_DEFAULTS, load_genre_config, render_role_fragments
+
+
+@pytest.fixture
+def genres(monkeypatch):
+    """Registers genre modules genres.<name> built from keyword settings."""
+    def add(name, **settings):
+        module = types.ModuleType(f"genres.{name}")
+        module.__dict__.update(settings)
+        monkeypatch.setitem(sys.modules, f"genres.{name}", module)
+    return add
+
+
+def test_literary_fiction_keeps_settings_and_drops_imported_names():
+    config = load_genre_config("literary_fiction")
+    assert isinstance(config, GenreConfig)
+    assert config.name == config["GENRE"] == "literary_fiction"
+    assert config.min_words == 2500 and config.max_words == 4000
+    assert config["CHARACTER_DEPTH"] == 0.9
+    assert config["ITEM_SIGNIFICANCE"] == GENRE_DEFAULTS["ITEM_SIGNIFICANCE"]
+    # Loaded once per process
+    assert load_genre_config("literary_fiction") is config
+
+
+def test_role_fragments_are_rendered_once(genres):
+    genres("seaside", os=types, CHARACTER_DEPTH=0.7, MIN_WORDS_PER_CHAPTER=900)
+    config = load_genre_config("seaside")
+    assert "os" not in config
+    assert config.role_fragment("Character Creator") == "A seaside story. Incorporate the genre-specific character depth: 0.7."
+    assert "at least 900 words" in config.role_fragment("Writer")
+    assert config.role_fragment("Memory Keeper") == ""
+
+
+def test_role_fragments_without_a_genre_do_not_name_one():
+    fragments = render_role_fragments({"CHARACTER_DEPTH": 0.7})
+    assert fragments["Character Creator"] == "Incorporate the genre-specific character depth: 0.7."
+
+
+def test_genres_inherit_from_the_genre_they_extend(genres):
+    genres("coastal", NUM_CHAPTERS=4, PLOT_COMPLEXITY=0.3, NARRATIVE_STYLE="first_person")
+    genres("coastal_noir", EXTENDS="coastal", PLOT_COMPLEXITY=0.9)
+    config = load_genre_config("coastal_noir")
+    assert config.extends == ("coastal",)
+    assert config.num_chapters == 4
+    assert config["PLOT_COMPLEXITY"] == 0.9
+    assert config["NARRATIVE_STYLE"] == "first_person"
+    assert "EXTENDS" not in config
+
+    genres("loop_a", EXTENDS="loop_b")
+    genres("loop_b", EXTENDS="loop_a")
+    with pytest.raises(GenreConfigError, match="cycle"):
+        load_genre_config("loop_a")
+    genres("orphan", EXTENDS="no_such_parent")
+    with pytest.raises(GenreConfigError, match="does not exist"):
+        load_genre_config("orphan")
+
+
+def test_invalid_settings_are_all_reported():
+    with pytest.raises(GenreConfigError) as error:
+        GenreConfig("broken", {"CHARACTER_DEPTH": 1.5, "SYMBOLISM_DENSITY": -0.1, "NUM_CHAPTERS": 0,
+                               "MIN_WORDS_PER_CHAPTER": 5000, "MAX_WORDS_PER_CHAPTER": 4000, "ROLE_MODELS": "Writer"})
+    message = str(error.value)
+    for problem in ("CHARACTER_DEPTH must be a number from 0 to 1", "SYMBOLISM_DENSITY must be a number from 0 to 1",
+                    "NUM_CHAPTERS must be a positive whole number", "MIN_WORDS_PER_CHAPTER (5000) is above MAX_WORDS_PER_CHAPTER",
+                    "ROLE_MODELS must be a dict"):
+        assert problem in message
@@ -0,0 +1,41 @@
+from length_control import count_words, split_scenes, trim_to_words, ending, append_continuation
+
+
+def scene(word, count):
+    return " ".join([word] * count)
+
+
+def test_split_scenes_on_breaks():
+    text = f"{scene('a', 5)}\n\n***\n\n{scene('b', 5)}\n\n* * *\n{scene('c', 5)}"
+    scenes = split_scenes(text)
+    assert len(scenes) == 3
+    assert "".join(scenes) == text
+
+
+def test_trim_drops_whole_scenes():
+    text = f"{scene('a', 40)}\n\n***\n\n{scene('b', 40)}\n\n***\n\n{scene('c', 40)}"
+    trimmed = trim_to_words(text, 100)
+    assert count_words(trimmed) == 80
+    assert trimmed.rstrip().endswith("b")
+    assert "***" in trimmed and not trimmed.rstrip().endswith("***")
+    assert trim_to_words(text, 500) == text
+
+
+def test_trim_falls_back_to_paragraphs():
+    text = "\n\n".join(scene(word, 30) for word in "abcd")
+    trimmed = trim_to_words(text, 70)
+    assert count_words(trimmed) == 60
+    assert trim_to_words(scene("a", 50), 10) == scene("a", 50)  # never cut to nothing
+
+
+def test_ending_takes_last_paragraphs():
+    text = "\n\n".join(scene(word, 100) for word in "abcd")
+    assert ending(text, words=250).split() == [*["c"] * 100, *["d"] * 100]
+    assert count_words(ending(scene("x", 500), words=100)) == 500
+
+
+def test_append_continuation_skips_repeated_paragraphs():
+    text = "First paragraph.\n\nThe last paragraph so far."
+    continuation = "The last paragraph so far.\n\nWhat happened next."
+    assert append_continuation(text, continuation) == "First paragraph.\n\nThe last paragraph so far.\n\nWhat happened next."
+    assert append_continuation(text, "The last paragraph so far.") == text
@@ -0,0 +1,73 @@
+import os
+import time
+import pytest
+from llm_cache import ResponseCache, make_cache_key
+
+MESSAGES = [
+    {"role": "system", "content": "You are Writer. Write individual chapters."},
+    {"role": "user", "content": "Write chapter 1 of the novel."},
+]
+
+
+def test_key_depends_on_model_and_messages():
+    key = make_cache_key("ollama/qwen2.5:1.5b", MESSAGES)
+    assert key == make_cache_key("ollama/qwen2.5:1.5b", [dict(m) for m in MESSAGES])
+    assert key != make_cache_key("ollama/llama3.2:latest", MESSAGES)
+    changed = MESSAGES[:1] + [{"role": "user", "content": "Write chapter 2 of the novel."}]
+    assert key != make_cache_key("ollama/qwen2.5:1.5b", changed)
+
+
+def test_key_depends_on_call_parameters():
+    key = make_cache_key("ollama/qwen2.5:1.5b", MESSAGES, temperature=0.7)
+    assert key != make_cache_key("ollama/qwen2.5:1.5b", MESSAGES, temperature=0.7, max_tokens=500)
+    assert key != make_cache_key("ollama/qwen2.5:1.5b", MESSAGES, temperature=0.7, stop=["###"])
+    tools = [{"name": "search", "parameters": {}}]
+    assert key != make_cache_key("ollama/qwen2.5:1.5b", MESSAGES, temperature=0.7, tools=tools)
+
+
+def test_key_refuses_values_that_are_not_plain_json():
+    with pytest.raises(TypeError):
+        make_cache_key("ollama/qwen2.5:1.5b", MESSAGES, from_task=object())
+
+
+def test_responses_persist_across_instances(tmp_path):
+    key = make_cache_key("ollama/qwen2.5:1.5b", MESSAGES)
+    cache = ResponseCache(str(tmp_path))
+    assert cache.get(key) is None
+    cache.put(key, "Chapter one text.")
+
+    reopened = ResponseCache(str(tmp_path))
+    assert reopened.get(key) == "Chapter one text."
+    assert (reopened.hits, reopened.misses) == (1, 0)
+
+
+def test_expired_entries_are_dropped(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_age=60)
+    cache.put("ab" * 32, "old response")
+    path = os.path.join(str(tmp_path), "ab", "ab" * 32 + ".json")
+    old = time.time() - 120
+    os.utime(path, (old, old))
+
+    ResponseCache(str(tmp_path), max_age=60)
+    assert not os.path.exists(path)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_bytes=400)
+    cache.put("aa" * 32, "x" * 100)
+    old = time.time() - 60
+    os.utime(os.path.join(str(tmp_path), "aa", "aa" * 32 + ".json"), (old, old))
+    cache.put("bb" * 32, "y" * 100)
+    cache.put("cc" * 32, "z" * 100)
+
+    assert cache.get("aa" * 32) is None
+    assert cache.get("cc" * 32) == "z" * 100
+
+
+def test_replay_mode_is_read_only(tmp_path):
+    ResponseCache(str(tmp_path)).put("dd" * 32, "recorded")
+    replay = ResponseCache(str(tmp_path), replay=True)
+    replay.put("ee" * 32, "new")
+
+    assert replay.get("dd" * 32) == "recorded"
+    assert replay.get("ee" * 32) is None
@@ -0,0 +1,24 @@
+import json
+import logging
+from logging_setup import JsonLinesFormatter, log_content
+
+
+def test_log_content_hash_mode(monkeypatch):
+    chapter = "The tide came in slowly. " * 1000
+    monkeypatch.setenv("LOG_CONTENT", "full")
+    assert log_content(chapter) == chapter
+
+    monkeypatch.setenv("LOG_CONTENT", "hash")
+    summary = log_content(chapter)
+    assert summary.startswith(f"<{len(chapter)} chars, sha256 ")
+    assert summary == log_content(chapter)
+    assert summary != log_content(chapter + ".")
+
+
+def test_json_lines_formatter():
+    record = logging.LogRecord("Main", logging.INFO, __file__, 1, "Chapter %d written", (3,), None)
+    entry = json.loads(JsonLinesFormatter().format(record))
+
+    assert entry["logger"] == "Main"
+    assert entry["level"] == "INFO"
+    assert entry["message"] == "Chapter 3 written"
@@ -0,0 +1,27 @@
+import os
+import subprocess
+import sys
+from main import load_genre_config, parse_args
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_importing_main_loads_no_pipeline():
+    # Run in a fresh interpreter, since other tests may already have imported these modules
+    code = "import sys, main; print(sorted({'crewai', 'dotenv', 'agents', 'book_run'} & set(sys.modules)))"
+    result = subprocess.run([sys.executable, "-c", code], cwd=HERE, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
+
+
+def test_load_genre_config():
+    config = load_genre_config("literary_fiction")
+    assert config["GENRE"] == "literary_fiction"
+    assert "MIN_WORDS_PER_CHAPTER" in config
+    # A genre without a module gets the defaults
+    assert load_genre_config("no_such_genre")["MIN_WORDS_PER_CHAPTER"] == 1600
+
+
+def test_parse_args():
+    assert parse_args([]).resume is None
+    assert parse_args(["--resume"]).resume == "latest"
+    assert parse_args(["--resume", "runs/run-1"]).resume == "runs/run-1"
@@ -0,0 +1,43 @@
+import time
+from mock_llm import MockLLM, generate_response
+from outline_index import OutlineIndex
+from story_state import StoryState
+from streaming import streaming_to
+
+WRITER_MESSAGES = [
+    {"role": "system", "content": "You are Writer. You are working on a 4-chapter story."},
+    {"role": "user", "content": "Current Task: Write chapter 2 of the novel, following the detailed chapter outline."},
+]
+
+
+def final_answer(response):
+    return response.split("Final Answer: ", 1)[1]
+
+
+def test_responses_are_deterministic_and_sized():
+    first = generate_response(WRITER_MESSAGES, words=500)
+    assert first == generate_response(WRITER_MESSAGES, words=500)
+    assert first != generate_response(WRITER_MESSAGES[:1] + [{"role": "user", "content": "Write chapter 3."}], words=500)
+    assert len(final_answer(first).split()) == 500
+
+
+def test_outline_and_story_state_prompts_get_parseable_text():
+    outline_messages = WRITER_MESSAGES[:1] + [{"role": "user", "content": "Compile the final book outline, integrating all content."}]
+    index = OutlineIndex.parse(final_answer(generate_response(outline_messages)))
+    assert sorted(index.chapters) == [1, 2, 3, 4]
+
+    state = StoryState()
+    state.apply_update(1, final_answer(generate_response("Update the story state after chapter 1.")))
+    assert "Mara Quinn" in state.characters
+
+
+def test_latency_token_rate_and_streaming(tmp_path):
+    llm = MockLLM(model="mock/test", words=20, latency=0.05, tokens_per_second=1000)
+    path = str(tmp_path / "beach_story_chapter_2.html")
+
+    started = time.monotonic()
+    with streaming_to(path) as stream:
+        response = llm.call(WRITER_MESSAGES)
+    assert time.monotonic() - started >= 0.05
+    assert response == generate_response(WRITER_MESSAGES, words=20)
+    assert stream.words == len(response.split())
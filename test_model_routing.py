@@ -0,0 +1,44 @@
+import pytest
+from model_routing import resolve_role_model, parse_role_tiers, role_env_name
+
+DEFAULT = "ollama/llama3.1:8b"
+
+
+def test_role_env_name():
+    assert role_env_name("Story Planner") == "STORY_PLANNER"
+    assert role_env_name("Item Developer") == "ITEM_DEVELOPER"
+
+
+def test_default_model_without_routing():
+    assert resolve_role_model("Writer", DEFAULT, {}, environ={}) == DEFAULT
+
+
+def test_env_role_model_wins_and_gets_backend_prefix():
+    genre = {"ROLE_MODELS": {"Editor": "ollama/qwen2.5:3b"}}
+    environ = {"MODEL_EDITOR": "llama3.2:1b"}
+    assert resolve_role_model("Editor", DEFAULT, genre, environ=environ) == "ollama/llama3.2:1b"
+    assert resolve_role_model("Editor", DEFAULT, genre, environ={}) == "ollama/qwen2.5:3b"
+
+
+def test_tiers_from_genre_and_env():
+    genre = {"ROLE_MODEL_TIERS": {"Researcher": "small", "Editor": "small"}, "MODEL_TIERS": {"small": "llama3.2:1b"}}
+    environ = {"ROLE_MODEL_TIERS": "Editor=large", "MODEL_TIER_LARGE": "ollama/llama3.1:70b"}
+    assert resolve_role_model("Researcher", DEFAULT, genre, environ=environ) == "ollama/llama3.2:1b"
+    assert resolve_role_model("Editor", DEFAULT, genre, environ=environ) == "ollama/llama3.1:70b"
+    assert resolve_role_model("Writer", DEFAULT, genre, environ=environ) == DEFAULT
+
+
+def test_unconfigured_tier_falls_back_to_default():
+    assert resolve_role_model("Editor", DEFAULT, {}, environ={"ROLE_MODEL_TIERS": "Editor=small"}) == DEFAULT
+
+
+def test_llm_instances_are_not_routed():
+    llm = object()
+    assert resolve_role_model("Writer", llm, {}, environ={"MODEL_WRITER": "llama3.2:1b"}) is llm
+
+
+def test_parse_role_tiers():
+    assert parse_role_tiers("Item Developer=small, Editor = Small") == {"Item Developer": "small", "Editor": "small"}
+    assert parse_role_tiers("") == {}
+    with pytest.raises(ValueError):
+        parse_role_tiers("Editor")
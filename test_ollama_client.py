@@ -0,0 +1,122 @@
+import json
+import time
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from ollama_client import OllamaClient, OllamaError
+from resilience import is_transient
+
+
+class FakeOllama(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the Ollama server
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server = self.server
+        server.requests.append((self.path, payload, self.client_address))
+        if server.status != 200:
+            self._send(server.status, {"error": "model crashed"})
+        elif self.path == "/api/generate":
+            self._send(200, {"done": True})
+        elif payload["stream"]:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for piece in ["The tide ", "came in."]:
+                time.sleep(server.chunk_delay)
+                self._chunk(json.dumps({"message": {"content": piece}, "done": False}) + "\n")
+            self._chunk(json.dumps({"message": {"content": ""}, "done": True}) + "\n")
+            self.wfile.write(b"0\r\n\r\n")
+        else:
+            self._send(200, {"message": {"role": "assistant", "content": "The tide came in."}, "done": True})
+        # Drop the connection without announcing it, as a server closing an idle connection does
+        self.close_connection = server.drop_connections
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _chunk(self, text):
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOllama)
+    server.requests, server.status, server.drop_connections, server.chunk_delay = [], 200, False, 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_client(server, **kwargs):
+    return OllamaClient(f"http://127.0.0.1:{server.server_address[1]}", timeout=5, options={"num_ctx": 8192}, **kwargs)
+
+
+def test_calls_reuse_one_keep_alive_connection(server):
+    client = make_client(server, keep_alive="10m")
+    messages = [{"role": "user", "content": "Write."}]
+    assert [client.chat("qwen2.5:1.5b", messages, options={"temperature": 0.7}) for _ in range(3)] == ["The tide came in."] * 3
+
+    assert client.connections_opened == 1
+    assert len({address for _, _, address in server.requests}) == 1
+    path, payload, _ = server.requests[0]
+    assert path == "/api/chat"
+    assert payload["model"] == "qwen2.5:1.5b"
+    assert payload["keep_alive"] == "10m"
+    assert payload["options"] == {"num_ctx": 8192, "temperature": 0.7}
+
+
+def test_streamed_reply_is_passed_on_piece_by_piece(server):
+    client = make_client(server)
+    pieces = []
+    assert client.chat("m", [{"role": "user", "content": "Write."}], on_token=pieces.append) == "The tide came in."
+    assert pieces == ["The tide ", "came in."]
+    # The streamed response was read to the end, so its connection is reused
+    client.chat("m", [{"role": "user", "content": "Again."}])
+    assert client.connections_opened == 1
+
+
+def test_dropped_idle_connection_is_replaced(server):
+    server.drop_connections = True
+    client = make_client(server)
+    for _ in range(2):
+        assert client.chat("m", [{"role": "user", "content": "Write."}]) == "The tide came in."
+    assert client.connections_opened == 2
+
+
+def test_server_errors_are_transient(server):
+    server.status = 500
+    client = make_client(server)
+    with pytest.raises(OllamaError) as error:
+        client.chat("m", [{"role": "user", "content": "Write."}])
+    assert error.value.status_code == 500
+    assert is_transient(error.value)
+
+
+def test_warm_up_loads_each_model_once(server):
+    client = make_client(server)
+    assert client.warm_up("qwen2.5:1.5b")
+    assert not client.warm_up("qwen2.5:1.5b")
+    assert [(path, payload["options"]) for path, payload, _ in server.requests] == [("/api/generate", {"num_ctx": 8192})]
+
+
+def test_timeout_bounds_the_whole_streamed_reply(server):
+    # Every piece arrives well within the timeout, the whole reply does not
+    server.chunk_delay = 0.3
+    client = OllamaClient(f"http://127.0.0.1:{server.server_address[1]}", timeout=0.45)
+    pieces = []
+    with pytest.raises(TimeoutError):
+        client.chat("m", [{"role": "user", "content": "Write."}], on_token=pieces.append)
+    assert pieces == ["The tide "]
@@ -1,9 +1,9 @@
 import os
-import importlib
 import re
 from crewai import Task, Crew, Process
 from dotenv import load_dotenv
 from agents import create_agents
+from genre_config import load_genre_config
 import logging
 import warnings
 
@@ -36,17 +36,6 @@ logger.info(f"Using model: {model_to_use}")
 GENRE = os.getenv('GENRE', 'literary_fiction')
 logger.info(f"Using genre: {GENRE}")
 
-# Function to load configuration from the selected genre
-def load_genre_config(genre):
-    try:
-        genre_module = importlib.import_module(f"genres.{genre}")
-        config = {k: v for k, v in genre_module.__dict__.items() if not k.startswith("_")}
-        config['GENRE'] = genre
-        return config
-    except ModuleNotFoundError:
-        logger.error(f"Genre configuration for '{genre}' not found. Using default settings.")
-        return {}
-
 # Load the genre configuration
 genre_config = load_genre_config(GENRE)
 
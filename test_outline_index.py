@@ -0,0 +1,75 @@
+from outline_index import OutlineIndex
+
+OUTLINE = """
+STORY ARC PLAN:
+- Overall Story Arc: Setup, Rising Action, Climax
+CHARACTER PROFILES:
+Mara Quinn (Age: 31)
+- Mara Quinn - Chapter 2: She finally swims.
+**Chapter 1: Arrival**
+Title: The First Chapter
+Key Events:
+- The friends reach the beach.
+- Theo loses the cooler.
+Character Developments: Mara hesitates at the water.
+Setting: A windy public beach at dawn.
+Tone: Light and hopeful.
+Items: cooler, brass compass
+### Chapter 2 - The Tide
+Key Events:
+- A storm rolls in.
+Setting: The pier.
+Tone: Tense.
+Chapter 3: Home
+Key Events:
+- They drive home.
+RELATIONSHIP DYNAMICS:
+Mara and Theo: siblings
+"""
+
+
+def test_chapters_are_indexed_with_fields():
+    index = OutlineIndex.parse(OUTLINE)
+
+    assert len(index) == 3
+    first = index.get(1)
+    assert first.title == "The First Chapter"
+    assert first.key_events == ["The friends reach the beach.", "Theo loses the cooler."]
+    assert first.character_developments == "Mara hesitates at the water."
+    assert first.setting == "A windy public beach at dawn."
+    assert first.tone == "Light and hopeful."
+    assert first.items == ["cooler", "brass compass"]
+    assert index.get(2).title == "The Tide"
+
+
+def test_top_level_sections_are_not_part_of_a_chapter():
+    index = OutlineIndex.parse(OUTLINE)
+
+    assert "RELATIONSHIP DYNAMICS" not in index.get(3).text
+    assert "RELATIONSHIP DYNAMICS" in index.preamble
+    assert "CHARACTER PROFILES" in index.preamble
+
+
+def test_capitalized_lines_without_colon_stay_in_the_chapter():
+    index = OutlineIndex.parse("""Chapter 1: Arrival
+Key Events:
+- The friends reach the beach.
+THE OLD PIER
+- Theo loses the cooler.
+Chapter 2: The Tide
+Key Events:
+- A storm rolls in.
+""")
+    assert "THE OLD PIER" in index.get(1).text
+    assert "Theo loses the cooler." in index.get(1).key_events
+
+
+def test_slice_contains_chapter_and_neighbor_digests():
+    index = OutlineIndex.parse(OUTLINE)
+    text = index.slice(2, neighbors=1)
+
+    assert "Chapter 1: The First Chapter - Key Events: The friends reach the beach.; Theo loses the cooler." in text
+    assert "Setting: The pier." in text
+    assert "Chapter 3: Home - Key Events: They drive home." in text
+    assert "windy public beach" not in text
+    assert index.slice(7) == ""
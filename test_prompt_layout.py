@@ -0,0 +1,40 @@
+from prompt_layout import layered_prompt, shared_prefix_length, PrefixReuse
+
+BIBLE = "CHARACTER PROFILES:\n" + "Mara Quinn grew up by the sea and never left. " * 50
+
+
+def test_layers_follow_the_instruction_in_order_and_empty_ones_are_left_out():
+    prompt = layered_prompt("  Write the chapter.\n", ("BOOK BIBLE", BIBLE), ("Empty", "  "), ("CHAPTER 3", "Mara finds the compass."))
+    assert prompt.startswith("Write the chapter.\n\nBOOK BIBLE:\nCHARACTER PROFILES:")
+    assert prompt.endswith("\n\nCHAPTER 3:\nMara finds the compass.")
+    assert "Empty" not in prompt
+
+
+def test_shared_prefix_length():
+    a = layered_prompt("Write the chapter.", ("BOOK BIBLE", BIBLE), ("CHAPTER 1", "The storm."))
+    b = layered_prompt("Write the chapter.", ("BOOK BIBLE", BIBLE), ("CHAPTER 2", "The calm."))
+    assert shared_prefix_length(a, b) == a.index("CHAPTER 1") + len("CHAPTER ")
+    assert shared_prefix_length(a, a) == len(a)
+    assert shared_prefix_length("", a) == 0
+
+
+def test_prefix_reuse_per_role_and_model():
+    reuse = PrefixReuse(window=2)
+    chapter = lambda n: [{"role": "system", "content": "You are Writer."},
+                         {"role": "user", "content": layered_prompt("Write the chapter.", ("BOOK BIBLE", BIBLE), (f"CHAPTER {n}", "x"))}]
+    assert reuse.observe("m", "Writer", chapter(1)) == 0
+    assert reuse.observe("m", "Writer", chapter(2)) > 0
+    # Prompts are only compared with earlier prompts to the same model
+    assert reuse.observe("other", "Writer", chapter(3)) == 0
+    reuse.observe("m", "Critic", "Review.")
+    reuse.observe("m", "Critic", "Review.")
+    reuse.observe("m", "Critic", "Review.")
+    # The window of 2 has forgotten the Writer's prompts
+    assert reuse.observe("m", "Writer", chapter(4)) == 0
+
+    snapshot = reuse.snapshot()
+    assert snapshot["Writer"]["calls"] == 4
+    assert 0 < snapshot["Writer"]["reuse_ratio"] < 0.5
+    assert snapshot["Critic"]["shared_tokens"] == 4
+    assert snapshot["total"]["calls"] == 7
+    assert snapshot["total"]["prompt_tokens"] == snapshot["Writer"]["prompt_tokens"] + snapshot["Critic"]["prompt_tokens"]
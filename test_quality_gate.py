@@ -0,0 +1,41 @@
+from quality_gate import assess_chapter, dialogue_ratio, key_event_coverage, repeated_trigram_ratio
+
+CONFIG = {"MIN_WORDS_PER_CHAPTER": 20, "MAX_WORDS_PER_CHAPTER": 200}
+
+CHAPTER = """<p>Mara found the brass compass half buried near the old pier, its needle spinning wildly.</p>
+<p>"It still points somewhere," she told Theo, brushing sand from the glass.</p>
+<p>Theo laughed and said, "Somewhere is not a direction." They argued about it all the way to the lighthouse.</p>"""
+
+EVENTS = ["Mara finds a brass compass near the pier", "Mara and Theo walk to the lighthouse"]
+
+
+def test_good_chapter_passes():
+    report = assess_chapter(CHAPTER, EVENTS, CONFIG)
+    assert report.passed, report.summary()
+    assert report.measurements["key_event_coverage"] == 1.0
+    assert report.to_dict()["passed"] is True
+
+
+def test_word_count_limits():
+    assert "too short" in assess_chapter(CHAPTER, EVENTS, dict(CONFIG, MIN_WORDS_PER_CHAPTER=500)).summary()
+    assert "too long" in assess_chapter(CHAPTER, EVENTS, dict(CONFIG, MAX_WORDS_PER_CHAPTER=10)).summary()
+
+
+def test_missing_key_event_fails():
+    report = assess_chapter(CHAPTER, EVENTS + ["A storm sinks the fishing boat"], dict(CONFIG, MIN_KEY_EVENT_COVERAGE=0.8))
+    assert not report.passed
+    assert "A storm sinks the fishing boat" in report.summary()
+    assert key_event_coverage(CHAPTER, []) == (1.0, [])
+
+
+def test_repetition_and_dialogue_balance():
+    looping = " ".join(["the tide came in again"] * 10)
+    assert repeated_trigram_ratio(looping.split()) > 0.5
+    report = assess_chapter(looping, [], CONFIG)
+    assert any("repetitive" in failure for failure in report.failures)
+    assert any("dialogue" in failure for failure in report.failures)
+
+
+def test_dialogue_ratio_counts_both_quote_styles():
+    assert dialogue_ratio('He said "come here now" and “go away”.') == 0.625
+    assert dialogue_ratio("") == 0.0
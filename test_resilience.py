@@ -0,0 +1,135 @@
+import random
+import threading
+import pytest
+from resilience import RetryPolicy, CircuitBreaker, CircuitOpenError, call_with_retry, is_transient, is_retryable_task_error
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Timeout(Exception):
+    """Named like litellm's timeout error."""
+
+
+def flaky(failures, error=TimeoutError):
+    calls = []
+
+    def call():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise error("backend timed out")
+        return "text"
+    return call, calls
+
+
+def test_is_transient():
+    assert is_transient(TimeoutError())
+    assert is_transient(ConnectionResetError())
+    assert is_transient(Timeout())
+    error = RuntimeError("server error")
+    error.status_code = 503
+    assert is_transient(error)
+    assert not is_transient(ValueError("bad prompt"))
+    assert not is_transient(KeyError("cache miss"))
+
+
+def test_tasks_are_retried_on_backend_errors_only():
+    assert is_retryable_task_error(CircuitOpenError("open"))
+    try:
+        try:
+            raise TimeoutError()
+        except TimeoutError as e:
+            raise RuntimeError("Task failed") from e
+    except RuntimeError as wrapped:
+        assert is_retryable_task_error(wrapped)
+    assert not is_retryable_task_error(ValueError("bad prompt"))
+    assert not is_retryable_task_error(KeyError("cache miss"))
+
+
+def test_backoff_is_jittered_and_capped():
+    policy = RetryPolicy(attempts=5, base_delay=1.0, max_delay=5.0, rng=random.Random(1))
+    delays = [policy.delay(retry) for retry in range(6)]
+    assert all(0 <= delay <= min(5.0, 2 ** retry) for retry, delay in enumerate(delays))
+    assert len(set(delays)) == len(delays)
+
+
+def test_retries_transient_errors():
+    call, calls = flaky(2)
+    sleeps, retries = [], []
+    result = call_with_retry(call, RetryPolicy(attempts=3), sleep=sleeps.append, on_retry=lambda n, e: retries.append(n))
+    assert result == "text"
+    assert len(calls) == 3
+    assert retries == [1, 2]
+    assert len(sleeps) == 2
+
+
+def test_gives_up_after_attempts_and_on_permanent_errors():
+    call, calls = flaky(5)
+    with pytest.raises(TimeoutError):
+        call_with_retry(call, RetryPolicy(attempts=3), sleep=lambda delay: None)
+    assert len(calls) == 3
+
+    call, calls = flaky(5, error=ValueError)
+    with pytest.raises(ValueError):
+        call_with_retry(call, RetryPolicy(attempts=3), sleep=lambda delay: None)
+    assert len(calls) == 1
+
+
+def test_circuit_opens_after_consecutive_failures_and_probes():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=clock)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.wait_until_available(timeout=0) is False
+    with pytest.raises(CircuitOpenError):
+        breaker.acquire(timeout=0)
+
+    clock.now = 30
+    breaker.acquire()  # the probe
+    assert breaker.state == "half_open"
+    assert breaker.wait_until_available(timeout=0) is True
+    with pytest.raises(CircuitOpenError):
+        breaker.acquire(timeout=0)  # only one probe at a time
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    clock.now = 60
+    breaker.acquire()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.acquire(timeout=0)
+
+
+def test_waiting_callers_resume_when_circuit_closes():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    resumed = threading.Event()
+
+    def wait_for_circuit():
+        breaker.wait_until_available()
+        resumed.set()
+
+    thread = threading.Thread(target=wait_for_circuit)
+    thread.start()
+    assert not resumed.wait(0.01)
+    thread.join(timeout=2)
+    assert resumed.is_set()
+
+
+def test_retry_feeds_breaker():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    call, calls = flaky(5)
+    with pytest.raises(TimeoutError):
+        call_with_retry(call, RetryPolicy(attempts=2), breaker=breaker, sleep=lambda delay: None)
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.acquire(timeout=0)
@@ -0,0 +1,40 @@
+from retrieval_index import RetrievalIndex, split_passages, format_passages
+
+CHAPTER_1 = """<p>Mara Quinn stood at the edge of the pier, the brass compass heavy in her pocket.</p>
+
+<p>Theo dragged the cooler across the sand and complained about the wind.</p>"""
+
+CHAPTER_2 = """<p>The storm rolled in over the lighthouse. Theo counted the seconds between thunder.</p>
+
+<p>Mara lost the brass compass in the tide pool below the lighthouse.</p>"""
+
+
+def test_passages_follow_paragraphs_and_strip_html():
+    passages = split_passages(CHAPTER_1, passage_words=5)
+    assert passages[0] == "Mara Quinn stood at the edge of the pier, the brass compass heavy in her pocket."
+    assert len(passages) == 2
+
+
+def test_query_ranks_by_names_and_respects_chapter_limit(tmp_path):
+    index = RetrievalIndex(str(tmp_path / "retrieval_index.json"), passage_words=5)
+    index.add_chapter(1, CHAPTER_1)
+    index.add_chapter(2, CHAPTER_2)
+
+    results = index.query("brass compass lighthouse", k=2)
+    assert (results[0]["chapter"], results[0]["passage"]) == (2, 2)
+
+    earlier = index.query("brass compass lighthouse", k=3, before_chapter=2)
+    assert [r["chapter"] for r in earlier] == [1]
+    assert "[Chapter 1, passage 1]" in format_passages(earlier)
+    assert index.query("zeppelin") == []
+
+
+def test_index_is_incremental_and_persistent(tmp_path):
+    path = str(tmp_path / "retrieval_index.json")
+    index = RetrievalIndex(path, passage_words=5)
+    index.add_chapter(1, CHAPTER_1)
+    index.add_chapter(1, "<p>Mara never went near the pier.</p>")
+
+    reloaded = RetrievalIndex(path)
+    assert [p["text"] for p in reloaded.passages] == ["Mara never went near the pier."]
+    assert reloaded.query("cooler") == []
@@ -0,0 +1,36 @@
+import os
+from run_journal import RunJournal, new_run_dir, latest_run_dir
+
+
+def test_recorded_outputs_survive_a_restart(tmp_path):
+    run_dir = str(tmp_path / "20250127-110000")
+    journal = RunJournal(run_dir)
+    journal.write_metadata(genre="literary_fiction", num_chapters=2)
+    journal.record("chapter-1-write", "Write chapter 1 of the novel.", "It was a bright day.", agent="Writer")
+
+    resumed = RunJournal(run_dir)
+    assert resumed.lookup("chapter-1-write", "Write chapter 1 of the novel.") == "It was a bright day."
+    assert resumed.lookup("chapter-2-write", "Write chapter 2 of the novel.") is None
+    assert resumed.completed_keys() == ["chapter-1-write"]
+    assert resumed.read_metadata() == {"genre": "literary_fiction", "num_chapters": 2}
+
+
+def test_changed_description_is_not_reused(tmp_path):
+    journal = RunJournal(str(tmp_path))
+    journal.record("outline-story-planning", "Develop a story arc.", "Arc plan")
+
+    assert journal.lookup("outline-story-planning", "Develop a darker story arc.") is None
+
+
+def test_latest_run_dir(tmp_path):
+    assert latest_run_dir(str(tmp_path / "missing")) is None
+    for name in ("20250126-210000", "20250127-110000"):
+        os.makedirs(tmp_path / name)
+    assert latest_run_dir(str(tmp_path)) == str(tmp_path / "20250127-110000")
+
+
+def test_new_run_dirs_are_unique_and_sort_by_start(tmp_path):
+    runs = [new_run_dir(str(tmp_path)) for _ in range(20)]
+    assert len(set(runs)) == 20
+    assert all(os.path.isdir(run) for run in runs)
+    assert latest_run_dir(str(tmp_path)) == runs[-1]
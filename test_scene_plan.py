@@ -0,0 +1,51 @@
+from main import use_vendored_pywriter
+
+use_vendored_pywriter()
+from scene_plan import ScenePlan, parse_scenes, scenes_from_key_events, STATUS_DRAFT, STATUS_OUTLINE
+
+BREAKDOWN = """Refined outline of chapter 2 ...
+
+**Scene 1: The Compass**
+Goal: Mara wants to keep the compass secret
+Conflict: Theo saw her pick it up
+Outcome: She tells him
+Characters: Mara, Theo
+Setting: The pier at dawn
+
+Scene 2 - Lighthouse
+- Goal: Reach the lighthouse before the tide
+- Setting: The causeway
+"""
+
+
+def test_parse_scene_breakdown():
+    scenes = parse_scenes(BREAKDOWN)
+    assert [scene["title"] for scene in scenes] == ["The Compass", "Lighthouse"]
+    assert scenes[0]["conflict"] == "Theo saw her pick it up"
+    assert scenes[1]["goal"] == "Reach the lighthouse before the tide"
+    assert scenes[1]["outcome"] == ""
+    assert parse_scenes("no scenes here") == []
+
+
+def test_scene_plan_maps_to_pywriter_chapter():
+    taken = {"1"}
+    plan = ScenePlan(2, parse_scenes(BREAKDOWN), taken_ids=taken)
+    assert len(plan) == 2
+    assert plan.chapter.title == "Chapter 2"
+    assert plan.chapter.srtScenes == ["2", "3"]
+    assert taken == {"1", "2", "3"}
+    scene = plan.scenes["2"]
+    assert scene.title == "The Compass"
+    assert scene.goal == "Mara wants to keep the compass secret"
+    assert scene.status == STATUS_OUTLINE
+    assert plan.brief("3").startswith("Scene 2 of 2: Lighthouse")
+
+
+def test_drafts_are_stored_in_the_scenes():
+    plan = ScenePlan(1, scenes_from_key_events(["Mara finds a compass.", "Theo follows her."]))
+    for index, (scene_id, _) in enumerate(plan.ordered()):
+        plan.set_draft(scene_id, f"Scene {index + 1} words here")
+    assert all(scene.status == STATUS_DRAFT for scene in plan.scenes.values())
+    assert plan.word_count() == 8
+    assert plan.draft_text() == "Scene 1 words here\n\n* * *\n\nScene 2 words here"
+    assert plan.scenes[plan.chapter.srtScenes[0]].title == "Mara finds a compass"
@@ -0,0 +1,259 @@
+import threading
+import time
+import pytest
+from types import SimpleNamespace
+from scheduler import FairGate, StageSlots, build_task_graph, critical_path_length, parse_stage_limits, run_task_graph
+
+
+def make_task(name, context=None, output=None):
+    return SimpleNamespace(description=name, context=context, output=output)
+
+
+def test_graph_is_derived_from_context():
+    planning = make_task("planning")
+    characters = make_task("characters")
+    relationships = make_task("relationships", context=[characters])
+    outline = make_task("outline", context=[planning, relationships])
+
+    order, dependencies = build_task_graph([planning, characters, relationships, outline])
+
+    assert [task.description for task in order] == ["planning", "characters", "relationships", "outline"]
+    assert dependencies[id(planning)] == []
+    assert dependencies[id(relationships)] == [id(characters)]
+    assert critical_path_length(order, dependencies) == 3
+
+
+def test_completed_context_is_external_and_pending_context_is_pulled_in():
+    finished = make_task("finished outline", output="done")
+    refine = make_task("refine")
+    write = make_task("write", context=[refine, finished])
+
+    order, dependencies = build_task_graph([write])
+
+    assert [task.description for task in order] == ["write", "refine"]
+    assert dependencies[id(write)] == [id(refine)]
+
+
+def test_cycle_is_rejected():
+    first = make_task("first")
+    second = make_task("second", context=[first])
+    first.context = [second]
+
+    with pytest.raises(ValueError):
+        build_task_graph([first, second])
+
+
+def test_independent_tasks_run_concurrently_within_cap():
+    tasks = [make_task(f"independent {i}") for i in range(4)]
+    final = make_task("final", context=list(tasks))
+    lock = threading.Lock()
+    in_flight = []
+    peak = []
+
+    def run(task):
+        with lock:
+            in_flight.append(task)
+            peak.append(len(in_flight))
+        time.sleep(0.05)
+        with lock:
+            in_flight.remove(task)
+        return task.description
+
+    results = run_task_graph(tasks + [final], run, max_workers=2)
+
+    assert max(peak) == 2
+    assert results[id(final)] == "final"
+    assert len(results) == 5
+
+
+def test_dependents_wait_for_context():
+    finished = []
+    upstream = make_task("upstream")
+    downstream = make_task("downstream", context=[upstream])
+
+    def run(task):
+        if task is downstream:
+            assert finished == ["upstream"]
+        finished.append(task.description)
+
+    run_task_graph([downstream, upstream], run, max_workers=4)
+    assert finished == ["upstream", "downstream"]
+
+
+def test_failure_stops_scheduling_and_is_raised():
+    broken = make_task("broken")
+    after = make_task("after", context=[broken])
+    started = []
+
+    def run(task):
+        started.append(task.description)
+        if task is broken:
+            raise RuntimeError("backend unavailable")
+
+    with pytest.raises(RuntimeError):
+        run_task_graph([broken, after], run, max_workers=2)
+    assert started == ["broken"]
+
+
+def test_parse_stage_limits():
+    assert parse_stage_limits("Writer=1, Researcher=2") == {"Writer": 1, "Researcher": 2}
+    assert parse_stage_limits("") == {}
+
+
+def test_stage_limits_pipeline_chapters():
+    lock = threading.Lock()
+    running = {}
+    peak = {}
+    log = []
+
+    def chapter(number):
+        research = make_task(f"research {number}")
+        research.stage = "Researcher"
+        write = make_task(f"write {number}", context=[research])
+        write.stage = "Writer"
+        return [research, write]
+
+    tasks = chapter(1) + chapter(2) + chapter(3)
+
+    def run(task):
+        with lock:
+            running[task.stage] = running.get(task.stage, 0) + 1
+            peak[task.stage] = max(peak.get(task.stage, 0), running[task.stage])
+            log.append(f"start {task.description}")
+        time.sleep(0.03)
+        with lock:
+            running[task.stage] -= 1
+            log.append(f"end {task.description}")
+
+    run_task_graph(tasks, run, max_workers=4, stage_of=lambda task: task.stage, default_stage_limit=1)
+
+    assert peak == {"Researcher": 1, "Writer": 1}
+    # Chapter 2's research overlaps chapter 1's writing
+    assert log.index("start research 2") < log.index("end write 1")
+    assert log.index("start write 1") < log.index("start write 2") < log.index("start write 3")
+
+
+def test_failure_without_fail_fast_only_skips_dependents():
+    broken = make_task("broken")
+    after_broken = make_task("after broken", context=[broken])
+    healthy = make_task("healthy")
+    after_healthy = make_task("after healthy", context=[healthy])
+    started = []
+
+    def run(task):
+        started.append(task.description)
+        if task is broken:
+            raise RuntimeError("backend unavailable")
+        return task.description
+
+    results = run_task_graph([broken, after_broken, healthy, after_healthy], run, max_workers=1, fail_fast=False)
+
+    assert "after broken" not in started
+    assert results[id(after_healthy)] == "after healthy"
+    assert id(broken) not in results
+
+
+def test_after_adds_ordering_without_context():
+    memory = make_task("memory 1")
+    write = make_task("write 2")
+    finished = []
+
+    order, dependencies = build_task_graph([write, memory], after={id(write): [memory]})
+    assert dependencies[id(write)] == [id(memory)]
+
+    run_task_graph([write, memory], lambda task: finished.append(task.description), max_workers=2, after={id(write): [memory]})
+    assert finished == ["memory 1", "write 2"]
+    assert write.context is None
+
+
+def test_after_only_orders_tasks_in_the_graph():
+    earlier_chapter = make_task("memory 1")
+    write = make_task("write 2")
+
+    order, dependencies = build_task_graph([write], after={id(write): [earlier_chapter]})
+
+    assert order == [write]
+    assert dependencies[id(write)] == []
+
+
+def test_failed_after_dependency_does_not_skip_dependents():
+    memory = make_task("memory 1")
+    write = make_task("write 2")
+    critic = make_task("critic 2", context=[write])
+    started = []
+
+    def run(task):
+        started.append(task.description)
+        if task is memory:
+            raise RuntimeError("backend unavailable")
+
+    run_task_graph([memory, write, critic], run, max_workers=1, fail_fast=False, after={id(write): [memory]})
+    assert started == ["memory 1", "write 2", "critic 2"]
+
+
+def test_admission_is_asked_before_every_task():
+    first = make_task("first")
+    second = make_task("second", context=[first])
+    admitted = []
+
+    run_task_graph([first, second], lambda task: task.description, admission=lambda: admitted.append(len(admitted)))
+
+    assert admitted == [0, 1]
+
+
+def test_fair_gate_serves_waiting_clients_in_turn():
+    gate = FairGate(1)
+    order = []
+
+    def run(client, name):
+        with gate.slot(client):
+            order.append(name)
+
+    def wait_for_waiting(count):
+        while sum(len(tickets) for tickets in gate._waiting.values()) < count:
+            time.sleep(0.001)
+
+    threads = []
+    with gate.slot("book a"):
+        # Book a queues two tasks before book b queues its first one
+        for count, (client, name) in enumerate([("book a", "a2"), ("book a", "a3"), ("book b", "b1")], start=1):
+            threads.append(threading.Thread(target=run, args=(client, name)))
+            threads[-1].start()
+            wait_for_waiting(count)
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert order == ["a2", "b1", "a3"]
+
+
+def test_stage_slots_limit_tasks_of_nested_graphs():
+    slots = StageSlots({"Writer": 1})
+    lock = threading.Lock()
+    running = []
+    peak = []
+
+    def run(task):
+        with slots.slot(task.stage):
+            with lock:
+                running.append(task)
+                peak.append(len(running))
+            time.sleep(0.01)
+            with lock:
+                running.remove(task)
+
+    def run_with_follow_up(task):
+        run(task)
+        # A graph started from a task's hook shares the Writer slot
+        follow_up = make_task(f"{task.description} continued")
+        follow_up.stage = "Writer"
+        run_task_graph([follow_up], run)
+
+    writes = [make_task(f"write {number}") for number in range(3)]
+    for task in writes:
+        task.stage = "Writer"
+    run_task_graph(writes, run_with_follow_up, max_workers=3)
+
+    assert len(peak) == 6
+    assert max(peak) == 1
+    with slots.slot("Editor"):
+        pass  # Stages without a limit are not held back
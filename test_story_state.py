@@ -0,0 +1,64 @@
+import os
+import json
+from context_assembler import estimate_tokens
+from story_state import StoryState
+
+CHAPTER_1 = """CHARACTERS:
+- Mara Quinn: At the pier, afraid of the water.
+- Theo Quinn: Looking for the lost cooler.
+OPEN THREADS:
+- Who took the cooler?
+- Will Mara swim?
+ITEMS:
+- Brass compass: In Mara's pocket.
+TIMELINE:
+- The friends arrive at dawn.
+- Theo loses the cooler.
+"""
+
+CHAPTER_2 = """**CHARACTERS:**
+- Mara Quinn: Swam out to the buoy; elated.
+RESOLVED THREADS:
+- Will Mara swim?
+ITEMS:
+- Brass compass: Dropped in the tide pool.
+TIMELINE:
+- Mara swims to the buoy.
+"""
+
+
+def test_updates_merge_into_current_state():
+    state = StoryState()
+    state.apply_update(1, CHAPTER_1)
+    state.apply_update(2, CHAPTER_2)
+
+    assert state.characters["Mara Quinn"] == "Swam out to the buoy; elated."
+    assert state.characters["Theo Quinn"] == "Looking for the lost cooler."
+    assert state.open_threads == ["Who took the cooler?"]
+    assert state.items["Brass compass"] == "Dropped in the tide pool."
+    assert state.timeline[-1] == "Chapter 2: Mara swims to the buoy."
+
+
+def test_digest_is_bounded_and_keeps_recent_events():
+    state = StoryState()
+    assert state.digest(100) == ""
+    state.apply_update(1, CHAPTER_1)
+    for chapter in range(2, 40):
+        state.apply_update(chapter, f"TIMELINE:\n- Event of chapter {chapter}.")
+
+    digest = state.digest(150)
+    assert estimate_tokens(digest) <= 150
+    assert "Mara Quinn" in digest
+    assert "Chapter 39: Event of chapter 39." in digest
+    assert "Chapter 1: The friends arrive at dawn." not in digest
+
+
+def test_state_is_saved_as_json(tmp_path):
+    state = StoryState()
+    state.apply_update(1, CHAPTER_1)
+    path = str(tmp_path / "story_state.json")
+    state.save(path)
+
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f) == state.to_dict()
+    assert not os.path.exists(f"{path}.tmp")
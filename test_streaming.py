@@ -0,0 +1,78 @@
+import os
+from streaming import atomic_write, current_stream, partial_path, streaming_to
+
+
+def test_tokens_stream_to_partial_file_with_progress(tmp_path):
+    path = str(tmp_path / "beach_story_chapter_1.html")
+    progress = []
+
+    with streaming_to(path, label="chapter-1-write", progress_callback=lambda label, words: progress.append(words)) as stream:
+        assert current_stream() is stream
+        for token in ["The ", "tide ", "came", " in", " slowly."]:
+            current_stream().write(token)
+            # Every token is visible as soon as it is written
+            with open(partial_path(path)) as f:
+                assert f.read().endswith(token)
+
+    assert current_stream() is None
+    assert stream.words == 5
+    assert progress[-1] == 5
+    assert not os.path.exists(path)
+
+
+def test_streaming_is_off_without_a_path():
+    with streaming_to(None) as stream:
+        assert stream is None
+        assert current_stream() is None
+
+
+def test_atomic_write_leaves_the_live_partial_file_alone(tmp_path):
+    path = str(tmp_path / "beach_story_chapter_1.html")
+    with streaming_to(path, progress_callback=lambda label, words: None):
+        current_stream().write("draft")
+        atomic_write(path, "<html>final</html>")
+        current_stream().write(" and more")
+
+    with open(partial_path(path), encoding="utf-8") as f:
+        assert f.read() == "draft and more"
+    with open(path) as f:
+        assert f.read() == "<html>final</html>"
+
+
+def test_reset_discards_streamed_text(tmp_path):
+    path = str(tmp_path / "chapter.html")
+    with streaming_to(path, progress_callback=lambda label, words: None) as stream:
+        stream.write("half a failed ")
+        stream.reset()
+        stream.write("the retried answer")
+        assert stream.words == 3
+    with open(partial_path(path), encoding="utf-8") as f:
+        assert f.read() == "the retried answer"
+
+
+def test_react_scaffolding_is_kept_out_of_the_stream(tmp_path):
+    path = str(tmp_path / "chapter.html")
+    with streaming_to(path, progress_callback=lambda label, words: None) as stream:
+        for token in ["Thou", "ght: I now can give", " a great answer\nFinal", " Answer: The tide", " came in.\nAction", "s speak louder."]:
+            stream.write(token)
+        assert stream.words == 7
+    with open(partial_path(path), encoding="utf-8") as f:
+        assert f.read() == " The tide came in.\nActions speak louder."
+
+
+def test_named_streams_and_atomic_write_use_their_own_files(tmp_path):
+    path = str(tmp_path / "chapter.html")
+    with streaming_to(path, name="write") as write_stream:
+        write_stream.write("the draft")
+        with streaming_to(path, name="revise") as revise_stream:
+            revise_stream.write("the revision")
+            atomic_write(path, "<html>final</html>")
+            revise_stream.write(" goes on")
+
+    with open(partial_path(path, "write"), encoding="utf-8") as f:
+        assert f.read() == "the draft"
+    with open(partial_path(path, "revise"), encoding="utf-8") as f:
+        assert f.read() == "the revision goes on"
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == "<html>final</html>"
+    assert sorted(os.listdir(tmp_path)) == ["chapter.html", "chapter.html.revise.partial", "chapter.html.write.partial"]
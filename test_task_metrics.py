@@ -0,0 +1,91 @@
+import json
+import threading
+import pytest
+from task_metrics import TaskMetrics, record_llm_call, count_tokens, compare_reports, stage_name, output_quality
+
+
+def test_stage_name_drops_chapter_number():
+    assert stage_name("chapter-12-write") == "chapter-write"
+    assert stage_name("outline-compiler") == "outline-compiler"
+
+
+def test_llm_calls_are_attributed_to_running_task():
+    metrics = TaskMetrics()
+    with metrics.task("chapter-1-write", "Writer"):
+        record_llm_call(*count_tokens([{"role": "user", "content": "word " * 100}], "answer " * 50), 0.5)
+        record_llm_call(*count_tokens("prompt", "answer"), 0.25)
+    record_llm_call(10, 10, 1.0)
+
+    [record] = metrics.tasks
+    assert record["llm_calls"] == 2
+    assert record["llm_seconds"] == pytest.approx(0.75)
+    assert record["prompt_tokens"] > record["completion_tokens"] > 0
+    assert record["ok"]
+
+
+def test_failed_task_is_recorded():
+    metrics = TaskMetrics()
+    with pytest.raises(RuntimeError):
+        with metrics.task("chapter-1-write", "Writer"):
+            raise RuntimeError("model went away")
+    assert metrics.tasks[0]["ok"] is False
+
+
+def test_threads_record_their_own_tasks():
+    metrics = TaskMetrics()
+
+    def run(key, calls):
+        with metrics.task(key, "Writer"):
+            for _ in range(calls):
+                record_llm_call(2, 2, 0.1)
+
+    threads = [threading.Thread(target=run, args=(f"chapter-{n}-write", n)) for n in range(1, 4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert {record["task"]: record["llm_calls"] for record in metrics.tasks} == {
+        "chapter-1-write": 1, "chapter-2-write": 2, "chapter-3-write": 3}
+
+
+def test_report_groups_by_stage_and_role(tmp_path):
+    metrics = TaskMetrics()
+    for chapter in (1, 2):
+        with metrics.task(f"chapter-{chapter}-write", "Writer"):
+            record_llm_call(2, 50, 2.0)
+        with metrics.task(f"chapter-{chapter}-edit", "Editor"):
+            pass
+
+    report = metrics.save_report(str(tmp_path / "report.json"), sections={"agents": {}}, model="mock/test")
+    assert json.loads((tmp_path / "report.json").read_text()) == report
+    assert report["agents"] == {}
+    assert report["metadata"] == {"model": "mock/test"}
+    assert report["stages"]["chapter-write"]["tasks"] == 2
+    assert report["stages"]["chapter-write"]["llm_seconds"] == pytest.approx(4.0)
+    assert report["stages"]["chapter-write"]["tokens_per_second"] > 0
+    assert report["roles"]["Editor"]["llm_calls"] == 0
+    assert report["totals"]["tasks"] == 4
+
+
+def _report(total, write):
+    summary = lambda wall: {"wall_seconds": wall, "llm_seconds": wall / 2, "overhead_seconds": wall / 2}
+    return {"totals": summary(total), "stages": {"chapter-write": summary(write)}}
+
+
+def test_compare_reports_flags_slowdowns_beyond_tolerance():
+    baseline = _report(10.0, 4.0)
+    assert compare_reports(_report(11.0, 4.2), baseline, tolerance=0.2) == []
+    regressions = compare_reports(_report(11.0, 6.0), baseline, tolerance=0.2)
+    assert regressions and all("chapter-write" in regression for regression in regressions)
+
+
+def test_compare_reports_ignores_tiny_absolute_differences():
+    assert compare_reports(_report(0.02, 0.01), _report(0.01, 0.005), tolerance=0.2) == []
+
+
+def test_output_quality():
+    assert output_quality("") == {"output_words": 0, "lexical_diversity": 0.0, "repeated_trigrams": 0.0}
+    quality = output_quality("the tide came in. the tide came in. the tide came in.")
+    assert quality["output_words"] == 12
+    assert quality["lexical_diversity"] == 0.3333
+    assert quality["repeated_trigrams"] > 0.5
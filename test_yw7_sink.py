@@ -0,0 +1,69 @@
+import os
+from main import use_vendored_pywriter
+
+use_vendored_pywriter()
+from yw7_sink import Yw7Sink, scene_texts, to_scene_content
+from scene_plan import ScenePlan, parse_scenes
+from pywriter.model.novel import Novel
+from pywriter.yw.yw7_file import Yw7File
+
+CHAPTER_ONE = "<p>Mara found the compass.</p>\n<p>It pointed <em>north</em>.</p>\n\n* * *\n\n<p>The tide came in.</p>"
+CHAPTER_TWO = "<p>The lighthouse was dark.</p>"
+
+PLAN = """Scene 1: The Compass
+Goal: Keep the compass secret
+Scene 2: The Tide
+Goal: Get off the causeway
+"""
+
+
+def read_back(path):
+    yw7 = Yw7File(path)
+    yw7.novel = Novel()
+    yw7.read()
+    return yw7.novel
+
+
+def test_scene_texts_strip_html_and_split_at_breaks():
+    assert to_scene_content("<p>One   two.</p>\n\n<p>Three.</p>") == "One two.\nThree."
+    assert scene_texts(CHAPTER_ONE) == ["Mara found the compass.\nIt pointed north.", "The tide came in."]
+
+
+def test_chapters_are_saved_as_they_finish_in_order(tmp_path):
+    path = str(tmp_path / "book.yw7")
+    sink = Yw7Sink(path, "The Compass", author="A. Writer")
+
+    assert sink.add_chapter(2, CHAPTER_TWO, title="Lighthouse")
+    novel = read_back(path)
+    assert novel.title == "The Compass"
+    assert [novel.chapters[ch_id].title for ch_id in novel.srtChapters] == ["Lighthouse"]
+
+    assert sink.add_chapter(1, CHAPTER_ONE)
+    novel = read_back(path)
+    assert [novel.chapters[ch_id].title for ch_id in novel.srtChapters] == ["Chapter 1", "Lighthouse"]
+    first = novel.chapters[novel.srtChapters[0]]
+    assert [novel.scenes[sc_id].sceneContent for sc_id in first.srtScenes] == [
+        "Mara found the compass.\nIt pointed north.", "The tide came in."]
+    assert not os.path.exists(str(tmp_path / "book.partial.yw7"))
+
+
+def test_unchanged_chapter_is_not_saved_again(tmp_path):
+    path = str(tmp_path / "book.yw7")
+    sink = Yw7Sink(path, "The Compass")
+    assert sink.add_chapter(1, CHAPTER_ONE)
+    assert not sink.add_chapter(1, CHAPTER_ONE)
+
+    assert sink.add_chapter(1, CHAPTER_TWO)
+    novel = read_back(path)
+    assert len(novel.srtChapters) == 1
+    assert len(novel.scenes) == 1
+
+
+def test_scene_plan_keeps_scene_metadata(tmp_path):
+    path = str(tmp_path / "book.yw7")
+    sink = Yw7Sink(path, "The Compass")
+    sink.add_chapter(1, CHAPTER_ONE, scene_plan=ScenePlan(1, parse_scenes(PLAN)))
+    novel = read_back(path)
+    scenes = [novel.scenes[sc_id] for sc_id in novel.chapters[novel.srtChapters[0]].srtScenes]
+    assert [scene.title for scene in scenes] == ["The Compass", "The Tide"]
+    assert scenes[1].goal == "Get off the causeway"
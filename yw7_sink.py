@@ -0,0 +1,137 @@
+import os
+import html
+import hashlib
+import logging
+import threading
+from pywriter.model.novel import Novel
+from pywriter.model.chapter import Chapter
+from pywriter.model.scene import Scene
+from pywriter.model.id_generator import create_id
+from pywriter.yw.yw7_file import Yw7File
+from retrieval_index import TAG_PATTERN
+from length_control import split_scenes, split_paragraphs, SCENE_BREAK_PATTERN
+
+logger = logging.getLogger("Yw7Sink")
+
+# yWriter scene status "1st Edit", see Scene.STATUS
+STATUS_EDITED = 3
+
+
+def to_scene_content(text):
+    """
+    Converts generated chapter HTML to yWriter scene text: plain paragraphs, one per line.
+    """
+    paragraphs = (" ".join(html.unescape(TAG_PATTERN.sub("", paragraph)).split())
+                  for paragraph in split_paragraphs(text or ""))
+    return "\n".join(paragraph for paragraph in paragraphs if paragraph)
+
+
+def scene_texts(text):
+    """
+    Splits chapter text at its scene breaks into the yWriter content of each scene.
+    """
+    texts = [to_scene_content(SCENE_BREAK_PATTERN.sub("\n\n", scene)) for scene in split_scenes(text or "")]
+    return [scene for scene in texts if scene]
+
+
+class Yw7Sink:
+    """
+    Builds the generated book as a pywriter Novel, one chapter at a time, and
+    saves it as a yWriter 7 project after every chapter, so the pywriter
+    exporters work on it and an interrupted run keeps every finished chapter.
+
+    Every save writes the whole project: pywriter's Yw7File.write rebuilds
+    the XML tree of all chapters and scenes from the Novel. That is cheap next
+    to generating a chapter, so no save is skipped except re-adding a chapter
+    with unchanged text. Each save goes through a temporary file that is
+    renamed into place.
+    """
+
+    def __init__(self, path, title, author="", description=""):
+        self.path = path
+        novel = Novel()
+        novel.title = title
+        novel.authorName = author
+        novel.desc = description
+        self.yw7 = Yw7File(path)
+        self.yw7.novel = novel
+        self.chapter_ids = {}  # chapter number -> chapter ID
+        self._digests = {}  # chapter number -> hash of the text last added
+        self._lock = threading.Lock()
+
+    @property
+    def novel(self):
+        return self.yw7.novel
+
+    def add_chapter(self, chapter_number, text, title=None, scene_plan=None):
+        """
+        Adds (or replaces) a finished chapter and saves the project. With the
+        chapter's ScenePlan, its scenes keep their titles, goals, conflicts
+        and outcomes when the text has as many scenes as the plan. Returns
+        False when the chapter is unchanged and nothing was written.
+        """
+        digest = hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+        with self._lock:
+            if self._digests.get(chapter_number) == digest:
+                return False
+            novel = self.novel
+            chapter_id = self.chapter_ids.get(chapter_number)
+            if chapter_id is None:
+                chapter_id = create_id(novel.chapters)
+                self.chapter_ids[chapter_number] = chapter_id
+                novel.srtChapters = sorted(list(novel.srtChapters) + [chapter_id],
+                                           key=lambda ch_id: self._number_of(ch_id))
+            else:
+                for scene_id in novel.chapters[chapter_id].srtScenes:
+                    del novel.scenes[scene_id]
+
+            chapter = Chapter()
+            chapter.title = title or f"Chapter {chapter_number}"
+            chapter.chLevel = 0
+            chapter.chType = 0
+            chapter.srtScenes = []
+            novel.chapters[chapter_id] = chapter
+
+            texts = scene_texts(text)
+            planned = scene_plan.ordered() if scene_plan is not None else []
+            if len(planned) != len(texts):
+                if planned:
+                    logger.debug(f"Chapter {chapter_number} has {len(texts)} scenes, its plan {len(planned)}; using the text's scenes")
+                planned = [(None, None)] * len(texts)
+            for position, ((_, planned_scene), content) in enumerate(zip(planned, texts), start=1):
+                scene = Scene()
+                if planned_scene is not None:
+                    scene.title = planned_scene.title
+                    scene.desc = planned_scene.desc
+                    scene.goal = planned_scene.goal
+                    scene.conflict = planned_scene.conflict
+                    scene.outcome = planned_scene.outcome
+                    scene.notes = planned_scene.notes
+                else:
+                    scene.title = f"Scene {position}" if len(texts) > 1 else chapter.title
+                scene.sceneContent = content
+                scene.scType = 0
+                scene.status = STATUS_EDITED
+                scene_id = create_id(novel.scenes)
+                novel.scenes[scene_id] = scene
+                chapter.srtScenes.append(scene_id)
+
+            self._save()
+            self._digests[chapter_number] = digest
+        logger.info(f"Chapter {chapter_number} saved to {self.path} ({len(texts)} scenes)")
+        return True
+
+    def _number_of(self, chapter_id):
+        return next(number for number, ch_id in self.chapter_ids.items() if ch_id == chapter_id)
+
+    def _save(self):
+        if os.path.isfile(f"{self.path}.lock"):
+            raise RuntimeError(f"{self.path} is open in yWriter; close it first.")
+        # pywriter only accepts paths ending in .yw7
+        temp_path = f"{os.path.splitext(self.path)[0]}.partial.yw7"
+        self.yw7.filePath = temp_path
+        try:
+            self.yw7.write()
+        finally:
+            self.yw7.filePath = self.path
+        os.replace(temp_path, self.path)